@@ -0,0 +1,238 @@
+import argparse                      # Command line options
+import json                          # Machine-readable results for CI
+import os                            # Paths for assets and golden frames
+import sys                           # Exit codes
+import time                          # Frame work time for the render scale controller
+
+from loader import headless          # Offscreen context creation (must run before OpenGL is imported)
+from loader import gl_options        # PyOpenGL error checking switches
+from loader import config            # Settings (plain constants, safe to import before OpenGL)
+
+# Headless render benchmark: plays the camera tour through `views` for N frames into an offscreen
+# framebuffer (Mesa EGL/OSMesa, no display, audio or input) and reports frame times, draw calls
+# and upload bytes. Optionally dumps or compares golden frames for regression tests.
+#
+#     python benchmark.py --frames 600 --json bench.json
+#     python benchmark.py --frames 120 --no-video --dump-golden golden/
+#     python benchmark.py --frames 120 --no-video --compare-golden golden/
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Render the castle tour offscreen and report timings.")
+    parser.add_argument("--backend", choices=headless.BACKENDS, default="egl", help="offscreen GL backend")
+    parser.add_argument("--frames", type=int, default=600, help="frames to measure")
+    parser.add_argument("--warmup", type=int, default=30, help="frames rendered before measuring")
+    parser.add_argument("--size", default=f"{config.DISPLAY_WIDTH}x{config.DISPLAY_HEIGHT}", metavar="WxH", help="framebuffer size")
+    parser.add_argument("--instances", type=int, default=1, help="castle copies in the scene (instancing scale test)")
+    parser.add_argument("--tour", metavar="PATH", help="camera tour file (default: config.CAMERA_TOUR)")
+    parser.add_argument("--no-video", action="store_true", help="skip background video decode/upload")
+    parser.add_argument("--gl-debug", action="store_true", help="keep PyOpenGL per-call error checking and logging")
+    parser.add_argument("--no-indirect", action="store_true", help="draw without glMultiDrawElementsIndirect")
+    parser.add_argument("--layer-cache", action="store_true", help="render the scene on demand into a cached layer")
+    parser.add_argument("--render-scale", type=float, help="render the scene at this fixed scale (implies a layer)")
+    parser.add_argument("--scale-target-ms", type=float,
+                        help="adjust the render scale to this frame time budget (implies a layer)")
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON")
+    parser.add_argument("--dump-golden", metavar="DIR", help="write golden frames to DIR")
+    parser.add_argument("--compare-golden", metavar="DIR", help="compare against golden frames in DIR")
+    parser.add_argument("--golden-every", type=int, default=30, help="frame interval between golden frames")
+    parser.add_argument("--tolerance", type=float, default=2.0, help="max mean absolute pixel difference")
+    args = parser.parse_args(argv)
+    # --frames counts the measured frames after the warm-up, so at least one is needed for a summary
+    if args.frames < 1:
+        parser.error("--frames must be at least 1 (frames measured after --warmup)")
+    if args.warmup < 0 or args.golden_every < 1:
+        parser.error("--warmup must be >= 0 and --golden-every >= 1")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    width, height = (int(v) for v in args.size.lower().split("x"))
+
+    headless.select_platform(args.backend)
+    gl_options.configure(args.gl_debug)      # After the platform, before the context
+    context = headless.create_context(args.backend, width, height)
+
+    # Everything that imports PyOpenGL has to come after the platform is selected
+    import glm
+    import numpy as np
+    from OpenGL.GL import glViewport, glClearColor, glFinish, glUniform1i, GL_DEPTH_TEST
+    from loader.bg_loader import create_bg_shader_program, create_bg_quad, VideoTextureStream
+    from loader.model_loader import create_textured_object
+    from loader.profiler import Profiler
+    from loader.renderer import view_matrix, draw_background, draw_scene, draw_scene_cached
+    from loader.layer_cache import LayerCache
+    from loader.render_scale import ScaleController
+    from loader.scene import Scene
+    from loader.texture_loader import load_texture
+    from loader.textured_shader import create_shader_program
+    from loader.shader_manager import uniform_locations, delete_programs
+    from loader.uniform_buffer import CameraUniforms
+    from loader.gl_state import state as gl_state
+    from loader.tour import load_tour
+
+    fbo, renderbuffers = headless.create_framebuffer(width, height)
+    glViewport(0, 0, width, height)
+    glClearColor(*config.BACKGROUND_COLOR)
+    gl_state.enable(GL_DEPTH_TEST)
+
+    # Background video is decoded synchronously, one clip frame per rendered frame, so runs are repeatable
+    cap = None
+    if not args.no_video and os.path.exists(config.BG_VIDEO):
+        import cv2
+        cap = cv2.VideoCapture(config.BG_VIDEO)
+        video_stream = VideoTextureStream(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                                          int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    else:
+        video_stream = VideoTextureStream(2, 2)   # Stays black
+    bg_shader = create_bg_shader_program()
+    bg_VAO, bg_VBO = create_bg_quad()
+
+    shader = create_shader_program(defines=("INSTANCED",))
+    gl_state.use_program(shader)
+    vao_castle, ebo_castle, count_castle, index_type_castle, bvh_castle, lods_castle = create_textured_object(
+        config.CASTLE_VERTICES, config.CASTLE_INDICES, optimize=True,
+        chunk_triangles=config.CULL_CHUNK_TRIANGLES, lod=config.LOD)
+    tex_castle = load_texture(config.CASTLE_TEXTURE)
+    glUniform1i(uniform_locations(shader)["texture1"], 0)
+    proj = glm.perspective(glm.radians(100.0), width / height, 0.1, 100.0)
+    camera = CameraUniforms()
+
+    # Same scene as main.py; extra copies are laid out on a grid around the original castle
+    scene = Scene(culling=config.FRUSTUM_CULLING,
+                  lod_thresholds=config.LOD_SCREEN_SIZES if config.LOD else None,
+                  indirect=not args.no_indirect)
+    castle_mesh = scene.add_mesh(vao_castle, count_castle, index_type_castle, bvh_castle, lods_castle)
+    orbit = scene.add_node(position=(0, 1, 0))
+    side = int(np.ceil(np.sqrt(args.instances)))
+    for i in range(args.instances):
+        row, column = divmod(i, side)
+        offset = ((column - (side - 1) / 2) * 4.0, 0, (row - (side - 1) / 2) * 4.0) if i else (0, 0, 0)
+        scene.add_node(orbit, position=(offset[0], 1 + offset[1], offset[2]), mesh=castle_mesh, texture=tex_castle)
+    # Same camera tour as the interactive auto mode, sampled at config.FPS and looped
+    tour = load_tour(args.tour or config.CAMERA_TOUR)
+
+    layer = None
+    if args.layer_cache or args.render_scale or args.scale_target_ms:
+        layer = LayerCache(width, height, config.LAYER_EPSILON if args.layer_cache else -1.0, target=fbo,
+                           sharpness=config.RENDER_SCALE_SHARPNESS)
+        if args.render_scale:
+            layer.set_scale(args.render_scale)
+    scaler = ScaleController(args.scale_target_ms) if args.scale_target_ms else None
+
+    if args.dump_golden:
+        os.makedirs(args.dump_golden, exist_ok=True)
+    mismatches = []
+    profiler = None
+
+    for frame_number in range(args.warmup + args.frames):
+        if frame_number == args.warmup:
+            profiler = Profiler(gpu=True)    # Measure only after warm-up
+        measuring = profiler is not None
+        frame_start = time.perf_counter()
+        if measuring:
+            profiler.begin_frame()
+            profiler.stage("video", gpu=True)
+
+        if cap is not None:
+            ret, video_frame = cap.read()
+            if not ret:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ret, video_frame = cap.read()
+            video_stream.upload(video_frame)
+            if measuring:
+                profiler.count("upload bytes", video_frame.nbytes)
+
+        camera_distance, rot_x, rot_y = (float(v) for v in
+                                         tour.sample((frame_number * 1000.0 / config.FPS) % max(tour.duration, 1.0)))
+
+        if measuring:
+            profiler.stage("draw bg", gpu=True)
+        draw_calls = draw_background(bg_shader, bg_VAO, video_stream.texture)
+        if measuring:
+            profiler.stage("draw scene", gpu=True)
+        orbit.rotation = (rot_x, rot_y, 0)
+        if layer is not None:
+            renders = layer.renders
+            draw_calls += draw_scene_cached(layer, shader, camera, view_matrix(camera_distance), scene, proj, height)
+            if scaler is not None and layer.renders != renders:
+                # Same inputs as main.py: CPU work so far or the (late) GPU time of the drawing stages
+                cpu_ms = (time.perf_counter() - frame_start) * 1000.0
+                gpu_ms = sum((profiler.latest(name, gpu=True) or 0.0) if measuring else 0.0
+                             for name in ("video", "draw bg", "draw scene"))
+                layer.set_scale(scaler.update(max(cpu_ms, gpu_ms)))
+            if measuring:
+                profiler.count("layer renders", layer.renders - renders)
+                profiler.count("render scale %", round(layer.scale * 100))
+        else:
+            draw_calls += draw_scene(shader, camera, view_matrix(camera_distance), scene, proj, height)
+        issued, skipped = gl_state.take_counts()
+        if measuring:
+            profiler.count("draw calls", draw_calls)
+            for name, amount in scene.stats.items():
+                profiler.count(name, amount)
+            profiler.count("state calls", issued)            # Without the tracker: issued + skipped
+            profiler.count("state skipped", skipped)
+            profiler.stage("finish")
+        glFinish()                           # No swap in headless mode; wait so frame times are real
+        if measuring:
+            profiler.end_frame()
+
+        # Golden frames are taken on measured frames at a fixed interval
+        index = frame_number - args.warmup
+        if measuring and index % args.golden_every == 0 and (args.dump_golden or args.compare_golden):
+            image = headless.read_pixels(width, height)
+            name = "frame_%05d.png" % index
+            if args.dump_golden:
+                from PIL import Image
+                Image.fromarray(image).save(os.path.join(args.dump_golden, name))
+            if args.compare_golden:
+                from PIL import Image
+                golden_path = os.path.join(args.compare_golden, name)
+                if not os.path.exists(golden_path):
+                    mismatches.append((name, None))   # Missing golden frame counts as a failure
+                    continue
+                golden = np.asarray(Image.open(golden_path).convert("RGB"))
+                diff = float(np.abs(golden.astype(np.int16) - image).mean()) if golden.shape == image.shape else 255.0
+                if diff > args.tolerance:
+                    mismatches.append((name, diff))
+
+    summary = profiler.summary()
+    frame_ms = summary["frame"]["cpu"]
+    print(f"{args.frames} frames at {width}x{height} ({args.backend}): "
+          f"p50 {frame_ms[0]:.2f} ms, p95 {frame_ms[1]:.2f} ms, p99 {frame_ms[2]:.2f} ms "
+          f"(~{1000.0 / frame_ms[0]:.0f} FPS)")
+    print(profiler.report())
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"frames": args.frames, "instances": args.instances, "width": width, "height": height,
+                       "gl_debug": args.gl_debug, "indirect": scene.indirect,
+                       "layer_cache": layer.stats() if layer is not None else None,
+                       "render_scale": scaler.stats() if scaler is not None else None,
+                       "backend": args.backend, "stages": summary}, f, indent=2)
+    if layer is not None:
+        print("Layer cache:", ", ".join(f"{value} {name}" for name, value in layer.stats().items()))
+    if scaler is not None:
+        print("Render scale:", ", ".join(f"{value} {name}" for name, value in scaler.stats().items()))
+    for name, diff in mismatches:
+        if diff is None:
+            print(f"Golden mismatch: {name} is missing from {args.compare_golden}")
+        else:
+            print(f"Golden mismatch: {name} mean abs diff {diff:.2f} > {args.tolerance}")
+
+    # Cleanup resources
+    profiler.delete()
+    if cap is not None:
+        cap.release()
+    video_stream.delete()
+    scene.delete()
+    if layer is not None:
+        layer.delete()
+    camera.delete()
+    delete_programs()
+    headless.delete_framebuffer(fbo, renderbuffers)
+    headless.destroy_context(context)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import argparse                      # Command line options
+import os                            # Repository directory
+import subprocess                    # Fresh interpreter per measurement
+import sys                           # Interpreter path, exit codes
+
+# Startup import budget: imports the entry module in a fresh interpreter with `-X importtime` and
+# fails when its module-level imports take longer than the budget, or when a dependency that is
+# meant to load lazily (OpenCV only with a background video, Pillow only to decode an uncached
+# texture) is pulled in at import time. Run it in CI after dependency or import changes.
+#
+#     python check_imports.py                      # main.py within the default budget
+#     python check_imports.py --budget-ms 400 --top 15
+#     python check_imports.py --module benchmark --forbid cv2 PIL pygame
+
+BUDGET_MS = 600                      # Module-level imports of main.py (pygame, PyOpenGL, NumPy, PyGLM)
+LAZY_MODULES = ("cv2", "PIL")        # Must not be imported before main() runs
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Check the import time of the startup path.")
+    parser.add_argument("--module", default="main", help="module to import (from the repository root)")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="maximum total import time")
+    parser.add_argument("--forbid", nargs="*", default=list(LAZY_MODULES), metavar="MODULE",
+                        help="top-level packages that must not be imported")
+    parser.add_argument("--repeat", type=int, default=3, help="measurements; the fastest one counts")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    return parser.parse_args(argv)
+
+def measure(module):
+    # {module name: (self us, cumulative us)} and the top-level total (us) for one fresh import
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+    times = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package", nesting shown by indentation
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+        if not name[1:].startswith(" "):          # Top level: not nested under another import
+            total += int(cumulative_us)
+    return times, total
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        times, total = min((measure(args.module) for _ in range(max(args.repeat, 1))), key=lambda m: m[1])
+    except RuntimeError as error:
+        print(error)
+        return 2
+
+    print(f"import {args.module}: {total / 1000.0:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    slowest = sorted(times.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+    for name, (self_us, cumulative_us) in slowest:
+        print(f"  {self_us / 1000.0:8.1f} ms self {cumulative_us / 1000.0:8.1f} ms total  {name}")
+
+    failed = False
+    imported = {name.split(".")[0] for name in times}
+    for name in args.forbid:
+        if name in imported:
+            print(f"FAIL: {name} is imported at startup (should be imported lazily)")
+            failed = True
+    if total > args.budget_ms * 1000.0:
+        print(f"FAIL: import time {total / 1000.0:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+import argparse                      # Command line options
+import math                          # Frame count from the tour length
+import os                            # Output directory, background video check
+import sys                           # Exit codes
+import time                          # Sustained export rate
+
+from loader import headless          # Offscreen context creation (must run before OpenGL is imported)
+from loader import gl_options        # PyOpenGL error checking switches
+from loader import config            # Settings (plain constants, safe to import before OpenGL)
+
+# Offline tour export: renders the camera tour at a fixed timestep (frame i shows tour time
+# i / fps, whatever the render takes) into an offscreen framebuffer of any size and writes it to
+# a video file. Frames come back through a ring of PBOs and fences (loader/frame_readback.py) and
+# are encoded on a worker (loader/video_encoder.py), so rendering, readback and encoding overlap.
+# Runs headless (Mesa EGL/OSMesa, also CPU-only llvmpipe) and replaces screen-capturing main.py.
+#
+#     python export_tour.py tour.mp4
+#     python export_tour.py loop.mp4 --size 1920x1080 --fps 30 --tour source/tour.json
+#     python export_tour.py clip.avi --duration 5 --encoder cv2 --no-video
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Render the camera tour offscreen into a video file.")
+    parser.add_argument("output", help="video file to write (.mp4, .avi, .mkv, ...)")
+    parser.add_argument("--backend", choices=headless.BACKENDS, default="egl", help="offscreen GL backend")
+    parser.add_argument("--size", default=f"{config.DISPLAY_WIDTH}x{config.DISPLAY_HEIGHT}", metavar="WxH", help="video size")
+    parser.add_argument("--fps", type=float, default=60.0, help="video frame rate (tour time step)")
+    parser.add_argument("--duration", type=float, help="seconds to export (default: the whole tour)")
+    parser.add_argument("--tour", metavar="PATH", help="camera tour file (default: config.CAMERA_TOUR)")
+    parser.add_argument("--no-video", action="store_true", help="black background instead of the video")
+    parser.add_argument("--encoder", choices=("auto", "ffmpeg", "cv2"), default="auto",
+                        help="ffmpeg pipe (if installed) or cv2.VideoWriter")
+    parser.add_argument("--ring", type=int, default=3, help="readback PBOs in flight")
+    parser.add_argument("--queue", type=int, default=8, help="frames queued for the encoder")
+    args = parser.parse_args(argv)
+    if args.ring < 1 or args.queue < 1:
+        parser.error("--ring and --queue must be at least 1")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    width, height = (int(v) for v in args.size.lower().split("x"))
+
+    headless.select_platform(args.backend)
+    gl_options.configure(False)
+    context = headless.create_context(args.backend, width, height)
+
+    # Everything that imports PyOpenGL has to come after the platform is selected
+    import glm
+    from OpenGL.GL import glViewport, glClearColor, glFlush, glUniform1i, GL_DEPTH_TEST
+    from loader.bg_loader import create_bg_shader_program, create_bg_quad, VideoTextureStream
+    from loader.frame_readback import FrameReadback
+    from loader.model_loader import create_textured_object
+    from loader.renderer import view_matrix, draw_background, draw_scene
+    from loader.scene import Scene
+    from loader.texture_loader import load_texture
+    from loader.textured_shader import create_shader_program
+    from loader.shader_manager import uniform_locations, delete_programs
+    from loader.uniform_buffer import CameraUniforms
+    from loader.gl_state import state as gl_state
+    from loader.tour import load_tour
+    from loader.video_encoder import VideoEncoder
+
+    tour = load_tour(args.tour or config.CAMERA_TOUR)
+    duration_ms = tour.duration if args.duration is None else args.duration * 1000.0
+    frame_count = max(int(math.ceil(duration_ms * args.fps / 1000.0)), 1)
+    cameras = tour.sample([i * 1000.0 / args.fps for i in range(frame_count)])   # Whole tour in one call
+
+    fbo, renderbuffers = headless.create_framebuffer(width, height)
+    glViewport(0, 0, width, height)
+    glClearColor(*config.BACKGROUND_COLOR)
+    gl_state.enable(GL_DEPTH_TEST)
+
+    # Background clip frame for each export frame follows the clip's own frame rate
+    cap = None
+    if not args.no_video and os.path.exists(config.BG_VIDEO):
+        import cv2
+        cap = cv2.VideoCapture(config.BG_VIDEO)
+        clip_fps = cap.get(cv2.CAP_PROP_FPS) or config.FPS
+        clip_frames = max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 1)
+        video_stream = VideoTextureStream(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                                          int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    else:
+        video_stream = VideoTextureStream(2, 2)   # Stays black
+    clip_position = 0                               # Next clip frame cap.read() returns
+    clip_shown = -1                                 # Clip frame in the video texture
+    bg_shader = create_bg_shader_program()
+    bg_VAO, bg_VBO = create_bg_quad()
+
+    shader = create_shader_program(defines=("INSTANCED",))
+    gl_state.use_program(shader)
+    vao_castle, ebo_castle, count_castle, index_type_castle, bvh_castle, lods_castle = create_textured_object(
+        config.CASTLE_VERTICES, config.CASTLE_INDICES, optimize=True,
+        chunk_triangles=config.CULL_CHUNK_TRIANGLES, lod=config.LOD)
+    tex_castle = load_texture(config.CASTLE_TEXTURE)
+    glUniform1i(uniform_locations(shader)["texture1"], 0)
+    proj = glm.perspective(glm.radians(100.0), width / height, 0.1, 100.0)
+    camera = CameraUniforms()
+
+    scene = Scene(culling=config.FRUSTUM_CULLING,
+                  lod_thresholds=config.LOD_SCREEN_SIZES if config.LOD else None,
+                  indirect=config.RENDER_INDIRECT)
+    castle_mesh = scene.add_mesh(vao_castle, count_castle, index_type_castle, bvh_castle, lods_castle)
+    orbit = scene.add_node(position=(0, 1, 0))
+    scene.add_node(orbit, position=(0, 1, 0), mesh=castle_mesh, texture=tex_castle)
+
+    encoder = readback = None
+    start = time.perf_counter()
+    try:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        encoder = VideoEncoder(args.output, width, height, args.fps, args.encoder, args.queue)
+        readback = FrameReadback(width, height, args.ring)
+        print(f"Exporting {frame_count} frames ({frame_count / args.fps:.1f} s at {args.fps:g} FPS, "
+              f"{width}x{height}) to {args.output} with {encoder.encoder}")
+        start = time.perf_counter()
+        for frame_number in range(frame_count):
+            if cap is not None:
+                # Skip (grab without decoding) to the clip frame shown at this tour time
+                target = int(frame_number * clip_fps / args.fps) % clip_frames
+                if target != clip_shown:
+                    if target < clip_position:           # Looped around
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        clip_position = 0
+                    while clip_position < target:
+                        cap.grab()
+                        clip_position += 1
+                    ret, video_frame = cap.read()
+                    clip_position += 1
+                    clip_shown = target
+                    if ret:
+                        video_stream.upload(video_frame)
+
+            camera_distance, rot_x, rot_y = (float(v) for v in cameras[frame_number])
+            draw_background(bg_shader, bg_VAO, video_stream.texture)
+            orbit.rotation = (rot_x, rot_y, 0)
+            draw_scene(shader, camera, view_matrix(camera_distance), scene, proj, height)
+            frame = readback.read()          # Queues this frame, returns the one from ring - 1 frames ago
+            glFlush()                        # Start the GPU on it now; nothing waits for it here
+            if frame is not None:
+                encoder.write(frame)
+            if frame_number and frame_number % 120 == 0:
+                elapsed = time.perf_counter() - start
+                print(f"  {frame_number}/{frame_count} frames, {frame_number / elapsed:.1f} FPS")
+        for frame in readback.drain():
+            encoder.write(frame)
+        rendered = time.perf_counter() - start
+        encoder.close()                      # Waits for the queued frames
+    finally:
+        total = time.perf_counter() - start
+        if encoder is not None:
+            encoder.abort()                  # Only does something if close() wasn't reached: stops the worker/ffmpeg
+        if readback is not None:
+            readback.delete()
+        if cap is not None:
+            cap.release()
+        video_stream.delete()
+        scene.delete()
+        camera.delete()
+        delete_programs()
+        headless.delete_framebuffer(fbo, renderbuffers)
+        headless.destroy_context(context)
+
+    print(f"Exported {frame_count} frames in {total:.2f} s: {frame_count / total:.1f} FPS sustained "
+          f"({frame_count / rendered:.1f} FPS render + readback, {frame_count / args.fps / total:.2f}x real time)")
+    print("Readback:", ", ".join(f"{value} {name}" for name, value in readback.stats().items()))
+    print("Encoder:", ", ".join(f"{value} {name}" for name, value in encoder.stats().items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
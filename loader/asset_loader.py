@@ -0,0 +1,175 @@
+import time                                        # Upload budget and timeline stamps
+from concurrent.futures import ThreadPoolExecutor  # CPU-side loading off the render thread
+
+# Startup asset graph. Each asset has an optional CPU step (load), run on a thread pool once its
+# dependencies are ready, and an optional GL step (upload), run on the render thread by pump()
+# within a time budget. An upload may be a generator: every yield ends a slice, so large uploads
+# are spread over several frames; yielding PENDING means "waiting on something else, come back
+# next pump" (e.g. a texture still decoding). The generator's return value is the asset's result.
+#
+#     assets = AssetLoader()
+#     assets.add("mesh", load=parse_mesh, upload=upload_mesh)       # upload(parse_mesh())
+#     assets.add("scene", deps=("mesh", "shader"), upload=build)    # upload(None, mesh, shader)
+#     while not assets.ready("scene"):
+#         assets.pump()                                              # Once per frame
+#     print(assets.report())
+#
+# load(*dependency results) returns the CPU result; upload(CPU result, *dependency results) returns
+# the asset's result (without load, the CPU result is None; without upload, it is the result).
+
+WORKERS = 4              # Loader threads (NumPy, Pillow and file reads release the GIL)
+PENDING = object()       # Yielded by an upload that made no progress this pump
+
+class _Asset:
+    __slots__ = ("name", "load", "upload", "deps", "state", "future", "steps", "result", "times")
+
+    def __init__(self, name, load, upload, deps):
+        self.name = name
+        self.load = load
+        self.upload = upload
+        self.deps = tuple(deps)
+        self.state = "queued"     # queued -> loading -> uploading -> ready
+        self.future = None        # Pending load
+        self.steps = None         # Running upload generator
+        self.result = None
+        self.times = {}           # Timeline stamps (perf_counter seconds)
+
+class AssetLoader:
+    def __init__(self, workers=WORKERS, upload_budget_ms=2.0):
+        self.upload_budget = upload_budget_ms / 1000.0   # Seconds of uploads per pump()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asset")
+        self._assets = {}         # Name -> _Asset, in registration order
+        self._uploads = []        # Assets with uploads left, in the order they became ready to upload
+        self._marks = []          # (label, perf_counter) events for the report
+        self.start = time.perf_counter()
+
+    def add(self, name, load=None, upload=None, deps=()):
+        if name in self._assets:
+            raise ValueError(f"Asset {name!r} already added")
+        missing = [dep for dep in deps if dep not in self._assets]
+        if missing:
+            raise ValueError(f"Asset {name!r} depends on unknown assets {missing}")   # Also rules out cycles
+        asset = _Asset(name, load, upload, deps)
+        asset.times["queued"] = time.perf_counter()
+        self._assets[name] = asset
+        self._start_ready()       # Loads start right away, not at the next pump
+        return name
+
+    def _dep_results(self, asset):
+        return [self._assets[dep].result for dep in asset.deps]
+
+    def _start_ready(self):
+        # Start loads (or queue uploads) of assets whose dependencies are all ready
+        for asset in self._assets.values():
+            if asset.state != "queued" or any(self._assets[dep].state != "ready" for dep in asset.deps):
+                continue
+            if asset.load is not None:
+                asset.state = "loading"
+                asset.future = self._pool.submit(self._run_load, asset, self._dep_results(asset))
+            else:
+                self._loaded(asset, None)
+
+    def _run_load(self, asset, dep_results):
+        asset.times["load start"] = time.perf_counter()   # Worker thread
+        try:
+            return asset.load(*dep_results)
+        finally:
+            asset.times["load end"] = time.perf_counter()
+
+    def _loaded(self, asset, value):
+        if asset.upload is None:
+            self._ready(asset, value)
+        else:
+            asset.state = "uploading"
+            asset.result = value          # Passed to upload when it starts
+            self._uploads.append(asset)
+
+    def _ready(self, asset, result):
+        asset.state = "ready"
+        asset.result = result
+        asset.times["ready"] = time.perf_counter()
+
+    def _collect(self):
+        # Pick up finished loads; a load's exception is raised here, on the render thread
+        for asset in self._assets.values():
+            if asset.state == "loading" and asset.future.done():
+                value = asset.future.result()
+                asset.future = None
+                self._loaded(asset, value)
+
+    def _upload_step(self, asset):
+        # Run one slice of asset's upload; returns False if it yielded PENDING
+        if asset.steps is None:
+            asset.times["upload start"] = time.perf_counter()
+            value = asset.upload(asset.result, *self._dep_results(asset))
+            if not hasattr(value, "send"):
+                self._uploads.remove(asset)           # Plain function: done in one go
+                self._ready(asset, value)
+                return True
+            asset.steps = value
+        try:
+            return next(asset.steps) is not PENDING
+        except StopIteration as done:
+            asset.steps = None
+            self._uploads.remove(asset)
+            self._ready(asset, done.value)
+            return True
+
+    def pump(self, budget_s=None):
+        # Render thread, once per frame: start loads whose dependencies are ready and run upload
+        # slices until the budget is used up (a slice in progress is never cut short). Returns the
+        # number of assets that became ready.
+        deadline = time.perf_counter() + (self.upload_budget if budget_s is None else budget_s)
+        ready_before = sum(asset.state == "ready" for asset in self._assets.values())
+        self._collect()
+        self._start_ready()
+        waiting = set()           # Uploads that yielded PENDING during this pump
+        while time.perf_counter() < deadline:
+            asset = next((a for a in self._uploads if a.name not in waiting), None)
+            if asset is None:
+                break
+            if not self._upload_step(asset):
+                waiting.add(asset.name)
+            elif asset.state == "ready":
+                self._start_ready()                   # Dependents may start loading now
+        return sum(asset.state == "ready" for asset in self._assets.values()) - ready_before
+
+    def finish(self, *names):
+        # Block until the named assets (default: all) are ready
+        names = names or tuple(self._assets)
+        while not self.ready(*names):
+            for asset in self._assets.values():
+                if asset.state == "loading":
+                    asset.future.exception()          # Wait for the load without spinning
+                    break
+            self.pump(budget_s=1.0)
+
+    def ready(self, *names):
+        return all(self._assets[name].state == "ready" for name in names)
+
+    def result(self, name):
+        asset = self._assets[name]
+        if asset.state != "ready":
+            raise RuntimeError(f"Asset {name!r} is not ready ({asset.state})")
+        return asset.result
+
+    def mark(self, label):
+        # Record a startup event (e.g. "first frame") for the report
+        self._marks.append((label, time.perf_counter()))
+
+    def report(self):
+        # Startup timeline in milliseconds since the loader was created
+        def ms(t):
+            return "-" if t is None else f"{(t - self.start) * 1000.0:.1f}"
+        columns = ("queued", "load start", "load end", "upload start", "ready")
+        width = max([len(name) for name in self._assets] + [len(label) for label, _ in self._marks] + [5])
+        lines = ["%-*s %s" % (width, "asset", " ".join("%12s" % column for column in columns))]
+        for name, asset in self._assets.items():
+            lines.append("%-*s %s" % (width, name, " ".join("%12s" % ms(asset.times.get(c)) for c in columns)))
+        for label, t in self._marks:
+            lines.append("%-*s %12s" % (width, label, ms(t)))
+        return "\n".join(lines)
+
+    def delete(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._uploads = []
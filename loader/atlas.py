@@ -0,0 +1,134 @@
+from OpenGL.GL import *  # OpenGL functions/constants
+import numpy as np       # NumPy for pixel and vertex arrays
+
+from loader.mesh_optimizer import narrow_indices, FLOATS_PER_VERTEX   # Index width for merged meshes
+from loader.gl_state import state                                     # Tracked texture binds
+
+# Two ways to draw differently textured objects without a texture bind per object:
+#   - atlas: images packed into one 2D texture, mesh UVs remapped into their rectangle, meshes merged
+#     into one vertex/index buffer -> one draw for all of them (UVs must stay within 0..1)
+#   - texture array: images as layers of one GL_TEXTURE_2D_ARRAY, the layer chosen per instance
+#     (Scene add_node(layer=...)) -> one instanced draw per mesh, wrapping (GL_REPEAT) still works
+
+PADDING = 8              # Gutter around each atlas image in pixels (power of two); also limits the mip levels
+
+def load_image(path, channels=3):
+    # Bottom row first (OpenGL order) uint8 pixels with 3 (RGB) or 4 (RGBA) channels
+    from PIL import Image   # Pillow only when an image is decoded
+    image = Image.open(path).convert("RGBA" if channels == 4 else "RGB").transpose(Image.FLIP_TOP_BOTTOM)
+    return np.asarray(image)
+
+def pack_rects(sizes, max_width=4096, align=1):
+    # Shelf packing: rectangles sorted by height, placed left to right on shelves as tall as their
+    # first rectangle. Sizes are rounded up to `align`. Returns ((N, 2) x/y positions, width, height).
+    sizes = (np.asarray(sizes, dtype=np.int64) + align - 1) // align * align
+    area = int((sizes[:, 0] * sizes[:, 1]).sum())
+    width = 1 << int(np.ceil(np.log2(max(np.sqrt(area), sizes[:, 0].max(), 1))))   # Square-ish, power of two
+    if width > max_width:
+        raise ValueError(f"Images don't fit in a {max_width} pixel wide atlas")
+
+    positions = np.zeros((len(sizes), 2), dtype=np.int64)
+    x = y = shelf = 0
+    for i in np.argsort(-sizes[:, 1], kind="stable"):
+        w, h = sizes[i]
+        if x + w > width:          # Start a new shelf
+            x, y, shelf = 0, y + shelf, 0
+        positions[i] = (x, y)
+        x += w
+        shelf = max(shelf, h)
+    height = (y + shelf + align - 1) // align * align
+    return positions, width, int(height)
+
+def build_atlas(images, padding=PADDING, max_width=4096):
+    # Pack (H, W, C) images into one atlas. Each image is surrounded by `padding` pixels of its own
+    # edge texels and starts on a multiple of `padding`, so mip level k of the atlas still has
+    # padding / 2**k pixels of gutter: bilinear/trilinear sampling never reaches a neighbour down to
+    # level log2(padding). Returns (atlas pixels, (N, 4) UV rectangles u0, v0, u1, v1).
+    channels = max(image.shape[2] for image in images)
+    sizes = [(image.shape[1] + 2 * padding, image.shape[0] + 2 * padding) for image in images]
+    positions, width, height = pack_rects(sizes, max_width, align=padding)
+
+    atlas = np.zeros((height, width, channels), dtype=np.uint8)
+    if channels == 4:
+        atlas[..., 3] = 255
+    rects = np.zeros((len(images), 4))
+    for i, (image, (x, y)) in enumerate(zip(images, positions)):
+        h, w = image.shape[:2]
+        padded = np.pad(image, ((padding, padding), (padding, padding), (0, 0)), mode="edge")
+        atlas[y:y + h + 2 * padding, x:x + w + 2 * padding, :image.shape[2]] = padded
+        rects[i] = ((x + padding) / width, (y + padding) / height,
+                    (x + padding + w) / width, (y + padding + h) / height)
+    return atlas, rects
+
+def remap_uvs(vertices, rect, floats_per_vertex=FLOATS_PER_VERTEX):
+    # Copy of (x, y, z, u, v) vertices with UVs moved into an atlas rectangle
+    vertices = np.array(vertices, dtype=np.float32).reshape(-1, floats_per_vertex)
+    uv = vertices[:, 3:5]
+    if len(uv) and (uv.min() < -1e-4 or uv.max() > 1 + 1e-4):
+        raise ValueError("Mesh UVs leave 0..1 (texture wrapping); use a texture array layer instead of an atlas")
+    rect = np.asarray(rect, dtype=np.float32)
+    vertices[:, 3:5] = rect[:2] + np.clip(uv, 0, 1) * (rect[2:] - rect[:2])
+    return vertices.reshape(-1)
+
+def merge_meshes(meshes, floats_per_vertex=FLOATS_PER_VERTEX):
+    # One vertex/index buffer from [(vertices, indices), ...]; indices are offset to the merged vertices
+    vertices, indices = [], []
+    base = 0
+    for mesh_vertices, mesh_indices in meshes:
+        vertices.append(np.asarray(mesh_vertices, dtype=np.float32).reshape(-1))
+        indices.append(np.asarray(mesh_indices, dtype=np.uint32) + base)
+        base += len(vertices[-1]) // floats_per_vertex
+    return np.concatenate(vertices), narrow_indices(np.concatenate(indices), base)
+
+def create_atlas_texture(atlas, padding=PADDING):
+    # Upload an atlas with mip levels limited to what the gutters protect
+    height, width, channels = atlas.shape
+    levels = min(int(np.log2(padding)), int(np.log2(max(width, height)))) + 1
+    internal_format, pixel_format = (GL_RGBA8, GL_RGBA) if channels == 4 else (GL_RGB8, GL_RGB)
+    texture = glGenTextures(1)
+    state.bind_texture(GL_TEXTURE_2D, texture)
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+    if bool(glTexStorage2D):
+        glTexStorage2D(GL_TEXTURE_2D, levels, internal_format, width, height)
+        glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, width, height, pixel_format, GL_UNSIGNED_BYTE, atlas)
+    else:
+        glTexImage2D(GL_TEXTURE_2D, 0, internal_format, width, height, 0, pixel_format, GL_UNSIGNED_BYTE, atlas)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAX_LEVEL, levels - 1)
+    glGenerateMipmap(GL_TEXTURE_2D)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)   # Rectangles never wrap
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    return texture
+
+def create_texture_array(images, size=None):
+    # GL_TEXTURE_2D_ARRAY with one layer per image; images are resized to `size` (default: the largest)
+    if size is None:
+        size = (max(image.shape[1] for image in images), max(image.shape[0] for image in images))
+    width, height = size
+    channels = max(image.shape[2] for image in images)
+    internal_format, pixel_format = (GL_RGBA8, GL_RGBA) if channels == 4 else (GL_RGB8, GL_RGB)
+    levels = int(np.log2(max(width, height))) + 1
+
+    texture = glGenTextures(1)
+    state.bind_texture(GL_TEXTURE_2D_ARRAY, texture)
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+    if bool(glTexStorage3D):
+        glTexStorage3D(GL_TEXTURE_2D_ARRAY, levels, internal_format, width, height, len(images))
+    else:
+        glTexImage3D(GL_TEXTURE_2D_ARRAY, 0, internal_format, width, height, len(images), 0,
+                     pixel_format, GL_UNSIGNED_BYTE, None)
+    for layer, image in enumerate(images):
+        if image.shape[1] != width or image.shape[0] != height:
+            from PIL import Image
+            image = np.asarray(Image.fromarray(image).resize((width, height), Image.LANCZOS))
+        if image.shape[2] != channels:
+            image = np.concatenate([image, np.full(image.shape[:2] + (1,), 255, dtype=np.uint8)], axis=2)
+        glTexSubImage3D(GL_TEXTURE_2D_ARRAY, 0, 0, 0, layer, width, height, 1, pixel_format, GL_UNSIGNED_BYTE,
+                        np.ascontiguousarray(image))
+    glGenerateMipmap(GL_TEXTURE_2D_ARRAY)
+    glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_WRAP_S, GL_REPEAT)
+    glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_WRAP_T, GL_REPEAT)
+    glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    return texture
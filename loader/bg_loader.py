@@ -1,7 +1,10 @@
-import cv2                  # OpenCV for video capture and frame processing
+import os                   # Background video file check
 import numpy as np          # NumPy for array handling
 from OpenGL.GL import *     # OpenGL functions/constants
 import ctypes               # For pointer arithmetic in OpenGL buffer setup
+from loader import config    # Background video settings
+from loader.shader_manager import get_program   # Cached, error-checked shader programs
+from loader.gl_state import state                # Tracked binds (skips redundant ones)
 
 # Vertex shader for rendering a textured fullscreen quad (background video)
 bg_vertex_shader = """
@@ -27,22 +30,14 @@ void main() {
 """
 
 def create_bg_shader_program():
-    vs = glCreateShader(GL_VERTEX_SHADER)     # Create vertex shader object
-    fs = glCreateShader(GL_FRAGMENT_SHADER)   # Create fragment shader object
-    glShaderSource(vs, bg_vertex_shader)      # Attach vertex shader source code
-    glShaderSource(fs, bg_fragment_shader)    # Attach fragment shader source code
-    glCompileShader(vs)                        # Compile vertex shader
-    glCompileShader(fs)                        # Compile fragment shader
-
-    program = glCreateProgram()                # Create shader program
-    glAttachShader(program, vs)                # Attach vertex shader to program
-    glAttachShader(program, fs)                # Attach fragment shader to program
-    glLinkProgram(program)                     # Link program (create executable)
-    glDeleteShader(vs)                         # Delete vertex shader object (no longer needed)
-    glDeleteShader(fs)                         # Delete fragment shader object (no longer needed)
-    return program                             # Return the linked shader program ID
-
-def create_bg_quad():
+    # Background quad program through the shader cache (compile/link errors raise RuntimeError);
+    # the sampler is bound to texture unit 0 once here instead of every frame
+    program = get_program(bg_vertex_shader, bg_fragment_shader, label="background shader")
+    state.use_program(program.id)
+    glUniform1i(program.uniform("backgroundTexture"), 0)   # Sampler reads texture unit 0
+    return program.id                          # Return the linked shader program ID
+
+def create_bg_quad(flip_v=True):
     # Define vertices for two triangles forming a fullscreen quad
     # Each vertex has 2D position followed by 2D texture coordinates
     quad_vertices = np.array([
@@ -54,12 +49,16 @@ def create_bg_quad():
          1.0, -1.0,   1.0, 0.0,  # Bottom-right (again)
          1.0,  1.0,   1.0, 1.0,  # Top-right
     ], dtype=np.float32)
+    if flip_v:
+        # Video frames are uploaded top row first (as decoded), so sample them upside down
+        # instead of flipping every frame on the CPU
+        quad_vertices[3::4] = 1.0 - quad_vertices[3::4]
 
     VAO = glGenVertexArrays(1)    # Generate vertex array object
     VBO = glGenBuffers(1)         # Generate vertex buffer object
 
-    glBindVertexArray(VAO)        # Bind VAO to record vertex attribute configuration
-    glBindBuffer(GL_ARRAY_BUFFER, VBO)    # Bind VBO as the current array buffer
+    state.bind_vertex_array(VAO)  # Bind VAO to record vertex attribute configuration
+    state.bind_buffer(GL_ARRAY_BUFFER, VBO)   # Bind VBO as the current array buffer
     glBufferData(GL_ARRAY_BUFFER, quad_vertices.nbytes, quad_vertices, GL_STATIC_DRAW)  # Upload vertex data
 
     # Enable vertex attribute 0 for position (2 floats)
@@ -70,33 +69,156 @@ def create_bg_quad():
     glEnableVertexAttribArray(1)
     glVertexAttribPointer(1, 2, GL_FLOAT, GL_FALSE, 4 * quad_vertices.itemsize, ctypes.c_void_p(2 * quad_vertices.itemsize))
 
-    glBindVertexArray(0)          # Unbind VAO to avoid accidental modifications
+    state.bind_vertex_array(0)    # Unbind VAO to avoid accidental modifications
     return VAO, VBO              # Return VAO and VBO handles for use in rendering
 
-def init_video_texture():
+def open_video_source(path=None):
+    # Frame source for the background: decode on a worker thread, replay a pre-baked frame cache,
+    # or ("shared:<name>") attach to frames another process publishes. All return BGR frames from
+    # latest_frame() and are released with close().
+    # OpenCV is only imported (by these modules) when there is a video to decode
+    path = path or config.BG_VIDEO
+    if path and path.startswith("shared:"):
+        from loader.shared_video import SharedVideoSource
+        return SharedVideoSource(path[len("shared:"):])
+    if not path:
+        return NoVideo()
+    if not os.path.exists(path):
+        print(f"Warning: background video {path!r} not found, the background stays black")
+        return NoVideo()
+    if config.VIDEO_PREBAKE:
+        from loader.frame_cache import FrameCachePlayer
+        return FrameCachePlayer(path, config.VIDEO_PREBAKE_DOWNSCALE)
+    from loader.video_decoder import VideoDecoder
+    return VideoDecoder(path)
+
+class NoVideo:
+    # Frame source without a video (config.BG_VIDEO unset or missing): the background stays black
+    width = height = 2
+
+    def latest_frame(self):
+        return None
+
+    def stats(self):
+        return {}
+
+    def close(self):
+        pass
+
+def init_video_texture(width, height):
     tex_id = glGenTextures(1)            # Generate a texture ID
-    glBindTexture(GL_TEXTURE_2D, tex_id) # Bind the texture as 2D texture
+    state.bind_texture(GL_TEXTURE_2D, tex_id)   # Bind the texture as 2D texture
 
     # Set texture filtering parameters to linear for smooth scaling
     glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
     glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+
+    # Allocate storage once; frames are streamed into it with glTexSubImage2D
+    if bool(glTexStorage2D):
+        glTexStorage2D(GL_TEXTURE_2D, 1, GL_RGB8, width, height)   # Immutable storage (GL 4.2 / ARB_texture_storage)
+    else:
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB8, width, height, 0, GL_BGR, GL_UNSIGNED_BYTE, None)
 
-    glBindTexture(GL_TEXTURE_2D, 0)      # Unbind texture to prevent accidental modification
     return tex_id                        # Return texture ID for use in uploading frames
 
 def update_video_texture(cap, texture_id):
+    import cv2                           # Only needed with a capture open, which already loaded it
     ret, frame = cap.read()              # Read next frame from video capture
     if not ret:
         cap.set(cv2.CAP_PROP_POS_FRAMES, 0)  # If at end, reset to first frame to loop video
         ret, frame = cap.read()
-    # Convert BGR (OpenCV default) to RGB for OpenGL
-    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    frame = cv2.flip(frame, 0)           # Flip vertically to match OpenGL texture coords
-
     height, width, _ = frame.shape       # Get frame dimensions
 
-    glBindTexture(GL_TEXTURE_2D, texture_id)   # Bind video texture
-    # Upload the frame as a texture image
-    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, width, height,
-                 0, GL_RGB, GL_UNSIGNED_BYTE, frame)
-    glBindTexture(GL_TEXTURE_2D, 0)      # Unbind texture after updating
+    state.bind_texture(GL_TEXTURE_2D, texture_id)   # Bind video texture
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)      # BGR rows are not 4-byte aligned in general
+    # Upload the BGR frame as-is into the preallocated texture (create_bg_quad flips it)
+    glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, width, height, GL_BGR, GL_UNSIGNED_BYTE, frame)
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
+
+def upload_video_frame(video, stream, frame):
+    # Upload a frame from video.latest_frame(); returns the bytes uploaded. Shared frames can be
+    # rewritten by their publisher while being copied, so those are verified afterwards and the
+    # newest frame is uploaded instead if that happened
+    uploaded = 0
+    while frame is not None:
+        stream.upload(frame)
+        uploaded += frame.nbytes
+        verify = getattr(video, "verify", None)
+        frame = verify(frame) if verify is not None else None
+    return uploaded
+
+class VideoTextureStream:
+    # Streams BGR video frames into an immutable texture through two pixel-buffer objects.
+    # The CPU copies frame N into one PBO while the GPU is still pulling frame N-1 out of the other,
+    # so glTexSubImage2D returns immediately and the transfer overlaps rendering.
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.size = width * height * 3
+        self.texture = init_video_texture(width, height)
+        self.pbos = list(glGenBuffers(2))
+        self.index = 0
+
+        # Persistently mapped PBOs (GL 4.4 / ARB_buffer_storage) skip the map/unmap per frame;
+        # a fence per PBO keeps the CPU from overwriting data the GPU has not consumed yet
+        self.persistent = bool(glBufferStorage) and bool(glFenceSync)
+        self.mapped = [None, None]
+        self.fences = [None, None]
+        flags = GL_MAP_WRITE_BIT | GL_MAP_PERSISTENT_BIT | GL_MAP_COHERENT_BIT
+        for i, pbo in enumerate(self.pbos):
+            state.bind_buffer(GL_PIXEL_UNPACK_BUFFER, pbo)
+            if self.persistent:
+                glBufferStorage(GL_PIXEL_UNPACK_BUFFER, self.size, None, flags)
+                self.mapped[i] = self._as_frame(glMapBufferRange(GL_PIXEL_UNPACK_BUFFER, 0, self.size, flags))
+            else:
+                glBufferData(GL_PIXEL_UNPACK_BUFFER, self.size, None, GL_STREAM_DRAW)
+        state.bind_buffer(GL_PIXEL_UNPACK_BUFFER, 0)
+
+    def _as_frame(self, pointer):
+        # Wrap a mapped buffer pointer as a (height, width, 3) uint8 array without copying
+        address = pointer if isinstance(pointer, int) else ctypes.cast(pointer, ctypes.c_void_p).value
+        buffer = (ctypes.c_ubyte * self.size).from_address(address)
+        return np.frombuffer(buffer, dtype=np.uint8).reshape(self.height, self.width, 3)
+
+    def upload(self, frame):
+        i = self.index
+        self.index ^= 1                  # Alternate PBOs every frame
+        state.bind_buffer(GL_PIXEL_UNPACK_BUFFER, self.pbos[i])
+
+        if self.persistent:
+            if self.fences[i] is not None:
+                # Normally already signalled (two frames old); waits only if the GPU is far behind
+                glClientWaitSync(self.fences[i], GL_SYNC_FLUSH_COMMANDS_BIT, 1000000000)
+                glDeleteSync(self.fences[i])
+            np.copyto(self.mapped[i], frame)   # The only CPU copy: decoder buffer -> pinned GPU-visible memory
+        else:
+            # Orphan the old storage so the driver never makes us wait for the previous transfer
+            glBufferData(GL_PIXEL_UNPACK_BUFFER, self.size, None, GL_STREAM_DRAW)
+            pointer = glMapBufferRange(GL_PIXEL_UNPACK_BUFFER, 0, self.size,
+                                       GL_MAP_WRITE_BIT | GL_MAP_INVALIDATE_BUFFER_BIT)
+            np.copyto(self._as_frame(pointer), frame)
+            glUnmapBuffer(GL_PIXEL_UNPACK_BUFFER)
+
+        state.bind_texture(GL_TEXTURE_2D, self.texture)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)      # BGR rows are not 4-byte aligned in general
+        # Source is the bound PBO (offset 0), so this call only queues a GPU-side copy
+        glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, self.width, self.height, GL_BGR, GL_UNSIGNED_BYTE,
+                        ctypes.c_void_p(0))
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
+        if self.persistent:
+            self.fences[i] = glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+        state.bind_buffer(GL_PIXEL_UNPACK_BUFFER, 0)   # Other pixel uploads read client memory
+
+    def delete(self):
+        for i, pbo in enumerate(self.pbos):
+            if self.fences[i] is not None:
+                glDeleteSync(self.fences[i])
+            if self.persistent:
+                state.bind_buffer(GL_PIXEL_UNPACK_BUFFER, pbo)
+                glUnmapBuffer(GL_PIXEL_UNPACK_BUFFER)
+        state.bind_buffer(GL_PIXEL_UNPACK_BUFFER, 0)
+        self.mapped = [None, None]
+        state.delete_buffers(self.pbos)
+        state.delete_textures([self.texture])
@@ -1,4 +1,42 @@
 DISPLAY_WIDTH = 950
 DISPLAY_HEIGHT = 750
 FPS = 60
+RENDER_MODE = "capped"   # "capped" (limit to FPS), "vsync", "adaptive" (vsync that tears when late), "uncapped"
+SIM_RATE = 120           # Fixed simulation rate (Hz) for camera motion and auto tour timing
 BACKGROUND_COLOR = (0, 0, 0, 1)  # Black background
+
+CASTLE_VERTICES = "source/castle_vertices.txt"   # Castle mesh: x, y, z, u, v per line
+CASTLE_INDICES = "source/castle_indices.txt"     # Castle mesh: triangle indices
+CASTLE_TEXTURE = "source/castle.jpg"             # Castle texture image
+SHADER_CACHE_DIR = "source/shader_cache"         # Linked program binaries (None = compile every launch)
+TEXTURE_COMPRESSION = "auto"     # Cached texture format: "auto" (BC1 where supported), "bc1", "etc2", None (RGB8)
+TEXTURE_UPLOAD_BUDGET_MS = 2.0   # Main-thread texture upload time per TextureCache.pump()
+ASSET_WORKERS = 4                # Startup loader threads (mesh parsing, sound and music file reads)
+ASSET_UPLOAD_BUDGET_MS = 2.0     # Main-thread startup upload time per AssetLoader.pump()
+FRUSTUM_CULLING = True           # Skip instances and mesh chunks outside the view frustum
+CULL_CHUNK_TRIANGLES = 512       # Maximum triangles per culling chunk (BVH leaf)
+LOD = True                       # Generate simplified levels of detail and pick them by projected size
+LOD_SCREEN_SIZES = (200, 90, 40) # Projected radius (pixels) below which LOD 1, 2, 3 are used
+CAMERA_TOUR = None               # Auto mode tour file (see loader/tour.py); None = built-in views tour
+TOUR_BLEND_MS = 1000             # Blend from the manual camera into the tour when auto mode is resumed
+BG_VIDEO = "source/bg5.mp4"      # Looping background video, or "shared:<name>" (see loader/shared_video.py)
+VIDEO_PREBAKE = False            # Decode the video once into a memory-mapped frame cache and replay it
+VIDEO_PREBAKE_DOWNSCALE = True   # Downscale baked frames to the display size
+VIDEO_CACHE_BUDGET_MB = 256      # RAM budget for baked frames kept resident (the clip's first frames); 0 = read from the mapping
+
+GL_DEBUG = False                 # PyOpenGL per-call error checking/logging (slow; production runs keep it off)
+RENDER_ON_DEMAND = True          # Cache the rendered scene in an offscreen layer; redraw only when the camera moves
+LAYER_EPSILON = 1e-4             # Matrix change below which the cached scene layer is reused
+DYNAMIC_RESOLUTION = False       # Render the scene at a reduced scale when frames go over budget
+RENDER_SCALE_TARGET_MS = 14.0    # Frame time budget the render scale is adjusted to (60 FPS with headroom)
+RENDER_SCALE_MIN = 0.5           # Render scale bounds (fraction of the window size per axis)
+RENDER_SCALE_MAX = 1.0
+RENDER_SCALE_HYSTERESIS = 0.08   # Scale difference needed before the render scale changes
+RENDER_SCALE_SHARPNESS = 0.4     # Sharpening of the upscaled scene (0 = plain bilinear)
+RENDER_INDIRECT = True           # Submit the scene with glMultiDrawElementsIndirect where available (GL 4.3)
+
+PROFILE = True                   # Per-stage frame timing (CPU + GL timer queries)
+PROFILE_GPU = True               # Use GL_TIME_ELAPSED queries where supported
+PROFILE_HUD = None               # "caption" (window title), "console", or None
+PROFILE_HUD_INTERVAL = 1000      # Milliseconds between HUD updates
+PROFILE_TRACE = None             # Export path on exit: .json (Chrome trace) or .csv, None to disable
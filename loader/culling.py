@@ -0,0 +1,119 @@
+import numpy as np       # NumPy for vectorized bounding box tests
+
+# View frustum culling: meshes are split into spatial chunks (contiguous triangle ranges in the
+# index buffer) organised as a bounding volume hierarchy. Each frame the hierarchy is tested
+# against the frustum planes level by level, whole levels at a time, and the visible triangle
+# ranges are drawn with one glMultiDrawElements call.
+
+OUTSIDE, INTERSECTS, INSIDE = 0, 1, 2
+LEAF_TRIANGLES = 512     # Default maximum triangles per chunk
+
+def frustum_planes(matrix):
+    # Gribb/Hartmann: the six clip planes (a, b, c, d) of a projection * view (* model) matrix
+    # given as a row-major NumPy array (clip = matrix @ point); normals point into the frustum
+    m = np.asarray(matrix, dtype=np.float64)
+    planes = np.array([m[3] + m[0], m[3] - m[0],    # Left, right
+                       m[3] + m[1], m[3] - m[1],    # Bottom, top
+                       m[3] + m[2], m[3] - m[2]])   # Near, far
+    return planes / np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+
+def classify_boxes(center, extent, planes):
+    # OUTSIDE / INTERSECTS / INSIDE for axis-aligned boxes given by center and half extent.
+    # Broadcasts: (N, 3) boxes against (6, 4) planes, or one (3,) box against (N, 6, 4) plane sets.
+    distance = (planes[..., :3] @ center[..., None])[..., 0] + planes[..., 3]
+    radius = (np.abs(planes[..., :3]) @ extent[..., None])[..., 0]
+    result = np.full(distance.shape[:-1], INTERSECTS, dtype=np.int8)
+    result[(distance >= radius).all(axis=-1)] = INSIDE
+    result[(distance < -radius).any(axis=-1)] = OUTSIDE
+    return result
+
+class BVH:
+    # Binary hierarchy over triangle ranges of one index buffer, stored breadth first in flat arrays.
+    # Every node covers the contiguous triangle range [start, end), so a fully visible subtree is
+    # drawn as one range.
+    def __init__(self, center, extent, start, end, children, leaf_count, index_size):
+        self.center = center          # (N, 3) box centers
+        self.extent = extent          # (N, 3) box half extents
+        self.start = start            # (N,) first triangle
+        self.end = end                # (N,) one past the last triangle
+        self.children = children      # (N, 2) child node indices, -1 for leaves
+        self.leaf_count = leaf_count  # (N,) chunks in the subtree
+        self.index_size = index_size  # Bytes per index, for buffer offsets
+        self.chunks = int(leaf_count[0])
+
+    def visible_ranges(self, planes):
+        # Returns (byte offsets, index counts) of the visible triangle ranges, merged where adjacent,
+        # and the number of chunks they contain
+        accepted = []
+        frontier = np.zeros(1, dtype=np.int64)
+        while len(frontier):
+            result = classify_boxes(self.center[frontier], self.extent[frontier], planes)
+            leaf = self.children[frontier, 0] < 0
+            accepted.append(frontier[(result == INSIDE) | ((result == INTERSECTS) & leaf)])
+            frontier = self.children[frontier[(result == INTERSECTS) & ~leaf]].ravel()
+
+        nodes = np.concatenate(accepted)
+        if len(nodes) == 0:
+            return np.zeros(0, dtype=np.uintp), np.zeros(0, dtype=np.int32), 0
+        nodes = nodes[np.argsort(self.start[nodes])]
+        start, end = self.start[nodes], self.end[nodes]
+        run = np.flatnonzero(np.r_[True, start[1:] != end[:-1]])   # Ranges that don't continue the previous one
+        first = start[run]
+        last = end[np.r_[run[1:] - 1, len(nodes) - 1]]
+        offsets = (first * 3 * self.index_size).astype(np.uintp)
+        counts = ((last - first) * 3).astype(np.int32)
+        return offsets, counts, int(self.leaf_count[nodes].sum())
+
+def build_bvh(vertices, indices, leaf_triangles=LEAF_TRIANGLES, floats_per_vertex=5):
+    # Split the mesh into chunks of at most leaf_triangles triangles by recursive median splits along
+    # the longest axis of the triangle centroids. Returns the index buffer reordered so every node
+    # is a contiguous range (triangles keep their relative order inside a chunk, so vertex cache
+    # optimization survives) and the BVH.
+    positions = vertices.reshape(-1, floats_per_vertex)[:, :3]
+    triangles = indices.reshape(-1, 3)
+    corners = positions[triangles]                    # (T, 3 corners, xyz)
+    tri_min = corners.min(axis=1)
+    tri_max = corners.max(axis=1)
+    centroid = (tri_min + tri_max) * 0.5
+
+    order = np.arange(len(triangles))
+    nodes = []                                        # [start, end, child0, child1] breadth first
+    queue = [(0, len(triangles))]
+    head = 0
+    while head < len(queue):
+        start, end = queue[head]
+        node = [start, end, -1, -1]
+        nodes.append(node)
+        head += 1
+        if end - start <= leaf_triangles:
+            continue
+        segment = order[start:end]
+        axis = int(np.argmax(np.ptp(centroid[segment], axis=0)))
+        half = (end - start) // 2
+        lower = np.zeros(end - start, dtype=bool)
+        lower[np.argpartition(centroid[segment, axis], half)[:half]] = True
+        order[start:end] = np.concatenate([segment[lower], segment[~lower]])   # Stable within each side
+        node[2], node[3] = len(queue), len(queue) + 1
+        queue.append((start, start + half))
+        queue.append((start + half, end))
+
+    nodes = np.array(nodes, dtype=np.int64)
+    start, end, children = nodes[:, 0], nodes[:, 1], nodes[:, 2:]
+    reordered = np.ascontiguousarray(triangles[order].ravel())
+
+    # Bounds and chunk counts bottom-up (children always come after their parent)
+    box_min = np.empty((len(nodes), 3))
+    box_max = np.empty((len(nodes), 3))
+    leaf_count = np.ones(len(nodes), dtype=np.int64)
+    for i in range(len(nodes) - 1, -1, -1):
+        if children[i, 0] < 0:
+            box_min[i] = tri_min[order[start[i]:end[i]]].min(axis=0)
+            box_max[i] = tri_max[order[start[i]:end[i]]].max(axis=0)
+        else:
+            box_min[i] = np.minimum(box_min[children[i, 0]], box_min[children[i, 1]])
+            box_max[i] = np.maximum(box_max[children[i, 0]], box_max[children[i, 1]])
+            leaf_count[i] = leaf_count[children[i]].sum()
+
+    bvh = BVH((box_min + box_max) * 0.5, (box_max - box_min) * 0.5, start, end, children, leaf_count,
+              indices.dtype.itemsize)
+    return reordered.astype(indices.dtype, copy=False), bvh
@@ -0,0 +1,183 @@
+import argparse          # Command line parsing for the offline bake tool
+import os                # Path and file stat helpers
+import struct            # Binary header packing
+import sys               # Exit codes for the command line tool
+import time              # Playback clock
+import cv2               # OpenCV for the one-time decode
+import numpy as np       # NumPy for memory-mapped frames
+
+from loader import config   # Display size and cache budget
+
+# Raw frame cache layout (little endian):
+#   header padded to DATA_OFFSET bytes (see HEADER_FORMAT)
+#   frame_count frames of height * width * 3 uint8 BGR pixels, top row first (as decoded)
+MAGIC = b"CSTLFRMS"
+VERSION = 1
+HEADER_FORMAT = "<8s4Id16s"   # magic, version, width, height, frame count, fps, source key
+DATA_OFFSET = 4096            # Page aligned start of the frame data (later frames are aligned only if their size is)
+CACHE_SUFFIX = ".frames"
+
+def cache_path_for(video_path, size=None):
+    # source/bg5.mp4 -> source/bg5.frames, or source/bg5.950x750.frames when downscaled
+    base = os.path.splitext(video_path)[0]
+    if size is not None:
+        base += ".%dx%d" % size
+    return base + CACHE_SUFFIX
+
+def _source_key(video_path):
+    st = os.stat(video_path)
+    return struct.pack("<qq", st.st_mtime_ns, st.st_size)
+
+def display_size(width, height):
+    # Downscale target: the configured window size, but never upscale
+    if width <= config.DISPLAY_WIDTH and height <= config.DISPLAY_HEIGHT:
+        return None
+    return (min(width, config.DISPLAY_WIDTH), min(height, config.DISPLAY_HEIGHT))
+
+def read_header(path):
+    with open(path, "rb") as f:
+        raw = f.read(struct.calcsize(HEADER_FORMAT))
+    if len(raw) < struct.calcsize(HEADER_FORMAT):
+        return None
+    magic, version, width, height, count, fps, key = struct.unpack(HEADER_FORMAT, raw)
+    if magic != MAGIC or version != VERSION or count == 0:
+        return None   # Foreign, outdated or unfinished bake
+    return {"width": width, "height": height, "frame_count": count, "fps": fps, "source_key": key}
+
+def bake_frames(video_path, cache_path=None, size=None):
+    # Decode the whole clip once into a raw frame file that playback can memory-map
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video: {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cache_path = cache_path or cache_path_for(video_path, size)
+
+    tmp_path = cache_path + ".tmp"
+    count = 0
+    width = height = 0
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * DATA_OFFSET)   # Header is written once the frame count is known
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if size is not None:
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            height, width, _ = frame.shape
+            f.write(np.ascontiguousarray(frame).data)
+            count += 1
+        f.seek(0)
+        f.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, width, height, count, fps, _source_key(video_path)))
+    cap.release()
+    if count == 0:
+        os.remove(tmp_path)
+        raise RuntimeError(f"No frames decoded from {video_path}")
+    os.replace(tmp_path, cache_path)
+    return cache_path
+
+def open_frames(video_path, cache_path=None, size=None):
+    # Memory-map a baked clip, (re)baking it first if missing or older than the video
+    cache_path = cache_path or cache_path_for(video_path, size)
+    header = read_header(cache_path) if os.path.exists(cache_path) else None
+    if header is None or header["source_key"] != _source_key(video_path):
+        bake_frames(video_path, cache_path, size)
+        header = read_header(cache_path)
+    frames = np.memmap(cache_path, dtype=np.uint8, mode="r", offset=DATA_OFFSET,
+                       shape=(header["frame_count"], header["height"], header["width"], 3))
+    return frames, header
+
+class FrameCachePlayer:
+    # Plays a pre-baked clip from its memory-mapped frame file with no codec work.
+    # Same interface as video_decoder.VideoDecoder (latest_frame / stats / close).
+    def __init__(self, path, downscale=True, budget_mb=None):
+        size = None
+        if downscale:
+            cap = cv2.VideoCapture(path)    # Only reads the container header
+            size = display_size(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+            cap.release()
+        self.frames, header = open_frames(path, size=size)
+        self.width = header["width"]
+        self.height = header["height"]
+        self.fps = header["fps"]
+        self.frame_count = header["frame_count"]
+
+        # Frames copied into RAM within the memory budget. Playback is a sequential loop, so an LRU
+        # would evict every frame just before it comes round again; instead the first frames that
+        # fit stay resident for good and the rest are read straight from the mapping
+        budget_mb = config.VIDEO_CACHE_BUDGET_MB if budget_mb is None else budget_mb
+        self.budget = int(budget_mb * 1024 * 1024)
+        frame_bytes = self.width * self.height * 3
+        self.resident_frames = min(self.budget // frame_bytes, self.frame_count)   # Frames 0..n-1 kept in RAM
+        self._resident = {}
+        self._resident_bytes = 0
+
+        self._clock_start = None
+        self._last_index = None   # Absolute (unwrapped) frame number last handed out
+
+        # Counters: RAM cache hits/misses, frames skipped because the renderer was slower than the clip, loops
+        self.hits = 0
+        self.misses = 0
+        self.dropped = 0
+        self.loops = 0
+
+    def _frame(self, index):
+        if index >= self.resident_frames:
+            self.misses += 1
+            return self.frames[index]          # Outside the resident prefix: read straight from the page cache
+        frame = self._resident.get(index)
+        if frame is not None:
+            self.hits += 1
+            return frame
+        self.misses += 1
+        frame = np.array(self.frames[index])   # First pass: copy out of the mapping into RAM, kept for good
+        self._resident[index] = frame
+        self._resident_bytes += frame.nbytes
+        return frame
+
+    def latest_frame(self):
+        now = time.perf_counter()
+        if self._clock_start is None:
+            self._clock_start = now
+        index = int((now - self._clock_start) * self.fps)
+        if index == self._last_index:
+            return None                        # Frame on screen is still current
+        if self._last_index is not None:
+            self.dropped += max(index - self._last_index - 1, 0)
+            self.loops += index // self.frame_count - self._last_index // self.frame_count
+        self._last_index = index
+        return self._frame(index % self.frame_count)   # Wrap around for seamless looping
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "dropped": self.dropped, "loops": self.loops,
+                "resident MB": round(self._resident_bytes / (1024 * 1024), 1)}
+
+    def close(self):
+        self._resident.clear()
+        self.frames = None                     # Drop the mapping
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Decode a video once into a memory-mappable raw frame cache.")
+    parser.add_argument("video", help="video file to bake")
+    parser.add_argument("--size", metavar="WxH", help="downscale frames (default: configured display size)")
+    parser.add_argument("--full-size", action="store_true", help="keep the original frame size")
+    args = parser.parse_args(argv)
+
+    if args.full_size:
+        size = None
+    elif args.size:
+        size = tuple(int(v) for v in args.size.lower().split("x"))
+    else:
+        cap = cv2.VideoCapture(args.video)
+        size = display_size(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        cap.release()
+
+    start = time.perf_counter()
+    cache_path = bake_frames(args.video, size=size)
+    header = read_header(cache_path)
+    print(f"{cache_path}: {header['frame_count']} frames of {header['width']}x{header['height']} "
+          f"@ {header['fps']:.2f} FPS ({os.path.getsize(cache_path) / (1024 * 1024):.1f} MB, "
+          f"{time.perf_counter() - start:.1f}s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+import ctypes            # Mapped buffer pointers
+import time              # Time spent waiting on the GPU
+import numpy as np       # Frames as arrays
+from OpenGL.GL import *  # OpenGL functions/constants
+from OpenGL.raw.GL.VERSION.GL_1_0 import glReadPixels as raw_read_pixels   # Offset into the bound PBO, no client array
+
+from loader.gl_state import state   # Tracked buffer binds
+
+# Asynchronous framebuffer readback: glReadPixels into a ring of pixel-pack buffers, each followed
+# by a fence. The read only queues a GPU-side copy, so the frame is collected `depth - 1` frames
+# later when its fence has (normally) long signalled, instead of stalling the pipeline every frame
+# like a plain glReadPixels into client memory.
+#
+#     readback = FrameReadback(width, height)
+#     for frame_number in ...:
+#         draw(...)
+#         frame = readback.read()          # Queues this frame, returns the oldest finished one (or None)
+#         if frame is not None:
+#             encoder.write(frame)
+#     for frame in readback.drain():       # The frames still in flight, in order
+#         encoder.write(frame)
+#
+# Frames are BGR (what video encoders take), bottom row first like the framebuffer.
+
+RING_DEPTH = 3           # PBOs in flight; 3 leaves the GPU two frames to finish each copy
+
+class FrameReadback:
+    def __init__(self, width, height, depth=RING_DEPTH):
+        self.width = width
+        self.height = height
+        self.size = width * height * 3
+        self.pbos = [int(pbo) for pbo in np.atleast_1d(glGenBuffers(depth))]
+        self.fences = [None] * depth    # Fence after each queued read (None = slot free)
+        self.index = 0                  # Slot the next read goes to
+        self.stalls = 0                 # Collected frames whose copy had not finished yet
+        self.wait_s = 0.0               # Time spent waiting for those
+        for pbo in self.pbos:
+            state.bind_buffer(GL_PIXEL_PACK_BUFFER, pbo)
+            glBufferData(GL_PIXEL_PACK_BUFFER, self.size, None, GL_STREAM_READ)
+        state.bind_buffer(GL_PIXEL_PACK_BUFFER, 0)
+
+    def read(self):
+        # Queue a copy of the bound framebuffer; returns the frame this slot held before, if any
+        i = self.index
+        self.index = (i + 1) % len(self.pbos)
+        frame = self._collect(i) if self.fences[i] is not None else None
+        state.bind_buffer(GL_PIXEL_PACK_BUFFER, self.pbos[i])
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)          # BGR rows are not 4-byte aligned in general
+        raw_read_pixels(0, 0, self.width, self.height, GL_BGR, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+        glPixelStorei(GL_PACK_ALIGNMENT, 4)
+        self.fences[i] = glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+        state.bind_buffer(GL_PIXEL_PACK_BUFFER, 0)   # Other pixel reads write client memory
+        return frame
+
+    def _collect(self, i):
+        # Copy slot i's frame out of its PBO (waiting only if the GPU has not finished it)
+        if glClientWaitSync(self.fences[i], GL_SYNC_FLUSH_COMMANDS_BIT, 0) == GL_TIMEOUT_EXPIRED:
+            start = time.perf_counter()
+            glClientWaitSync(self.fences[i], GL_SYNC_FLUSH_COMMANDS_BIT, 1000000000)
+            self.stalls += 1
+            self.wait_s += time.perf_counter() - start
+        glDeleteSync(self.fences[i])
+        self.fences[i] = None
+        state.bind_buffer(GL_PIXEL_PACK_BUFFER, self.pbos[i])
+        pointer = glMapBufferRange(GL_PIXEL_PACK_BUFFER, 0, self.size, GL_MAP_READ_BIT)
+        address = pointer if isinstance(pointer, int) else ctypes.cast(pointer, ctypes.c_void_p).value
+        buffer = (ctypes.c_ubyte * self.size).from_address(address)
+        frame = np.frombuffer(buffer, dtype=np.uint8).reshape(self.height, self.width, 3).copy()   # The slot is reused
+        glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+        state.bind_buffer(GL_PIXEL_PACK_BUFFER, 0)
+        return frame
+
+    def drain(self):
+        # The frames still in flight, oldest first
+        for k in range(len(self.pbos)):
+            i = (self.index + k) % len(self.pbos)
+            if self.fences[i] is not None:
+                yield self._collect(i)
+
+    def stats(self):
+        return {"ring": len(self.pbos), "stalls": self.stalls, "wait ms": round(self.wait_s * 1000.0, 1)}
+
+    def delete(self):
+        for i, fence in enumerate(self.fences):
+            if fence is not None:
+                glDeleteSync(fence)
+                self.fences[i] = None
+        state.delete_buffers(self.pbos)
@@ -0,0 +1,49 @@
+import os                # Selected PyOpenGL platform
+import sys               # Detect whether PyOpenGL already read its switches
+import OpenGL            # PyOpenGL global switches (read once, by the first OpenGL submodule import)
+from OpenGL.plugins import PlatformPlugin   # Platform registry (doesn't load a platform or read the switches)
+
+# PyOpenGL calls glGetError after every GL call (raising GLError) and can log every failing call.
+# That is useful while developing but is a large part of each call's overhead, so production runs
+# turn it off with the public OpenGL.ERROR_CHECKING switch. The switches are read when the first
+# OpenGL submodule is imported, so configure() must run before OpenGL.GL is imported (and, for
+# headless runs, after headless.select_platform()).
+#
+# Exception: PyOpenGL's EGL bindings (OpenGL.EGL, used by headless and by PyOpenGL itself on
+# Wayland) don't import with ERROR_CHECKING off (PyOpenGL 3.1: "module 'OpenGL.raw.EGL._errors'
+# has no attribute '_error_checker'"). There the switch stays on and the GL error checker is
+# swapped for a no-op at run time instead, which is also the only way left when OpenGL was
+# imported before configure().
+
+def _platform_is_egl():
+    # Platform PyOpenGL will load: the same key OpenGL.platform builds (PYOPENGL_PLATFORM, else the
+    # session type, else a guess from WAYLAND_DISPLAY/DISPLAY), matched against its plugin registry
+    guess = None
+    if sys.platform.startswith("linux") and "PYOPENGL_PLATFORM" not in os.environ:
+        if "WAYLAND_DISPLAY" in os.environ:
+            guess = "wayland"
+        elif "DISPLAY" in os.environ:
+            guess = "linux"
+    key = (os.environ.get("PYOPENGL_PLATFORM"), os.environ.get("XDG_SESSION_TYPE", "").lower(), guess,
+           sys.platform, os.name)
+    try:
+        return PlatformPlugin.match(key).import_path.endswith(".EGLPlatform")
+    except KeyError:
+        return False             # No platform at all; OpenGL.GL will fail on its own
+
+def configure(debug=False):
+    switches_free = "OpenGL._configflags" not in sys.modules   # Nothing has read the switches yet
+    egl = switches_free and _platform_is_egl()
+    if switches_free:
+        OpenGL.ERROR_LOGGING = debug       # Log failing calls with their arguments
+        if not egl:
+            OpenGL.ERROR_CHECKING = debug  # glGetError after every call
+    if not debug and (egl or not switches_free):
+        # Private PyOpenGL hook, only where the public switch couldn't be used; skipped if a
+        # PyOpenGL release doesn't have it (error checking then just stays on)
+        try:
+            from OpenGL.raw.GL._errors import _error_checker   # Loads the platform (select it first)
+        except ImportError:
+            return
+        if hasattr(_error_checker, "_currentChecker") and hasattr(_error_checker, "nullGetError"):
+            _error_checker._currentChecker = _error_checker.nullGetError
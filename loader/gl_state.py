@@ -0,0 +1,108 @@
+from OpenGL.GL import *  # OpenGL functions/constants
+# Raw entry points for the per-frame binds: plain integer arguments need no PyOpenGL conversion
+from OpenGL.raw.GL.VERSION.GL_1_0 import glEnable as raw_enable, glDisable as raw_disable
+from OpenGL.raw.GL.VERSION.GL_1_1 import glBindTexture as raw_bind_texture
+from OpenGL.raw.GL.VERSION.GL_1_3 import glActiveTexture as raw_active_texture
+from OpenGL.raw.GL.VERSION.GL_1_5 import glBindBuffer as raw_bind_buffer
+from OpenGL.raw.GL.VERSION.GL_2_0 import glUseProgram as raw_use_program
+from OpenGL.raw.GL.VERSION.GL_3_0 import glBindVertexArray as raw_bind_vertex_array
+
+# Shadow copy of the bindings and capabilities the renderer changes every frame. Every PyOpenGL
+# call costs several microseconds of Python overhead, so binds and enables that would not change
+# anything are skipped. This only works if all code binds through the shared `state` below:
+# a raw glBindTexture/glBindVertexArray/glUseProgram elsewhere makes the shadow copy stale
+# (call state.invalidate() after such code). Deleting objects goes through the delete_* helpers
+# so a recycled object name is never mistaken for the old, still "bound" one.
+
+class GLState:
+    def __init__(self):
+        self.issued = 0        # State calls sent to GL since the last take_counts()
+        self.skipped = 0       # Redundant state calls skipped since the last take_counts()
+        self.invalidate()
+
+    def invalidate(self):
+        # Forget everything; the next call of each kind is always issued
+        self._program = None
+        self._vertex_array = None
+        self._active_unit = None
+        self._textures = {}    # (unit, target) -> texture
+        self._buffers = {}     # target -> buffer (not GL_ELEMENT_ARRAY_BUFFER, which is VAO state)
+        self._caps = {}        # capability -> enabled
+
+    def _same(self, same):
+        if same:
+            self.skipped += 1
+        else:
+            self.issued += 1
+        return same
+
+    def use_program(self, program):
+        if not self._same(self._program == program):
+            raw_use_program(program)
+            self._program = program
+
+    def bind_vertex_array(self, vertex_array):
+        if not self._same(self._vertex_array == vertex_array):
+            raw_bind_vertex_array(vertex_array)
+            self._vertex_array = vertex_array
+
+    def active_texture(self, unit):
+        # unit is an index (0, 1, ...), not GL_TEXTURE0 + index
+        if not self._same(self._active_unit == unit):
+            raw_active_texture(GL_TEXTURE0 + unit)
+            self._active_unit = unit
+
+    def bind_texture(self, target, texture, unit=0):
+        if self._textures.get((unit, target)) == texture:
+            self.skipped += 1
+            return
+        self.active_texture(unit)
+        raw_bind_texture(target, texture)
+        self.issued += 1
+        self._textures[(unit, target)] = texture
+
+    def bind_buffer(self, target, buffer):
+        if not self._same(self._buffers.get(target) == buffer):
+            raw_bind_buffer(target, buffer)
+            self._buffers[target] = buffer
+
+    def set_enabled(self, capability, enabled):
+        if not self._same(self._caps.get(capability) == enabled):
+            (raw_enable if enabled else raw_disable)(capability)
+            self._caps[capability] = enabled
+
+    def enable(self, capability):
+        self.set_enabled(capability, True)
+
+    def disable(self, capability):
+        self.set_enabled(capability, False)
+
+    def delete_textures(self, textures):
+        textures = [int(t) for t in textures]
+        glDeleteTextures(len(textures), textures)
+        self._textures = {key: t for key, t in self._textures.items() if t not in textures}
+
+    def delete_buffers(self, buffers):
+        buffers = [int(b) for b in buffers]
+        glDeleteBuffers(len(buffers), buffers)
+        self._buffers = {target: b for target, b in self._buffers.items() if b not in buffers}
+
+    def delete_vertex_arrays(self, vertex_arrays):
+        vertex_arrays = [int(v) for v in vertex_arrays]
+        glDeleteVertexArrays(len(vertex_arrays), vertex_arrays)
+        if self._vertex_array in vertex_arrays:
+            self._vertex_array = None
+
+    def delete_program(self, program):
+        glDeleteProgram(program)
+        if self._program == program:
+            self._program = None
+
+    def take_counts(self):
+        # (issued, skipped) state calls since the previous call; issued + skipped is what the
+        # renderer would have sent to GL without the tracker
+        counts = (self.issued, self.skipped)
+        self.issued = self.skipped = 0
+        return counts
+
+state = GLState()   # Shared by every module that binds state (one GL context per process)
@@ -0,0 +1,119 @@
+import ctypes            # Pointers for EGL/OSMesa calls
+import os                # Platform selection through environment variables
+import numpy as np       # NumPy for pixel readback
+
+# Offscreen OpenGL without a window or display server: Mesa EGL (surfaceless/llvmpipe) or OSMesa.
+# PyOpenGL binds its platform at first import, so call select_platform() before importing OpenGL.GL
+# (or anything from loader that does).
+
+BACKENDS = ("egl", "osmesa")
+
+def select_platform(backend="egl"):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown headless backend {backend!r}; expected one of {BACKENDS}")
+    os.environ["PYOPENGL_PLATFORM"] = backend
+    if backend == "egl":
+        os.environ.setdefault("EGL_PLATFORM", "surfaceless")   # No X11/Wayland/DRM device needed
+
+def create_context(backend="egl", width=16, height=16):
+    # Returns an opaque handle to keep alive; the context is current afterwards
+    if backend == "egl":
+        return _create_egl_context()
+    return _create_osmesa_context(width, height)
+
+def _create_egl_context():
+    from OpenGL import EGL
+
+    display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    major, minor = EGL.EGLint(), EGL.EGLint()
+    if not EGL.eglInitialize(display, ctypes.pointer(major), ctypes.pointer(minor)):
+        raise RuntimeError("eglInitialize failed (is Mesa's EGL installed?)")
+
+    config_attribs = [EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+                      EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+                      EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8,
+                      EGL.EGL_DEPTH_SIZE, 24, EGL.EGL_NONE]
+    config = EGL.EGLConfig()
+    count = EGL.EGLint()
+    if not EGL.eglChooseConfig(display, (EGL.EGLint * len(config_attribs))(*config_attribs),
+                               ctypes.pointer(config), 1, ctypes.pointer(count)) or count.value == 0:
+        raise RuntimeError("No suitable EGL config")
+
+    # A tiny pbuffer keeps drivers without EGL_KHR_surfaceless_context happy; rendering goes to an FBO
+    surface_attribs = [EGL.EGL_WIDTH, 16, EGL.EGL_HEIGHT, 16, EGL.EGL_NONE]
+    surface = EGL.eglCreatePbufferSurface(display, config, (EGL.EGLint * len(surface_attribs))(*surface_attribs))
+
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context_attribs = [EGL.EGL_CONTEXT_MAJOR_VERSION, 3, EGL.EGL_CONTEXT_MINOR_VERSION, 3,
+                       EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK, EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT,
+                       EGL.EGL_NONE]
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT,
+                                   (EGL.EGLint * len(context_attribs))(*context_attribs))
+    if not context or not EGL.eglMakeCurrent(display, surface, surface, context):
+        raise RuntimeError("Could not create an OpenGL 3.3 core EGL context")
+    return ("egl", display, surface, context)
+
+def _create_osmesa_context(width, height):
+    from OpenGL import GL, osmesa
+
+    attribs = [osmesa.OSMESA_FORMAT, osmesa.OSMESA_RGBA,
+               osmesa.OSMESA_DEPTH_BITS, 24,
+               osmesa.OSMESA_PROFILE, osmesa.OSMESA_CORE_PROFILE,
+               osmesa.OSMESA_CONTEXT_MAJOR_VERSION, 3,
+               osmesa.OSMESA_CONTEXT_MINOR_VERSION, 3, 0]
+    context = osmesa.OSMesaCreateContextAttribs(attribs, None)
+    if not context:
+        raise RuntimeError("Could not create an OpenGL 3.3 core OSMesa context")
+    # OSMesa renders the default framebuffer into client memory; keep the buffer alive with the context
+    buffer = np.zeros((height, width, 4), dtype=np.uint8)
+    if not osmesa.OSMesaMakeCurrent(context, buffer, GL.GL_UNSIGNED_BYTE, width, height):
+        raise RuntimeError("OSMesaMakeCurrent failed")
+    return ("osmesa", context, buffer)
+
+def destroy_context(handle):
+    if handle[0] == "egl":
+        from OpenGL import EGL
+        _, display, surface, context = handle
+        EGL.eglMakeCurrent(display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+        EGL.eglDestroySurface(display, surface)
+        EGL.eglDestroyContext(display, context)
+        EGL.eglTerminate(display)
+    else:
+        from OpenGL import osmesa
+        osmesa.OSMesaDestroyContext(handle[1])
+
+def create_framebuffer(width, height):
+    from OpenGL.GL import (glGenFramebuffers, glBindFramebuffer, glGenRenderbuffers, glBindRenderbuffer,
+                           glRenderbufferStorage, glFramebufferRenderbuffer, glCheckFramebufferStatus,
+                           GL_FRAMEBUFFER, GL_RENDERBUFFER, GL_RGBA8, GL_DEPTH_COMPONENT24,
+                           GL_COLOR_ATTACHMENT0, GL_DEPTH_ATTACHMENT, GL_FRAMEBUFFER_COMPLETE)
+
+    # Color + depth renderbuffers attached to a framebuffer object of the requested size
+    fbo = glGenFramebuffers(1)
+    color, depth = glGenRenderbuffers(2)
+    glBindRenderbuffer(GL_RENDERBUFFER, color)
+    glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, width, height)
+    glBindRenderbuffer(GL_RENDERBUFFER, depth)
+    glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, width, height)
+    glBindRenderbuffer(GL_RENDERBUFFER, 0)
+
+    glBindFramebuffer(GL_FRAMEBUFFER, fbo)
+    glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, color)
+    glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, depth)
+    if glCheckFramebufferStatus(GL_FRAMEBUFFER) != GL_FRAMEBUFFER_COMPLETE:
+        raise RuntimeError("Offscreen framebuffer is incomplete")
+    return fbo, [int(color), int(depth)]
+
+def delete_framebuffer(fbo, renderbuffers):
+    from OpenGL.GL import glBindFramebuffer, glDeleteFramebuffers, glDeleteRenderbuffers, GL_FRAMEBUFFER
+    glBindFramebuffer(GL_FRAMEBUFFER, 0)
+    glDeleteFramebuffers(1, [fbo])
+    glDeleteRenderbuffers(len(renderbuffers), renderbuffers)
+
+def read_pixels(width, height):
+    from OpenGL.GL import glReadPixels, glPixelStorei, GL_PACK_ALIGNMENT, GL_RGB, GL_UNSIGNED_BYTE
+
+    # Read the bound framebuffer as a top-row-first RGB image
+    glPixelStorei(GL_PACK_ALIGNMENT, 1)
+    data = glReadPixels(0, 0, width, height, GL_RGB, GL_UNSIGNED_BYTE)
+    return np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3)[::-1]
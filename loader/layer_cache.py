@@ -0,0 +1,175 @@
+from OpenGL.GL import *  # OpenGL functions/constants
+import numpy as np       # Matrix keys
+
+from loader.gl_state import state   # Tracked binds/enables
+from loader.bg_loader import create_bg_quad   # Fullscreen quad for compositing
+from loader.shader_manager import get_program   # Cached composite program
+
+# Render-on-demand for the 3D scene: the scene is drawn into an offscreen color + depth framebuffer
+# and that image is reused while the view-projection and every world matrix stay within `epsilon`
+# of the ones it was rendered with. Each frame then only composites the cached layer over the
+# background (one textured quad) instead of redrawing the castle. Changes the matrices don't show
+# (textures finishing their upload, scene edits without a transform change) go through invalidate().
+#
+# The layer can also be rendered at a lower resolution (set_scale, see render_scale for choosing
+# it from frame times): the scene is drawn into the bottom-left part of the framebuffer and
+# stretched over the window with bilinear filtering, optionally sharpened.
+#
+#     layer = LayerCache(width, height)
+#     if layer.begin(view_projection, scene.world_matrices()):   # Stale: draw into the layer
+#         draw_scene(...)
+#         layer.end()
+#     layer.composite()                                            # Every frame, after the background
+
+EPSILON = 1e-4           # Largest matrix element change still treated as "unchanged" (< 0: always redraw)
+
+composite_vertex_shader = """
+#version 330 core
+layout(location = 0) in vec2 position;    // Fullscreen quad (create_bg_quad)
+layout(location = 1) in vec2 texCoord;
+uniform vec2 uvScale;                     // Part of the layer the scene was rendered into
+out vec2 TexCoord;
+void main() {
+    gl_Position = vec4(position, 0.0, 1.0);
+    TexCoord = texCoord * uvScale;
+}
+"""
+
+# Premultiplied layer, bilinear upscale; with sharpness > 0 an unsharp mask over the four
+# neighbouring texels restores some of the detail lost to the lower resolution
+composite_fragment_shader = """
+#version 330 core
+in vec2 TexCoord;
+out vec4 FragColor;
+uniform sampler2D layer;
+uniform vec2 texel;                       // 1 / layer size
+uniform float sharpness;                  // 0 = plain bilinear
+void main() {
+    vec4 color = texture(layer, TexCoord);
+    if (sharpness > 0.0) {
+        vec4 blur = 0.25 * (texture(layer, TexCoord + vec2(texel.x, 0.0)) + texture(layer, TexCoord - vec2(texel.x, 0.0))
+                          + texture(layer, TexCoord + vec2(0.0, texel.y)) + texture(layer, TexCoord - vec2(0.0, texel.y)));
+        color.rgb = clamp(color.rgb + sharpness * (color.rgb - blur.rgb), 0.0, color.a);   // Stay premultiplied
+    }
+    FragColor = color;
+}
+"""
+
+class LayerCache:
+    def __init__(self, width, height, epsilon=EPSILON, target=0, sharpness=0.0):
+        self.width = width
+        self.height = height
+        self.epsilon = epsilon
+        self.target = target      # Framebuffer the frame is composited into (0 = window)
+        self.sharpness = sharpness
+        self.scale = 1.0          # Render scale per axis (set_scale)
+        self.viewport = (width, height)
+        self._key = None          # Matrices the cached image was rendered with
+        self.hits = 0             # Frames served from the cached image
+        self.renders = 0          # Frames the scene was drawn into the layer
+        self.invalidations = {}   # Reason -> count
+
+        # Color texture (cleared to transparent, so only the scene covers the background) + depth
+        self.texture = glGenTextures(1)
+        state.bind_texture(GL_TEXTURE_2D, self.texture)
+        glTexStorage2D(GL_TEXTURE_2D, 1, GL_RGBA8, width, height)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)   # Bilinear upscale (exact at 1:1)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        self.depth = glGenRenderbuffers(1)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.depth)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, width, height)
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+        self.fbo = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self.texture, 0)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, self.depth)
+        complete = glCheckFramebufferStatus(GL_FRAMEBUFFER) == GL_FRAMEBUFFER_COMPLETE
+        glBindFramebuffer(GL_FRAMEBUFFER, self.target)
+        if not complete:
+            self.delete()
+            raise RuntimeError("Scene layer framebuffer is incomplete")
+
+        # Fullscreen quad the right way up (the layer is rendered bottom row first, like the window)
+        self.quad_vao, self.quad_vbo = create_bg_quad(flip_v=False)
+        program = get_program(composite_vertex_shader, composite_fragment_shader, label="layer composite")
+        self.program = program.id
+        self._uv_scale = program.uniform("uvScale")
+        self._sharpness = program.uniform("sharpness")
+        state.use_program(self.program)
+        glUniform1i(program.uniform("layer"), 0)
+        glUniform2f(program.uniform("texel"), 1.0 / width, 1.0 / height)
+        self._uniforms_dirty = True
+
+    def set_scale(self, scale):
+        # Render the scene at scale x the layer size per axis from the next redraw on
+        scale = min(max(float(scale), 1.0 / min(self.width, self.height)), 1.0)
+        if scale == self.scale:
+            return
+        self.scale = scale
+        self.viewport = (max(int(round(self.width * scale)), 1), max(int(round(self.height * scale)), 1))
+        self._uniforms_dirty = True
+        self.invalidate("scale")
+
+    def invalidate(self, reason="other"):
+        # Force the next begin() to redraw (input, tour switches, texture uploads, scene edits)
+        self._key = None
+        self.invalidations[reason] = self.invalidations.get(reason, 0) + 1
+
+    def begin(self, *matrices):
+        # True (with the layer bound and cleared) if the scene has to be drawn; call end() after
+        key = np.concatenate([np.ravel(m) for m in matrices])
+        if (self._key is not None and key.shape == self._key.shape
+                and np.abs(key - self._key).max() <= self.epsilon):
+            self.hits += 1
+            return False
+        self._key = key
+        self.renders += 1
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        self._clear_color = glGetFloatv(GL_COLOR_CLEAR_VALUE)   # The background's, restored in end()
+        glClearColor(0.0, 0.0, 0.0, 0.0)
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        glViewport(0, 0, *self.viewport)
+        state.enable(GL_DEPTH_TEST)
+        return True
+
+    def end(self):
+        glBindFramebuffer(GL_FRAMEBUFFER, self.target)
+        glClearColor(*self._clear_color)
+        glViewport(0, 0, self.width, self.height)
+
+    def composite(self):
+        # Blend the cached scene over what is in the target (premultiplied: the layer's alpha is 0
+        # where nothing was drawn), upscaled from the rendered part of the layer
+        state.disable(GL_DEPTH_TEST)
+        state.enable(GL_BLEND)
+        glBlendFunc(GL_ONE, GL_ONE_MINUS_SRC_ALPHA)
+        state.use_program(self.program)
+        if self._uniforms_dirty:
+            glUniform2f(self._uv_scale, self.viewport[0] / self.width, self.viewport[1] / self.height)
+            glUniform1f(self._sharpness, self.sharpness if self.scale < 1.0 else 0.0)   # Nothing to restore at 1:1
+            self._uniforms_dirty = False
+        state.bind_vertex_array(self.quad_vao)
+        state.bind_texture(GL_TEXTURE_2D, self.texture, unit=0)
+        glDrawArrays(GL_TRIANGLES, 0, 6)
+        state.disable(GL_BLEND)
+        state.enable(GL_DEPTH_TEST)
+        return 1                  # Draw calls issued
+
+    def stats(self):
+        frames = self.hits + self.renders
+        stats = {"hits": self.hits, "renders": self.renders,
+                 "hit rate": round(self.hits / frames, 3) if frames else 0.0, "scale": self.scale}
+        stats.update((f"invalidated ({reason})", count) for reason, count in self.invalidations.items())
+        return stats
+
+    def delete(self):
+        glBindFramebuffer(GL_FRAMEBUFFER, self.target)
+        glDeleteFramebuffers(1, [self.fbo])
+        glDeleteRenderbuffers(1, [self.depth])
+        state.delete_textures([self.texture])
+        if getattr(self, "quad_vao", None) is not None:
+            state.delete_vertex_arrays([self.quad_vao])
+            state.delete_buffers([self.quad_vbo])
+            self.quad_vao = None
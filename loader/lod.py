@@ -0,0 +1,128 @@
+import hashlib           # Cache key from the mesh contents
+import os                # Cache file checks
+import zipfile           # Truncated .npz caches
+import numpy as np       # NumPy for batched quadric math
+
+from loader.mesh_optimizer import tipsify, FLOATS_PER_VERTEX   # Vertex cache order for the coarse levels
+
+# Levels of detail by vertex clustering with quadric error metrics (Lindstrom 2000): the mesh
+# bounds are split into a grid, every cell's triangle plane quadrics are summed, and all vertices
+# of a cell collapse onto the cell's vertex with the smallest quadric error. Collapsing onto an
+# existing vertex means the coarse levels only need new indices: they reference the original
+# vertex buffer and are appended to the same index buffer, so switching level only changes the
+# index range of the draw call.
+
+LOD_GRIDS = (40, 20, 10)      # Cells along the longest axis for LOD 1, 2, 3...
+MIN_REDUCTION = 0.75          # Keep a level only if it has at most 75% of the previous level's triangles
+CACHE_VERSION = 1
+
+def _quadrics(positions, triangles):
+    # Per-vertex sums of area-weighted triangle plane quadrics, as (V, 10) upper-triangle coefficients
+    p0, p1, p2 = (positions[triangles[:, k]] for k in range(3))
+    normal = np.cross(p1 - p0, p2 - p0)
+    area = np.linalg.norm(normal, axis=1)
+    valid = area > 0
+    normal[valid] /= area[valid, None]
+    plane = np.concatenate([normal, -(normal * p0).sum(axis=1, keepdims=True)], axis=1)   # (a, b, c, d)
+    rows, cols = np.triu_indices(4)
+    coefficients = plane[:, rows] * plane[:, cols] * (area * 0.5)[:, None]
+    quadrics = np.zeros((len(positions), len(rows)))
+    for k in range(3):
+        for c in range(len(rows)):
+            quadrics[:, c] += np.bincount(triangles[:, k], coefficients[:, c], minlength=len(positions))
+    return quadrics
+
+def _quadric_error(quadrics, positions):
+    # v^T Q v for homogeneous positions v = (x, y, z, 1), Q given by its upper-triangle coefficients
+    homogeneous = np.concatenate([positions, np.ones((len(positions), 1))], axis=1)
+    rows, cols = np.triu_indices(4)
+    weight = np.where(rows == cols, 1.0, 2.0)            # Off-diagonal terms appear twice in v^T Q v
+    return (quadrics * homogeneous[:, rows] * homogeneous[:, cols] * weight).sum(axis=1)
+
+def simplify(vertices, indices, cells, floats_per_vertex=FLOATS_PER_VERTEX):
+    # One LOD level: cluster vertices on a grid with `cells` cells along the longest axis.
+    # Returns the new triangle indices (into the same vertex buffer), original order preserved.
+    positions = vertices.reshape(-1, floats_per_vertex)[:, :3].astype(np.float64)
+    triangles = indices.reshape(-1, 3).astype(np.int64)
+    used = np.unique(triangles)
+
+    low = positions[used].min(axis=0)
+    cell_size = max(float((positions[used].max(axis=0) - low).max()) / cells, 1e-12)
+    cell_xyz = np.floor((positions[used] - low) / cell_size).astype(np.int64)
+    _, cell = np.unique(cell_xyz, axis=0, return_inverse=True)
+    cell = cell.reshape(-1)
+
+    # Cell quadrics, and the representative: the cell's vertex with the smallest error
+    vertex_quadrics = _quadrics(positions, triangles)[used]
+    cell_quadrics = np.stack([np.bincount(cell, vertex_quadrics[:, c])
+                              for c in range(vertex_quadrics.shape[1])], axis=1)
+    error = _quadric_error(cell_quadrics[cell], positions[used])
+    order = np.lexsort((error, cell))
+    first = np.r_[True, cell[order][1:] != cell[order][:-1]]
+    representative = np.empty(cell.max() + 1, dtype=np.int64)
+    representative[cell[order][first]] = used[order][first]
+
+    remap = np.arange(len(positions))
+    remap[used] = representative[cell]
+    collapsed = remap[triangles]
+
+    # Drop triangles that collapsed to a line or point, and duplicates (same corners, same winding)
+    keep = ((collapsed[:, 0] != collapsed[:, 1]) & (collapsed[:, 1] != collapsed[:, 2])
+            & (collapsed[:, 0] != collapsed[:, 2]))
+    collapsed = collapsed[keep]
+    rotation = np.argmin(collapsed, axis=1)
+    canonical = np.stack([collapsed[np.arange(len(collapsed)), (rotation + k) % 3] for k in range(3)], axis=1)
+    _, unique = np.unique(canonical, axis=0, return_index=True)
+    return collapsed[np.sort(unique)].reshape(-1).astype(indices.dtype)
+
+def build_lods(vertices, indices, grids=LOD_GRIDS):
+    # Returns (indices of every level concatenated, (L, 2) array of (first index, index count)).
+    # Level 0 is the input; coarser levels that don't reduce the triangle count enough are skipped.
+    vertex_count = len(vertices) // FLOATS_PER_VERTEX
+    levels = [np.asarray(indices)]
+    for cells in grids:
+        level = simplify(vertices, indices, cells)
+        if len(level) == 0 or len(level) > len(levels[-1]) * MIN_REDUCTION:
+            continue
+        levels.append(tipsify(level, vertex_count))
+    counts = np.array([len(level) for level in levels], dtype=np.int64)
+    ranges = np.stack([np.r_[0, np.cumsum(counts)[:-1]], counts], axis=1)
+    return np.concatenate(levels).astype(indices.dtype, copy=False), ranges
+
+def _cache_key(vertices, indices, grids):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(vertices).data)
+    h.update(np.ascontiguousarray(indices).data)
+    h.update(repr((CACHE_VERSION, tuple(grids), MIN_REDUCTION)).encode())
+    return np.frombuffer(h.digest(), dtype=np.uint8)
+
+def load_lods(vertices, indices, cache_path=None, grids=LOD_GRIDS):
+    # build_lods() with the result stored next to the mesh (an .npz keyed by the mesh contents),
+    # so the simplification runs once per mesh rather than at every start
+    key = _cache_key(vertices, indices, grids) if cache_path else None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with np.load(cache_path) as cached:
+                if np.array_equal(cached["key"], key):
+                    return cached["indices"], cached["ranges"]
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            pass   # Unreadable or truncated cache: rebuild
+    lod_indices, ranges = build_lods(vertices, indices, grids)
+    if cache_path:
+        tmp_path = cache_path + ".tmp.npz"
+        try:
+            np.savez(tmp_path, key=key, indices=lod_indices, ranges=ranges)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass   # Read-only install: levels are rebuilt every launch
+    return lod_indices, ranges
+
+def select_levels(screen_size, current, thresholds, hysteresis=0.15):
+    # Level per instance from its projected size in pixels: level k is used below thresholds[k - 1].
+    # An instance only moves to a coarser level once it is hysteresis below a threshold, and back
+    # to a finer level once it is hysteresis above it, so sizes near a threshold don't flicker.
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    size = np.asarray(screen_size, dtype=np.float64)[..., None]
+    min_level = (size < thresholds * (1 - hysteresis)).sum(axis=-1)   # Clearly small enough for these
+    max_level = (size < thresholds * (1 + hysteresis)).sum(axis=-1)   # Not clearly too big for these
+    return np.clip(current, min_level, max_level)
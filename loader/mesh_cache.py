@@ -0,0 +1,172 @@
+import argparse          # Command line parsing for the offline precompile tool
+import hashlib           # Content and stat hashing for cache keys
+import os                # Path and file stat helpers
+import struct            # Binary header packing
+import sys               # Exit codes for the command line tool
+import time              # Timing for the command line report
+import numpy as np       # NumPy for array handling and memory mapping
+
+from loader.model_loader import load_number_file   # Text mesh parser used to (re)build the cache
+from loader.mesh_optimizer import optimize_mesh     # Optional weld/reorder/narrow pass applied at compile time
+
+# Compiled mesh file layout (little endian):
+#   header (HEADER_SIZE bytes, see HEADER_FORMAT)
+#   vertex data: vertex_count * floats_per_vertex float32 values (interleaved x, y, z, u, v)
+#   index data:  index_count uint16 or uint32 values (index_size bytes each)
+MAGIC = b"CSTLMESH"
+VERSION = 1
+HEADER_FORMAT = "<8s6I16s32s"   # magic, version, floats/vertex, vertex count, index count, index size, flags, stat key, content key
+HEADER_SIZE = 128               # Header padded so vertex data starts on a 128-byte boundary
+CACHE_SUFFIX = ".mesh"
+
+FLOATS_PER_VERTEX = 5           # 3 position + 2 texture coordinate floats
+
+FLAG_OPTIMIZED = 1              # Mesh went through mesh_optimizer.optimize_mesh
+
+def cache_path_for(vertex_path):
+    # Compiled mesh lives next to its source: source/castle_vertices.txt -> source/castle_vertices.mesh
+    return os.path.splitext(vertex_path)[0] + CACHE_SUFFIX
+
+def _stat_key(*paths):
+    # Cheap key from modification time and size of every source file
+    h = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        st = os.stat(path)
+        h.update(b"%d:%d;" % (st.st_mtime_ns, st.st_size))
+    return h.digest()
+
+def _content_key(*paths):
+    # Robust key from the contents of every source file (survives copies that reset mtimes)
+    h = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        h.update(b"\0")   # Separate files so moved bytes change the key
+    return h.digest()
+
+def write_mesh(path, vertices, indices, stat_key=b"", content_key=b"", flags=0):
+    vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+    if indices.dtype not in (np.uint16, np.uint32):
+        indices = indices.astype(np.uint32)
+    indices = np.ascontiguousarray(indices)
+    if vertices.size % FLOATS_PER_VERTEX:
+        raise ValueError(f"Vertex data size {vertices.size} is not a multiple of {FLOATS_PER_VERTEX}")
+
+    header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, FLOATS_PER_VERTEX,
+                         vertices.size // FLOATS_PER_VERTEX, indices.size, indices.itemsize, flags,
+                         stat_key.ljust(16, b"\0"), content_key.ljust(32, b"\0"))
+
+    # Write to a temporary file and rename, so a crash never leaves a half-written cache behind
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(header.ljust(HEADER_SIZE, b"\0"))
+            f.write(vertices.tobytes())
+            f.write(indices.tobytes())
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def read_header(path):
+    with open(path, "rb") as f:
+        raw = f.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE:
+        return None
+    magic, version, fpv, vertex_count, index_count, index_size, flags, stat_key, content_key = \
+        struct.unpack_from(HEADER_FORMAT, raw)
+    if magic != MAGIC or version != VERSION or fpv != FLOATS_PER_VERTEX or index_size not in (2, 4):
+        return None   # Foreign or outdated format; treat as stale
+    if os.path.getsize(path) != HEADER_SIZE + vertex_count * FLOATS_PER_VERTEX * 4 + index_count * index_size:
+        return None   # Truncated or padded (interrupted copy, disk full); rebuild rather than mis-map
+    return {"vertex_count": vertex_count, "index_count": index_count, "index_size": index_size, "flags": flags,
+            "stat_key": stat_key, "content_key": content_key}
+
+def map_mesh(path, header=None):
+    header = header or read_header(path)
+    if header is None:
+        raise ValueError(f"Not a compiled mesh file: {path}")
+
+    # Memory-map both arrays read-only; glBufferData reads straight from the mapped pages
+    vertex_count = header["vertex_count"] * FLOATS_PER_VERTEX
+    vertices = np.memmap(path, dtype=np.float32, mode="r", offset=HEADER_SIZE, shape=(vertex_count,))
+    index_dtype = np.uint16 if header["index_size"] == 2 else np.uint32
+    indices = np.memmap(path, dtype=index_dtype, mode="r",
+                        offset=HEADER_SIZE + vertices.nbytes, shape=(header["index_count"],))
+    return vertices, indices
+
+def _build_mesh(vertex_path, index_path, chunk_size=None, optimize=False):
+    # Parse (and optionally optimize) the text sources: (vertices, indices, flags)
+    vertices = load_number_file(vertex_path, np.float32, chunk_size)
+    indices = load_number_file(index_path, np.uint32, chunk_size)
+    flags = 0
+    if optimize:
+        vertices, indices, _ = optimize_mesh(vertices, indices)
+        flags |= FLAG_OPTIMIZED
+    return vertices, indices, flags
+
+def compile_mesh(vertex_path, index_path, cache_path=None, chunk_size=None, optimize=False):
+    cache_path = cache_path or cache_path_for(vertex_path)
+    vertices, indices, flags = _build_mesh(vertex_path, index_path, chunk_size, optimize)
+    write_mesh(cache_path, vertices, indices,
+               _stat_key(vertex_path, index_path), _content_key(vertex_path, index_path), flags)
+    return cache_path
+
+def load_mesh(vertex_path, index_path, cache_path=None, chunk_size=None, optimize=False):
+    cache_path = cache_path or cache_path_for(vertex_path)
+
+    header = read_header(cache_path) if os.path.exists(cache_path) else None
+    if header is not None and optimize and not header["flags"] & FLAG_OPTIMIZED:
+        header = None   # Cache was built without the optimization pass that is now requested
+    if header is not None and header["stat_key"] != _stat_key(vertex_path, index_path):
+        # Sources were touched or copied; only rebuild if their contents actually changed
+        if header["content_key"] == _content_key(vertex_path, index_path):
+            header["stat_key"] = _stat_key(vertex_path, index_path)
+            try:
+                with open(cache_path, "r+b") as f:   # Refresh the stored stat key in place
+                    f.seek(struct.calcsize("<8s6I"))
+                    f.write(header["stat_key"])
+            except OSError:
+                pass   # Read-only install: the content check runs again next launch
+        else:
+            header = None
+
+    if header is None:
+        vertices, indices, flags = _build_mesh(vertex_path, index_path, chunk_size, optimize)
+        try:
+            write_mesh(cache_path, vertices, indices,
+                       _stat_key(vertex_path, index_path), _content_key(vertex_path, index_path), flags)
+        except OSError:
+            return vertices, indices   # Read-only install: meshes are parsed every launch
+        header = read_header(cache_path)
+    return map_mesh(cache_path, header)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompile text meshes into memory-mappable binary caches.")
+    parser.add_argument("paths", nargs="+", metavar="VERTICES INDICES",
+                        help="pairs of vertex and index text files")
+    parser.add_argument("-f", "--force", action="store_true", help="rebuild even if the cache is up to date")
+    parser.add_argument("--chunk-size", type=int, default=None, help="stream sources in chunks of this many bytes")
+    parser.add_argument("-O", "--optimize", action="store_true",
+                        help="weld vertices, reorder for vertex cache/fetch locality and narrow indices")
+    args = parser.parse_args(argv)
+
+    if len(args.paths) % 2:
+        parser.error("expected pairs of VERTICES INDICES files")
+
+    for vertex_path, index_path in zip(args.paths[::2], args.paths[1::2]):
+        start = time.perf_counter()
+        if args.force:
+            cache_path = compile_mesh(vertex_path, index_path, chunk_size=args.chunk_size, optimize=args.optimize)
+        else:
+            cache_path = cache_path_for(vertex_path)
+            load_mesh(vertex_path, index_path, cache_path, args.chunk_size, args.optimize)
+        header = read_header(cache_path)
+        print(f"{cache_path}: {header['vertex_count']} vertices, {header['index_count']} indices "
+              f"({os.path.getsize(cache_path)} bytes, {time.perf_counter() - start:.3f}s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+import numpy as np       # NumPy for array handling
+
+FLOATS_PER_VERTEX = 5    # 3 position + 2 texture coordinate floats
+CACHE_SIZE = 16          # Post-transform cache size assumed for reordering (small, so it suits old iGPUs too)
+STATS_CACHE_SIZE = 32    # FIFO size used when reporting ACMR/ATVR
+
+def weld_vertices(vertices, indices):
+    # Merge bit-identical (x, y, z, u, v) vertices and drop unreferenced ones
+    verts = np.asarray(vertices, dtype=np.float32).reshape(-1, FLOATS_PER_VERTEX) + np.float32(0.0)  # -0.0 -> 0.0
+    used = np.unique(indices)
+    unique, inverse = np.unique(verts[used], axis=0, return_inverse=True)
+    remap = np.zeros(len(verts), dtype=np.uint32)
+    remap[used] = inverse.reshape(-1)
+    return unique.reshape(-1), remap[indices]
+
+def narrow_indices(indices, vertex_count):
+    # 16-bit indices halve index bandwidth whenever every vertex is addressable with them
+    if vertex_count <= 0x10000:
+        return indices.astype(np.uint16)
+    return indices.astype(np.uint32)
+
+def cache_stats(indices, vertex_count=None, cache_size=STATS_CACHE_SIZE):
+    # Simulate a FIFO post-transform cache; returns (ACMR, ATVR)
+    #   ACMR: vertex shader invocations per triangle (ideal ~0.5, worst 3.0)
+    #   ATVR: vertex shader invocations per unique vertex (ideal 1.0)
+    idx = np.asarray(indices).tolist()
+    if vertex_count is None:
+        vertex_count = int(np.unique(indices).size)
+    stamps = {}
+    misses = 0
+    for v in idx:
+        # A vertex is cached if fewer than cache_size misses happened since it was loaded
+        if misses - stamps.get(v, -cache_size) >= cache_size:
+            stamps[v] = misses
+            misses += 1
+    triangles = max(len(idx) // 3, 1)
+    return misses / triangles, misses / max(vertex_count, 1)
+
+def tipsify(indices, vertex_count, cache_size=CACHE_SIZE):
+    # Triangle reordering for vertex cache locality ("Tipsify", Sander, Nehab & Barczak 2007).
+    # Fans out around one vertex at a time, picking the next fanning vertex that is still in the cache.
+    tris = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+    tri_count = len(tris)
+    if tri_count == 0 or vertex_count == 0:
+        return indices           # Nothing to reorder (empty mesh)
+
+    # Vertex -> triangle adjacency as CSR arrays
+    flat = tris.reshape(-1)
+    order = np.argsort(flat, kind="stable")
+    offsets = np.zeros(vertex_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(flat, minlength=vertex_count), out=offsets[1:])
+    adjacency = (order // 3).tolist()
+    offsets = offsets.tolist()
+
+    live = np.bincount(flat, minlength=vertex_count).tolist()   # Live (unemitted) triangles per vertex
+    stamp = [0] * vertex_count                                  # Cache time stamp per vertex
+    emitted = bytearray(tri_count)
+    tri_list = tris.tolist()
+    dead_end = []                                               # Recently referenced vertices
+    output = []
+
+    time = cache_size + 1
+    cursor = 0
+    fan = 0
+    while fan >= 0:
+        candidates = []
+        for t in adjacency[offsets[fan]:offsets[fan + 1]]:
+            if emitted[t]:
+                continue
+            emitted[t] = 1
+            output.append(t)
+            for v in tri_list[t]:
+                dead_end.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if time - stamp[v] > cache_size:   # Vertex was not in cache: load it
+                    stamp[v] = time
+                    time += 1
+
+        # Next fanning vertex: the candidate that stays in cache longest while its fan is emitted
+        fan = -1
+        best = -1
+        for v in candidates:
+            if live[v] > 0:
+                priority = 0
+                if time - stamp[v] + 2 * live[v] <= cache_size:
+                    priority = time - stamp[v]
+                if priority > best:
+                    best = priority
+                    fan = v
+
+        if fan == -1:
+            # Dead end: back-track through recently used vertices, then scan forward
+            while dead_end:
+                v = dead_end.pop()
+                if live[v] > 0:
+                    fan = v
+                    break
+            else:
+                while cursor < vertex_count:
+                    if live[cursor] > 0:
+                        fan = cursor
+                        break
+                    cursor += 1
+
+    return tris[np.asarray(output, dtype=np.int64)].reshape(-1).astype(indices.dtype)
+
+def reorder_vertices(vertices, indices):
+    # Renumber vertices in first-use order so vertex fetches walk the buffer sequentially
+    verts = np.asarray(vertices).reshape(-1, FLOATS_PER_VERTEX)
+    used, first = np.unique(indices, return_index=True)
+    order = used[np.argsort(first, kind="stable")]
+    remap = np.zeros(len(verts), dtype=np.uint32)
+    remap[order] = np.arange(len(order), dtype=np.uint32)
+    return verts[order].reshape(-1), remap[indices]
+
+def optimize_mesh(vertices, indices, cache_size=CACHE_SIZE, report=True):
+    indices = np.asarray(indices, dtype=np.uint32)
+    before = cache_stats(indices)
+
+    vertices, indices = weld_vertices(vertices, indices)           # 1. Weld duplicate vertices
+    vertex_count = len(vertices) // FLOATS_PER_VERTEX
+    indices = tipsify(indices, vertex_count, cache_size)            # 2. Triangle order for the post-transform cache
+    vertices, indices = reorder_vertices(vertices, indices)         # 3. Vertex order for fetch locality
+    indices = narrow_indices(indices, vertex_count)                 # 4. 16-bit indices when possible
+
+    after = cache_stats(indices)
+    stats = {"acmr_before": before[0], "atvr_before": before[1],
+             "acmr_after": after[0], "atvr_after": after[1],
+             "vertex_count": vertex_count, "index_size": indices.itemsize}
+    if report:
+        print(f"Mesh optimized: {vertex_count} vertices, {indices.itemsize * 8}-bit indices, "
+              f"ACMR {before[0]:.3f} -> {after[0]:.3f}, ATVR {before[1]:.3f} -> {after[1]:.3f}")
+    return vertices, indices, stats
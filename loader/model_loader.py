@@ -1,55 +1,152 @@
 from OpenGL.GL import *   # OpenGL functions and constants
 import numpy as np       # NumPy for array handling
 import ctypes            # ctypes for pointer arithmetic in OpenGL calls
+import os                # File size for streaming buffer estimates
+import re                # Regular expressions for stripping comment lines
 
-def create_textured_object(vertex_path, index_path):
-    # Read vertex data from the specified file
-    with open(vertex_path, "r") as f:
-        vertex_lines = f.readlines()
-
-    vertices = []
-    for line in vertex_lines:
-        # Skip empty lines or comment lines starting with '#'
-        if line.strip() and not line.startswith("#"):
-            line = line.strip()
-            # Support both comma-separated and space-separated floats
-            if "," in line:
-                parts = list(map(float, line.split(",")))
-            else:
-                parts = list(map(float, line.split()))
-            vertices.extend(parts)   # Append parsed floats to vertices list
-
-    vertices = np.array(vertices, dtype=np.float32)  # Convert to NumPy float32 array
-
-    # Read index data from specified file
-    with open(index_path, "r") as f:
-        index_lines = f.readlines()
-
-    indices = []
-    for line in index_lines:
-        # Skip empty lines or comments
-        if line.strip() and not line.startswith("#"):
-            # Indices assumed to be comma-separated integers on each line
-            parts = list(map(int, line.strip().split(",")))
-            indices.extend(parts)
-
-    indices = np.array(indices, dtype=np.uint32)  # Convert to NumPy uint32 array for element indices
+from loader.gl_state import state   # Tracked VAO/buffer binds
 
+# Matches whole comment lines (lines starting with '#') in a raw text buffer
+_COMMENT_LINE = re.compile(rb"^#[^\n]*", re.MULTILINE)
+# Byte translation table turning commas into spaces so one separator covers both formats
+_SEPARATORS = bytes.maketrans(b",", b" ")
+
+def _parse_numbers(data, dtype):
+    data = _COMMENT_LINE.sub(b"", data)    # Drop comment lines
+    data = data.translate(_SEPARATORS)      # Support both comma-separated and space-separated values
+    if not data.strip():
+        return np.empty(0, dtype=dtype)     # np.fromstring turns blank input into a bogus -1 / 0
+    # Parse the whole buffer in C; raises ValueError on malformed data
+    return np.fromstring(data, dtype=dtype, sep=" ")
+
+def load_number_file(path, dtype, chunk_size=None):
+    # Fast path: read the whole file as one buffer and parse it in a single NumPy call
+    if chunk_size is None:
+        with open(path, "rb") as f:
+            return _parse_numbers(f.read(), dtype)
+
+    # Streaming path: parse fixed-size chunks straight into one growing output array,
+    # so peak memory stays close to the size of the final array plus one chunk of text
+    size = os.path.getsize(path)
+    out = np.empty(max(size // 8, 1024), dtype=dtype)   # Initial guess (~8 bytes of text per value)
+    count = 0
+    tail = b""                                          # Incomplete last line carried to the next chunk
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            chunk = tail + chunk
+            cut = chunk.rfind(b"\n") + 1               # Only parse complete lines
+            if cut == 0:
+                tail = chunk
+                continue
+            tail = chunk[cut:]
+            values = _parse_numbers(chunk[:cut], dtype)
+            if count + values.size > out.size:
+                # Grow in place by 1.5x (realloc usually avoids a copy)
+                out.resize(max(count + values.size, out.size * 3 // 2), refcheck=False)
+            out[count:count + values.size] = values
+            count += values.size
+    if tail:
+        values = _parse_numbers(tail, dtype)            # Last line without trailing newline
+        if count + values.size > out.size:
+            out.resize(count + values.size, refcheck=False)
+        out[count:count + values.size] = values
+        count += values.size
+    out.resize(count, refcheck=False)                   # Trim to the exact number of parsed values
+    return out
+
+UPLOAD_SLICE_BYTES = 1 << 20   # Buffer data per glBufferSubData call in sliced uploads
+
+def create_textured_object(vertex_path, index_path, chunk_size=None, use_cache=True, optimize=False,
+                           chunk_triangles=None, lod=False):
+    vertices, indices, bvh, lods = prepare_textured_object(vertex_path, index_path, chunk_size, use_cache,
+                                                           optimize, chunk_triangles, lod)
+    return upload_textured_object(vertices, indices) + (bvh, lods)
+
+def prepare_textured_object(vertex_path, index_path, chunk_size=None, use_cache=True, optimize=False,
+                            chunk_triangles=None, lod=False):
+    # CPU half of create_textured_object (no GL calls, safe on a worker thread):
+    # returns (vertices, indices, bvh, lods) ready for upload_textured_object
+    if use_cache:
+        # Memory-map the compiled binary mesh next to the sources (rebuilt automatically when stale);
+        # with optimize=True the cached mesh is welded, cache-reordered and index-narrowed once
+        from loader.mesh_cache import load_mesh
+        vertices, indices = load_mesh(vertex_path, index_path, chunk_size=chunk_size, optimize=optimize)
+    else:
+        # Parse vertex (x, y, z, u, v) floats and triangle indices; pass chunk_size to stream large files
+        vertices = load_number_file(vertex_path, np.float32, chunk_size)
+        indices = load_number_file(index_path, np.uint32, chunk_size)
+        if optimize:
+            from loader.mesh_optimizer import optimize_mesh
+            vertices, indices, _ = optimize_mesh(vertices, indices)
+
+    # Coarser levels of detail (quadric vertex clustering), appended to the same index buffer; the
+    # simplification result is cached next to the mesh. lods holds (first index, index count) per level.
+    lods = None
+    if lod:
+        from loader.lod import load_lods
+        lod_cache = os.path.splitext(vertex_path)[0] + ".lods.npz" if use_cache else None
+        lod_indices, lods = load_lods(vertices, indices, lod_cache)
+        indices = lod_indices
+
+    # Split the full-detail level into spatial chunks for frustum culling: its triangles are regrouped
+    # so every BVH node is a contiguous index range. Meshes with LODs always get a BVH (a single chunk
+    # without chunk_triangles) for their bounds; otherwise the returned BVH is None.
+    bvh = None
+    if chunk_triangles or lod:
+        from loader.culling import build_bvh
+        full = len(indices) if lods is None else int(lods[0][1])
+        full_detail, bvh = build_bvh(vertices, indices[:full], chunk_triangles or full // 3)
+        indices = np.concatenate([full_detail, indices[full:]])
+    return vertices, indices, bvh, lods
+
+def upload_textured_object(vertices, indices):
     # Generate OpenGL Vertex Array Object (VAO), Vertex Buffer Object (VBO), and Element Buffer Object (EBO)
     VAO = glGenVertexArrays(1)
     VBO = glGenBuffers(1)
     EBO = glGenBuffers(1)
 
-    glBindVertexArray(VAO)   # Bind VAO to record vertex attribute setup
+    state.bind_vertex_array(VAO)   # Bind VAO to record vertex attribute setup
 
     # Upload vertex data to GPU
-    glBindBuffer(GL_ARRAY_BUFFER, VBO)
+    state.bind_buffer(GL_ARRAY_BUFFER, VBO)
     glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
 
     # Upload index data to GPU
     glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, EBO)
     glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
 
+    return _finish_textured_object(VAO, EBO, indices)
+
+def upload_textured_object_sliced(vertices, indices, slice_bytes=UPLOAD_SLICE_BYTES):
+    # Generator version of upload_textured_object for uploads spread over several frames: the buffers
+    # are allocated first and filled slice_bytes at a time, yielding after each slice. The return value
+    # (StopIteration.value) is the same (VAO, EBO, index count, index type) tuple.
+    VAO = glGenVertexArrays(1)
+    VBO = glGenBuffers(1)
+    EBO = glGenBuffers(1)
+    # Allocate both buffers up front (no data yet); the element buffer binding is stored in the VAO
+    state.bind_vertex_array(VAO)
+    state.bind_buffer(GL_ARRAY_BUFFER, VBO)
+    glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, None, GL_STATIC_DRAW)
+    glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, EBO)
+    glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, None, GL_STATIC_DRAW)
+    for target, data in ((GL_ARRAY_BUFFER, vertices), (GL_ELEMENT_ARRAY_BUFFER, indices)):
+        data = np.ascontiguousarray(data).view(np.uint8)   # Byte view: slices at any offset
+        for offset in range(0, data.nbytes, slice_bytes):
+            # Frames in between bind other vertex arrays and buffers: rebind before each slice
+            state.bind_vertex_array(VAO)
+            state.bind_buffer(GL_ARRAY_BUFFER, VBO)
+            part = data[offset:offset + slice_bytes]
+            glBufferSubData(target, offset, part.nbytes, part)
+            yield
+    state.bind_vertex_array(VAO)
+    state.bind_buffer(GL_ARRAY_BUFFER, VBO)   # Attribute pointers read the current array buffer
+    return _finish_textured_object(VAO, EBO, indices)
+
+def _finish_textured_object(VAO, EBO, indices):
     # Define vertex attributes:
     # Each vertex consists of 5 floats: 3 for position (x,y,z) and 2 for texture coordinates (u,v)
     stride = 5 * ctypes.sizeof(ctypes.c_float)  # Total size per vertex in bytes
@@ -62,7 +159,10 @@ def create_textured_object(vertex_path, index_path):
     glVertexAttribPointer(1, 2, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(3 * ctypes.sizeof(ctypes.c_float)))
     glEnableVertexAttribArray(1)   # Enable attribute 1
 
-    glBindVertexArray(0)   # Unbind VAO to prevent accidental changes
+    state.bind_vertex_array(0)   # Unbind VAO to prevent accidental changes
+
+    # Element type matching the index array (uint16 or uint32) for glDrawElements
+    index_type = GL_UNSIGNED_SHORT if indices.dtype == np.uint16 else GL_UNSIGNED_INT
 
-    # Return VAO, EBO, and the count of indices for use in rendering calls
-    return VAO, EBO, len(indices)
+    # Return VAO, EBO, the count of indices and their GL type for use in rendering calls
+    return VAO, EBO, len(indices), index_type
@@ -0,0 +1,262 @@
+import ctypes            # Output buffer for 64-bit timer query results
+import json              # Chrome trace export
+import time              # CPU timers
+import numpy as np       # Rolling sample windows and percentiles
+from OpenGL.GL import *  # Timer queries
+from OpenGL.raw.GL.VERSION.GL_3_3 import glGetQueryObjectui64v   # Raw entry point (wrapped one mishandles 64-bit results)
+
+WINDOW = 600             # Frames kept per stage for rolling percentiles (10 s at 60 FPS)
+GPU_QUERY_DEPTH = 4      # Timer queries in flight per stage; results are read a few frames late
+TRACE_LIMIT = 200000     # Maximum events kept for trace export
+
+class _Samples:
+    # Fixed-size ring of per-frame samples (milliseconds or counts)
+    def __init__(self, size):
+        self.values = np.zeros(size, dtype=np.float64)
+        self.count = 0
+
+    def add(self, value):
+        self.values[self.count % len(self.values)] = value
+        self.count += 1
+
+    def window(self):
+        return self.values[:min(self.count, len(self.values))]
+
+class _GpuTimer:
+    # Ring of GL_TIME_ELAPSED queries for one stage, read back without stalling
+    def __init__(self):
+        self.queries = [int(q) for q in glGenQueries(GPU_QUERY_DEPTH)]
+        self.pending = []         # Queries ended but not yet read, oldest first
+        self.free = list(self.queries)
+        self.result = ctypes.c_uint64()
+
+    def begin(self):
+        if not self.free:
+            return False          # Everything still in flight; skip this frame rather than wait
+        query = self.free.pop()
+        glBeginQuery(GL_TIME_ELAPSED, query)
+        self.pending.append(query)
+        return True
+
+    def end(self):
+        glEndQuery(GL_TIME_ELAPSED)
+
+    def collect(self):
+        # Yield finished results in milliseconds
+        while self.pending and glGetQueryObjectiv(self.pending[0], GL_QUERY_RESULT_AVAILABLE):
+            query = self.pending.pop(0)
+            glGetQueryObjectui64v(query, GL_QUERY_RESULT, ctypes.byref(self.result))
+            self.free.append(query)
+            yield self.result.value / 1e6
+
+    def delete(self):
+        glDeleteQueries(len(self.queries), self.queries)
+
+class _Scope:
+    # Reusable context manager for one named stage (one instance per name, so entering is allocation-free)
+    __slots__ = ("profiler", "name", "gpu", "start", "gpu_active")
+
+    def __init__(self, profiler, name, gpu):
+        self.profiler = profiler
+        self.name = name
+        self.gpu = gpu
+        self.start = 0
+        self.gpu_active = False
+
+    def __enter__(self):
+        profiler = self.profiler
+        if self.gpu and profiler.gpu_supported and not profiler._gpu_busy:
+            # Timer queries cannot nest, so only the outermost GPU scope is measured
+            self.gpu_active = profiler._gpu_timer(self.name).begin()
+            profiler._gpu_busy = self.gpu_active
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        profiler = self.profiler
+        if self.gpu_active:
+            profiler._gpu_timers[self.name].end()
+            profiler._gpu_busy = self.gpu_active = False
+        profiler._frame_cpu[self.name] = profiler._frame_cpu.get(self.name, 0) + (end - self.start)
+        if profiler.trace:
+            profiler._record(self.name, self.start, end)
+        return False
+
+class Profiler:
+    # Named-scope frame profiler: CPU time per stage every frame, GPU time per stage through
+    # timer queries where supported, rolling p50/p95/p99, per-frame counters and trace export.
+    #
+    #     profiler.begin_frame()
+    #     profiler.stage("events")             # Sequential top-level stages...
+    #     profiler.stage("draw", gpu=True)
+    #     with profiler.scope("culling"):      # ...or nested scopes
+    #         ...
+    #     profiler.count("draw calls")
+    #     profiler.end_frame()
+    def __init__(self, enabled=True, gpu=True, trace=False, window=WINDOW):
+        self.enabled = enabled
+        self.trace = trace
+        self.window = window
+        # GPU timing needs GL 3.3 / ARB_timer_query and a current context
+        self.gpu_supported = enabled and gpu and bool(glGenQueries) and _has_timer_query()
+
+        self._scopes = {}
+        self._gpu_timers = {}
+        self._gpu_busy = False
+        self._cpu = {}            # Stage -> _Samples (ms)
+        self._gpu = {}            # Stage -> _Samples (ms)
+        self._counters = {}       # Counter -> _Samples (per frame)
+        self._frame_cpu = {}      # Stage -> accumulated ns in the current frame
+        self._frame_counts = {}   # Counter -> accumulated count in the current frame
+        self._frame_start = None
+        self._stage = None        # Scope of the current top-level stage
+        self._events = []         # (name, start ns, end ns, thread) for trace export
+        self._origin = time.perf_counter_ns()
+        self.frames = 0
+
+    def scope(self, name, gpu=False):
+        if not self.enabled:
+            return _NULL_SCOPE
+        scope = self._scopes.get((name, gpu))
+        if scope is None:
+            scope = self._scopes[(name, gpu)] = _Scope(self, name, gpu)
+        return scope
+
+    def stage(self, name, gpu=False):
+        # End the current top-level stage (if any) and start the next one
+        if not self.enabled:
+            return
+        if self._stage is not None:
+            self._stage.__exit__(None, None, None)
+        self._stage = self.scope(name, gpu)
+        self._stage.__enter__()
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            self._frame_counts[name] = self._frame_counts.get(name, 0) + amount
+
+    def begin_frame(self):
+        if self.enabled:
+            self._frame_start = time.perf_counter_ns()
+
+    def end_frame(self):
+        if not self.enabled or self._frame_start is None:
+            return
+        if self._stage is not None:
+            self._stage.__exit__(None, None, None)
+            self._stage = None
+        end = time.perf_counter_ns()
+        self._samples(self._cpu, "frame").add((end - self._frame_start) / 1e6)
+        if self.trace:
+            self._record("frame", self._frame_start, end)
+
+        for name, ns in self._frame_cpu.items():
+            self._samples(self._cpu, name).add(ns / 1e6)
+        for name, amount in self._frame_counts.items():
+            self._samples(self._counters, name).add(amount)
+        self._frame_cpu.clear()
+        self._frame_counts.clear()
+
+        for name, timer in self._gpu_timers.items():
+            for ms in timer.collect():
+                self._samples(self._gpu, name).add(ms)
+        self._frame_start = None
+        self.frames += 1
+
+    def _samples(self, table, name):
+        samples = table.get(name)
+        if samples is None:
+            samples = table[name] = _Samples(self.window)
+        return samples
+
+    def _gpu_timer(self, name):
+        timer = self._gpu_timers.get(name)
+        if timer is None:
+            timer = self._gpu_timers[name] = _GpuTimer()
+        return timer
+
+    def _record(self, name, start, end, thread=0):
+        if len(self._events) < TRACE_LIMIT:
+            self._events.append((name, start, end, thread))
+
+    def latest(self, name, gpu=False):
+        # Most recent sample of a stage in ms (GPU results arrive a few frames late), or None
+        samples = (self._gpu if gpu else self._cpu).get(name)
+        if samples is None or samples.count == 0:
+            return None
+        return float(samples.values[(samples.count - 1) % len(samples.values)])
+
+    def summary(self):
+        # {stage: {"cpu": (p50, p95, p99), "gpu": (p50, p95, p99)}, counter: {"count": (...)}} over the rolling window
+        result = {}
+        for kind, table in (("cpu", self._cpu), ("gpu", self._gpu), ("count", self._counters)):
+            for name, samples in table.items():
+                values = samples.window()
+                if len(values):
+                    result.setdefault(name, {})[kind] = tuple(np.percentile(values, (50, 95, 99)))
+        return result
+
+    def hud_text(self):
+        # One-line p50/p95 overview suitable for a window caption or console line
+        parts = []
+        for name, stats in self.summary().items():
+            if "cpu" in stats:
+                text = f"{name} {stats['cpu'][0]:.2f}/{stats['cpu'][1]:.2f}"
+                if "gpu" in stats:
+                    text += f" (gpu {stats['gpu'][0]:.2f})"
+            else:
+                text = f"{name} {stats['count'][0]:.0f}"
+            parts.append(text)
+        return "p50/p95 ms | " + " | ".join(parts)
+
+    def report(self):
+        lines = [f"{'stage':<16}{'cpu p50':>9}{'p95':>9}{'p99':>9}{'gpu p50':>9}{'p95':>9}{'p99':>9}"]
+        for name, stats in self.summary().items():
+            if "count" in stats:
+                lines.append(f"{name:<16}" + "".join(f"{v:>9.0f}" for v in stats["count"]))
+                continue
+            cpu = stats["cpu"]
+            gpu = stats.get("gpu")
+            line = f"{name:<16}" + "".join(f"{v:>9.3f}" for v in cpu)
+            if gpu:
+                line += "".join(f"{v:>9.3f}" for v in gpu)
+            lines.append(line)
+        return "\n".join(lines)
+
+    def export_trace(self, path):
+        # Chrome trace (chrome://tracing, Perfetto) for .json paths, flat CSV otherwise
+        if path.endswith(".json"):
+            events = [{"name": name, "ph": "X", "pid": 0, "tid": thread,
+                       "ts": (start - self._origin) / 1000.0, "dur": (end - start) / 1000.0}
+                      for name, start, end, thread in self._events]
+            with open(path, "w") as f:
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        else:
+            with open(path, "w") as f:
+                f.write("name,start_ms,duration_ms\n")
+                for name, start, end, _ in self._events:
+                    f.write(f"{name},{(start - self._origin) / 1e6:.4f},{(end - start) / 1e6:.4f}\n")
+
+    def delete(self):
+        for timer in self._gpu_timers.values():
+            timer.delete()
+        self._gpu_timers.clear()
+
+class _NullScope:
+    # Stand-in when profiling is disabled
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SCOPE = _NullScope()
+
+def _has_timer_query():
+    try:
+        major = glGetIntegerv(GL_MAJOR_VERSION)
+        minor = glGetIntegerv(GL_MINOR_VERSION)
+    except Exception:
+        return False
+    return (int(major), int(minor)) >= (3, 3)
@@ -0,0 +1,124 @@
+from OpenGL.GL import *  # OpenGL functions/constants
+import ctypes            # Byte offsets for the raw draw calls
+import numpy as np       # Indirect command packing
+# Raw entry points: no PyOpenGL argument conversion; error checking only when OpenGL.ERROR_CHECKING
+# is on (see gl_options)
+from OpenGL.raw.GL.VERSION.GL_1_4 import glMultiDrawElements as raw_multi_draw_elements
+from OpenGL.raw.GL.VERSION.GL_3_1 import glDrawElementsInstanced as raw_draw_instanced
+from OpenGL.raw.GL.VERSION.GL_4_2 import glDrawElementsInstancedBaseInstance as raw_draw_base_instance
+from OpenGL.raw.GL.VERSION.GL_4_3 import glMultiDrawElementsIndirect as raw_multi_draw_indirect
+
+from loader.gl_state import state   # Program/texture/VAO binds, skipped when unchanged
+
+# Draw commands are collected for a frame, sorted by program, texture and vertex array so each
+# state change happens once, and every run of commands sharing that state is submitted with a
+# single glMultiDrawElementsIndirect (GL 4.3) from one buffer uploaded per flush. Without indirect
+# drawing each command becomes an instanced draw (base instance where available), and runs of
+# single-instance commands are merged into one glMultiDrawElements.
+
+COMMAND_BYTES = 20       # DrawElementsIndirectCommand: count, instanceCount, firstIndex, baseVertex, baseInstance
+NO_BIND = -1             # Program/texture key meaning "leave the current binding alone"
+
+class RenderQueue:
+    def __init__(self, indirect=True):
+        self.indirect = indirect and bool(glMultiDrawElementsIndirect)
+        self.base_instance = bool(glDrawElementsInstancedBaseInstance)
+        self.buffer = glGenBuffers(1) if self.indirect else None   # GL_DRAW_INDIRECT_BUFFER
+        self.capacity = 0
+        self._keys = []          # (program, texture target, texture, vao, index type) per command
+        self._commands = []      # [count, instances, first index, base vertex, base instance] per command
+        self._rebase = []        # Per-instance attribute repointing for GL without base instance, or None
+
+    def __len__(self):
+        return len(self._commands)
+
+    def submit(self, vao, index_type, count, first_index=0, instances=1, base_instance=0, program=None,
+               texture=None, texture_target=GL_TEXTURE_2D, rebase=None):
+        # Queue an indexed triangle draw. first_index counts indices, not bytes. base_instance selects
+        # the first per-instance attribute element; on GL without base instance support rebase(first)
+        # is called to point the VAO's per-instance attributes there instead (and rebase(0) after).
+        # program/texture None keep whatever is bound when the queue is flushed.
+        self._keys.append((NO_BIND if program is None else program, texture_target,
+                           NO_BIND if texture is None else texture, vao, index_type))
+        self._commands.append((count, instances, first_index, 0, base_instance))
+        self._rebase.append(rebase)
+
+    def flush(self):
+        # Submit and clear everything queued; returns the number of draw calls issued
+        if not self._commands:
+            return 0
+        order = sorted(range(len(self._keys)), key=self._keys.__getitem__)   # Stable within a state group
+        commands = np.array(self._commands, dtype=np.uint32)[order]
+        keys = [self._keys[i] for i in order]
+        rebase = [self._rebase[i] for i in order]
+        self._keys, self._commands, self._rebase = [], [], []
+
+        if self.indirect:
+            # Orphan the previous frame's storage so the write never waits for draws still reading it
+            state.bind_buffer(GL_DRAW_INDIRECT_BUFFER, self.buffer)
+            self.capacity = max(commands.nbytes, self.capacity, 64 * COMMAND_BYTES)
+            glBufferData(GL_DRAW_INDIRECT_BUFFER, self.capacity, None, GL_STREAM_DRAW)
+            glBufferSubData(GL_DRAW_INDIRECT_BUFFER, 0, commands.nbytes, commands)
+
+        draw_calls = 0
+        start = 0
+        while start < len(keys):
+            end = start + 1
+            while end < len(keys) and keys[end] == keys[start]:
+                end += 1
+            program, target, texture, vao, index_type = keys[start]
+            if program != NO_BIND:
+                state.use_program(program)
+            if texture != NO_BIND:
+                state.bind_texture(target, texture)
+            state.bind_vertex_array(vao)
+            if self.indirect:
+                raw_multi_draw_indirect(GL_TRIANGLES, index_type, ctypes.c_void_p(start * COMMAND_BYTES),
+                                        end - start, 0)
+                draw_calls += 1
+            else:
+                draw_calls += self._draw_direct(commands[start:end], rebase[start:end], index_type)
+            start = end
+        return draw_calls
+
+    def _draw_direct(self, commands, rebase, index_type):
+        index_size = 2 if index_type == GL_UNSIGNED_SHORT else 4
+        draw_calls = 0
+        i = 0
+        while i < len(commands):
+            count, instances, first_index, _, base_instance = (int(v) for v in commands[i])
+            rebased = base_instance != 0 and not self.base_instance and rebase[i] is not None
+            if rebased:
+                rebase[i](base_instance)
+            if instances == 1:
+                # Single copies of the same instance (e.g. visible chunks of one mesh): one multi-draw
+                j = i + 1
+                while j < len(commands) and commands[j, 1] == 1 and commands[j, 4] == base_instance:
+                    j += 1
+                if j - i > 1 and base_instance != 0 and not rebased and rebase[i] is not None:
+                    rebase[i](base_instance)      # glMultiDrawElements has no base instance
+                    rebased = True
+                if base_instance == 0 or rebased:
+                    counts = commands[i:j, 0].astype(np.int32)
+                    offsets = commands[i:j, 2].astype(np.uintp) * np.uintp(index_size)
+                    raw_multi_draw_elements(GL_TRIANGLES, counts, index_type, offsets, j - i)
+                    draw_calls += 1
+                    if rebased:
+                        rebase[i](0)
+                    i = j
+                    continue
+            offset = ctypes.c_void_p(first_index * index_size)
+            if base_instance == 0 or rebased:
+                raw_draw_instanced(GL_TRIANGLES, count, index_type, offset, instances)
+            else:
+                raw_draw_base_instance(GL_TRIANGLES, count, index_type, offset, instances, base_instance)
+            draw_calls += 1
+            if rebased:
+                rebase[i](0)
+            i += 1
+        return draw_calls
+
+    def delete(self):
+        if self.buffer is not None:
+            state.delete_buffers([self.buffer])
+            self.buffer = None
@@ -0,0 +1,70 @@
+import math              # Affordable scale from the frame time
+
+from loader import config   # Frame budget and scale bounds
+
+# Dynamic resolution: picks the scene's render scale (fraction of the window size per axis) from
+# measured frame times so frames stay within a time budget. A PID controller in velocity form
+# turns the relative budget error into scale changes (no integral windup at the bounds); the scale
+# only moves when the controller's wish differs from it by `hysteresis`, in multiples of `step`,
+# so the layer isn't resized on every bit of timing noise. It never scales up past the scale the
+# measured frame time predicts still fits the budget, so it settles on the largest step that does.
+#
+#     controller = ScaleController(target_ms=15.0)
+#     scale = controller.update(frame_ms)      # Once per rendered frame
+#     layer.set_scale(scale)
+
+class ScaleController:
+    def __init__(self, target_ms=None, min_scale=None, max_scale=None, kp=0.3, ki=0.1, kd=0.05,
+                 hysteresis=None, step=0.05, smoothing=0.3, headroom=0.05):
+        self.target_ms = config.RENDER_SCALE_TARGET_MS if target_ms is None else target_ms
+        self.min_scale = config.RENDER_SCALE_MIN if min_scale is None else min_scale
+        self.max_scale = config.RENDER_SCALE_MAX if max_scale is None else max_scale
+        self.kp, self.ki, self.kd = kp, ki, kd
+        self.hysteresis = config.RENDER_SCALE_HYSTERESIS if hysteresis is None else hysteresis
+        self.step = step
+        self.smoothing = smoothing          # Weight of the newest sample in the frame time average
+        self.headroom = headroom            # Share of the budget kept free when scaling up (timing noise)
+        self.scale = self.max_scale         # Applied scale
+        self.desired = self.max_scale       # Controller output before hysteresis and quantization
+        self.measured_ms = None             # Smoothed frame time
+        self._errors = (0.0, 0.0)           # Previous two errors (derivative terms)
+        self.changes = 0                    # Times the applied scale changed
+
+    def update(self, frame_ms):
+        # Feed one frame's time (ms; the larger of CPU work and GPU time); returns the scale to use
+        if frame_ms is None:
+            return self.scale
+        if self.measured_ms is None:
+            self.measured_ms = frame_ms
+        else:
+            self.measured_ms += (frame_ms - self.measured_ms) * self.smoothing
+
+        # Relative budget error: > 0 means headroom (scale up), < 0 over budget (scale down).
+        # Pixel cost grows with scale^2, so the error is halved to act on the scale per axis.
+        error = 0.5 * (self.target_ms - self.measured_ms) / self.target_ms
+        previous, before = self._errors
+        delta = (self.kp * (error - previous) + self.ki * error
+                 + self.kd * (error - 2.0 * previous + before))
+        self._errors = (error, previous)
+        self.desired = min(max(self.desired + delta, self.min_scale), self.max_scale)
+        if self.desired > self.scale:
+            # Only scale up as far as the measured time says still fits (pixel cost ~ scale^2):
+            # otherwise a budget between two steps flips the scale back and forth between them
+            budget = self.target_ms * (1.0 - self.headroom)
+            affordable = self.scale * math.sqrt(budget / max(self.measured_ms, 1e-6))
+            self.desired = min(self.desired, max(affordable, self.scale))
+
+        pinned = self.desired in (self.min_scale, self.max_scale)   # Bounds closer than `hysteresis` are still reached
+        if abs(self.desired - self.scale) >= self.hysteresis or (pinned and self.desired != self.scale):
+            steps = self.desired / self.step
+            steps = math.floor(steps + 1e-6) if self.desired > self.scale else round(steps)   # Up: never past what fits
+            scale = round(steps * self.step, 6)   # 0.7, not 0.7000000000000001
+            scale = min(max(scale, self.min_scale), self.max_scale)
+            if scale != self.scale:
+                self.scale = scale
+                self.changes += 1
+        return self.scale
+
+    def stats(self):
+        return {"scale": self.scale, "desired": round(self.desired, 3), "changes": self.changes,
+                "frame ms": None if self.measured_ms is None else round(self.measured_ms, 2)}
@@ -0,0 +1,51 @@
+import glm               # OpenGL Mathematics library for matrix/vector math
+from OpenGL.GL import *  # OpenGL functions/constants
+import numpy as np       # Row-major matrices for frustum culling
+
+from loader.gl_state import state   # Binds and enables are skipped when nothing changes
+
+# Frame drawing shared by the windowed app (main.py) and the offscreen tools (benchmark.py)
+
+def view_matrix(camera_distance):
+    # Setup view matrix with camera position looking at origin
+    return glm.lookAt(glm.vec3(0, camera_distance, 0),  # Camera position along Y axis
+                      glm.vec3(0, 0, 0),                # Look at origin (castle)
+                      glm.vec3(0, 0, -1))               # Up vector pointing backward on Z axis
+
+def draw_background(bg_shader, bg_VAO, video_texture):
+    glClear(GL_COLOR_BUFFER_BIT)     # Clear color buffer (don't clear depth yet)
+    state.disable(GL_DEPTH_TEST)     # Disable depth test so quad draws over everything
+
+    state.use_program(bg_shader)     # Use background shader program
+    state.bind_vertex_array(bg_VAO)  # Bind quad VAO
+    state.bind_texture(GL_TEXTURE_2D, video_texture, unit=0)  # Video texture on unit 0 (the sampler's unit, set at creation)
+    glDrawArrays(GL_TRIANGLES, 0, 6)  # Draw two triangles forming the quad
+
+    state.enable(GL_DEPTH_TEST)      # Enable depth testing again for 3D scene
+    glClear(GL_DEPTH_BUFFER_BIT)     # Clear depth buffer for new frame
+    return 1                         # Draw calls issued
+
+def draw_scene(shader, camera, view, scene, projection=None, viewport_height=None):
+    # camera: uniform_buffer.CameraUniforms, written once here and read by every program
+    state.use_program(shader)        # Instanced textured shader (create_shader_program(("INSTANCED",)))
+    camera.update(view, projection)
+    scene.update()                   # Recompute world matrices of moved nodes only
+    # With a projection, cull against the view frustum and pick levels of detail by projected size
+    # (counts in scene.stats)
+    view_projection = None if projection is None else np.array(projection * view)
+    lod_scale = None if viewport_height is None else projection[1][1] * viewport_height / 2
+    return scene.draw(view_projection, lod_scale)   # One draw per mesh + texture + LOD; returns draw calls
+
+def draw_scene_cached(layer, shader, camera, view, scene, projection, viewport_height=None):
+    # draw_scene through a layer_cache.LayerCache: the scene is only redrawn (into the layer, at the
+    # layer's render scale) when the camera or a node moved, and the layer is composited over the
+    # background every frame
+    scene.update()
+    draw_calls = 0
+    if layer.begin(np.array(projection * view), scene.world_matrices()):
+        draw_calls = draw_scene(shader, camera, view, scene, projection,
+                                None if viewport_height is None else viewport_height * layer.scale)
+        layer.end()
+    else:
+        scene.stats = dict.fromkeys(scene.stats, 0)   # Nothing was drawn: don't report the last draw again
+    return draw_calls + layer.composite()
@@ -0,0 +1,315 @@
+from OpenGL.GL import *  # OpenGL functions/constants
+import numpy as np       # NumPy for batched transform math
+import ctypes            # Pointer offsets for instance attributes
+
+from loader.culling import frustum_planes, classify_boxes, OUTSIDE   # Instance and chunk frustum culling
+from loader.lod import select_levels                                  # Distance-based level of detail
+from loader.gl_state import state                                     # Skips redundant binds
+from loader.render_queue import RenderQueue                           # Sorted, batched draw submission
+
+INSTANCE_LOCATION = 3    # mat4 instanceModel occupies attribute locations 3-6 (see textured_shader INSTANCED)
+LAYER_LOCATION = 7       # float instanceLayer: texture array layer (see textured_shader TEXTURE_ARRAY)
+INSTANCE_FLOATS = 17     # Per-instance data: column-major mat4 + layer
+INSTANCE_BYTES = INSTANCE_FLOATS * 4
+
+def euler_matrices(rotation):
+    # (N, 3) XYZ angles in degrees -> (N, 3, 3) matrices for Rx @ Ry @ Rz
+    # (the same order as glm.rotate(X) followed by glm.rotate(Y))
+    a, b, c = np.radians(rotation).T
+    ca, sa, cb, sb, cc, sc = np.cos(a), np.sin(a), np.cos(b), np.sin(b), np.cos(c), np.sin(c)
+    m = np.empty((len(rotation), 3, 3))
+    m[:, 0, 0] = cb * cc
+    m[:, 0, 1] = -cb * sc
+    m[:, 0, 2] = sb
+    m[:, 1, 0] = sa * sb * cc + ca * sc
+    m[:, 1, 1] = -sa * sb * sc + ca * cc
+    m[:, 1, 2] = -sa * cb
+    m[:, 2, 0] = -ca * sb * cc + sa * sc
+    m[:, 2, 1] = ca * sb * sc + sa * cc
+    m[:, 2, 2] = ca * cb
+    return m
+
+class Mesh:
+    # A drawable mesh (from model_loader) plus the per-instance transform/layer buffer attached to its VAO
+    # (the instance attributes live in the VAO, so a VAO belongs to one Mesh)
+    def __init__(self, vao, count, index_type, bvh=None, lods=None):
+        self.vao = vao
+        self.count = count
+        self.index_type = index_type
+        self.bvh = bvh                  # Chunk hierarchy for frustum culling, or None to always draw everything
+        # (first index, index count) of each level of detail in the element buffer; level 0 is the full mesh
+        self.lods = np.array([[0, count]], dtype=np.int64) if lods is None else np.asarray(lods, dtype=np.int64)
+        self.index_size = 2 if index_type == GL_UNSIGNED_SHORT else 4
+        self.instance_vbo = glGenBuffers(1)
+        self.capacity = 0
+        self.uploaded = None            # Node order of the matrices in the instance buffer
+
+        state.bind_vertex_array(vao)
+        state.bind_buffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        self._point_instances(0)
+        for column in range(4):
+            glEnableVertexAttribArray(INSTANCE_LOCATION + column)
+            glVertexAttribDivisor(INSTANCE_LOCATION + column, 1)   # Advance once per instance
+        glEnableVertexAttribArray(LAYER_LOCATION)
+        glVertexAttribDivisor(LAYER_LOCATION, 1)
+        state.bind_vertex_array(0)
+
+    def _point_instances(self, first):
+        # mat4 attribute = four vec4 columns; matrices are stored column-major (as GL expects)
+        for column in range(4):
+            glVertexAttribPointer(INSTANCE_LOCATION + column, 4, GL_FLOAT, GL_FALSE, INSTANCE_BYTES,
+                                  ctypes.c_void_p(first * INSTANCE_BYTES + column * 16))
+        glVertexAttribPointer(LAYER_LOCATION, 1, GL_FLOAT, GL_FALSE, INSTANCE_BYTES,
+                              ctypes.c_void_p(first * INSTANCE_BYTES + 64))
+
+    def rebase(self, first):
+        # Per-instance attributes from instance `first` on (render queue fallback without base instance)
+        state.bind_buffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        self._point_instances(first)
+
+    def upload(self, instances):
+        # (N, INSTANCE_FLOATS) float32 rows
+        state.bind_buffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        if len(instances) > self.capacity:
+            self.capacity = max(len(instances), self.capacity * 2, 16)
+            glBufferData(GL_ARRAY_BUFFER, self.capacity * INSTANCE_BYTES, None, GL_DYNAMIC_DRAW)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, instances.nbytes, instances)
+
+    def delete(self):
+        state.delete_buffers([self.instance_vbo])
+
+class Node:
+    # Handle to one scene node; transform setters mark the node dirty
+    __slots__ = ("scene", "index")
+
+    def __init__(self, scene, index):
+        self.scene = scene
+        self.index = index
+
+    def _set(self, array, value):
+        array[self.index] = value
+        self.scene._local_dirty[self.index] = True
+
+    position = property(lambda self: self.scene._position[self.index],
+                        lambda self, value: self._set(self.scene._position, value))
+    rotation = property(lambda self: self.scene._rotation[self.index],      # XYZ Euler angles, degrees
+                        lambda self, value: self._set(self.scene._rotation, value))
+    scale = property(lambda self: self.scene._scale[self.index],
+                     lambda self, value: self._set(self.scene._scale, value))
+    layer = property(lambda self: int(self.scene._layer[self.index]),       # Texture array layer
+                     lambda self, value: self._set(self.scene._layer, value))
+
+    @property
+    def world(self):
+        return self.scene._world[self.index]
+
+class Scene:
+    # Scene graph stored as flat arrays (structure of arrays), so transform updates are a handful of
+    # NumPy operations per tree level instead of per-node matrix math. World matrices are cached and
+    # only recomputed for nodes whose own or ancestors' transforms changed. Nodes that share a
+    # mesh and texture are drawn with one instanced command per level of detail (submitted through a
+    # render queue, so all of them can go out as one indirect multi-draw); with an
+    # array texture (texture_target=GL_TEXTURE_2D_ARRAY, atlas.create_texture_array) nodes pick their
+    # image by layer, so differently textured copies of a mesh still share one draw.
+    def __init__(self, capacity=64, culling=True, lod_thresholds=None, lod_hysteresis=0.15,
+                 texture_target=GL_TEXTURE_2D, indirect=True):
+        self.culling = culling                 # Frustum-cull instances and chunks when drawn with a view_projection
+        self.lod_thresholds = lod_thresholds   # Projected radius (pixels) below which LOD 1, 2, ... are used
+        self.lod_hysteresis = lod_hysteresis
+        self.texture_target = texture_target   # GL_TEXTURE_2D (single textures or atlases) or GL_TEXTURE_2D_ARRAY
+        self.indirect = indirect               # Let the scene's render queue use glMultiDrawElementsIndirect
+        self._queue = None                     # Created with the first draw() without a caller's queue
+        self.count = 0
+        self._parent = np.full(capacity, -1, dtype=np.int64)
+        self._depth = np.zeros(capacity, dtype=np.int64)
+        self._position = np.zeros((capacity, 3))
+        self._rotation = np.zeros((capacity, 3))
+        self._scale = np.ones((capacity, 3))
+        self._local = np.tile(np.eye(4), (capacity, 1, 1))
+        self._world = np.tile(np.eye(4), (capacity, 1, 1))
+        self._local_dirty = np.zeros(capacity, dtype=bool)
+        self._changed = np.zeros(capacity, dtype=bool)   # World matrix changed since the last draw()
+        self._lod = np.zeros(capacity, dtype=np.int64)   # Current level of detail per node
+        self._layer = np.zeros(capacity, dtype=np.float32)   # Texture array layer per node
+        self._levels = None                              # Node indices grouped by depth (rebuilt on add)
+
+        self._drawables = {}      # (mesh, texture) -> list of node indices
+        self._batches = None      # mesh -> [(texture, node index array)], rebuilt on add
+        self.meshes = []
+        self.stats = {}           # Instance/chunk culling and triangle counts of the last draw()
+
+    def add_mesh(self, vao, count, index_type, bvh=None, lods=None):
+        mesh = Mesh(vao, count, index_type, bvh, lods)
+        self.meshes.append(mesh)
+        return mesh
+
+    def _grow(self):
+        capacity = len(self._parent) * 2
+        for name in ("_parent", "_depth", "_position", "_rotation", "_scale", "_local", "_world",
+                     "_local_dirty", "_changed", "_lod", "_layer"):
+            old = getattr(self, name)
+            new = np.resize(old, (capacity,) + old.shape[1:])
+            new[len(old):] = {"_parent": -1, "_scale": 1, "_local": np.eye(4), "_world": np.eye(4)}.get(name, 0)
+            setattr(self, name, new)
+
+    def add_node(self, parent=None, position=(0, 0, 0), rotation=(0, 0, 0), scale=(1, 1, 1),
+                 mesh=None, texture=None, layer=0):
+        if self.count == len(self._parent):
+            self._grow()
+        index = self.count
+        self.count += 1
+        self._parent[index] = -1 if parent is None else parent.index
+        self._depth[index] = 0 if parent is None else self._depth[parent.index] + 1
+        self._position[index] = position
+        self._rotation[index] = rotation
+        self._scale[index] = scale
+        self._layer[index] = layer
+        self._local_dirty[index] = True
+        self._levels = None
+        if mesh is not None:
+            self._drawables.setdefault((mesh, texture), []).append(index)
+            self._batches = None
+        return Node(self, index)
+
+    def _rebuild_tables(self):
+        depth = self._depth[:self.count]
+        order = np.argsort(depth, kind="stable")
+        bounds = np.searchsorted(depth[order], np.arange(depth.max() + 2))
+        self._levels = [order[bounds[d]:bounds[d + 1]] for d in range(len(bounds) - 1)]
+
+    def _rebuild_batches(self):
+        self._batches = {}
+        for (mesh, texture), nodes in self._drawables.items():
+            self._batches.setdefault(mesh, []).append((texture, np.array(nodes, dtype=np.int64)))
+
+    def world_matrices(self):
+        # (count, 4, 4) world matrices as of the last update()
+        return self._world[:self.count]
+
+    def update(self):
+        if self.count == 0:
+            return
+        if self._levels is None:
+            self._rebuild_tables()
+
+        # Local matrices for dirty nodes: T * R * S, all dirty nodes at once
+        dirty = np.flatnonzero(self._local_dirty[:self.count])
+        if len(dirty):
+            local = self._local[dirty]
+            local[:, :3, :3] = euler_matrices(self._rotation[dirty]) * self._scale[dirty][:, None, :]
+            local[:, :3, 3] = self._position[dirty]
+            self._local[dirty] = local
+
+        # World matrices level by level; a node is recomputed if it or any ancestor changed. Changes
+        # add up until draw() has uploaded them (update() may run on frames that don't draw)
+        changed = self._changed
+        changed[:self.count] |= self._local_dirty[:self.count]
+        for level, nodes in enumerate(self._levels):
+            if level > 0:
+                changed[nodes] |= changed[self._parent[nodes]]
+            update = nodes[changed[nodes]]
+            if len(update) == 0:
+                continue
+            if level == 0:
+                self._world[update] = self._local[update]
+            else:
+                self._world[update] = self._world[self._parent[update]] @ self._local[update]
+        self._local_dirty[:self.count] = False
+
+    def _select_lods(self, mesh, nodes, view_projection, lod_scale):
+        # Projected bounding sphere radius in pixels: radius * scale * lod_scale / clip w
+        world = self._world[nodes]
+        center = world[:, :3, :3] @ mesh.bvh.center[0] + world[:, :3, 3]
+        depth = np.maximum(center @ view_projection[3, :3] + view_projection[3, 3], 1e-6)
+        scale = np.linalg.norm(world[:, :3, :3], axis=1).max(axis=1)
+        size = np.linalg.norm(mesh.bvh.extent[0]) * scale * lod_scale / depth
+        thresholds = self.lod_thresholds[:len(mesh.lods) - 1]
+        self._lod[nodes] = select_levels(size, self._lod[nodes], thresholds, self.lod_hysteresis)
+        return self._lod[nodes]
+
+    def draw(self, view_projection=None, lod_scale=None, queue=None, program=None):
+        # Draw every (mesh, texture, level of detail) group with one instanced command; the instanced
+        # textured shader must be in use (or given as program). view_projection (row-major NumPy,
+        # clip = M @ point) enables:
+        #   - culling: instances outside the frustum are skipped, and a single visible full-detail
+        #     instance of a chunked mesh (see culling.build_bvh) draws only its visible chunks
+        #   - level of detail: with lod_scale (projection[1][1] * viewport height / 2) and
+        #     lod_thresholds, each instance uses the level matching its projected size
+        # Commands go to `queue` (a render_queue.RenderQueue the caller flushes, returns 0) or to the
+        # scene's own queue, flushed here (returns the draw calls issued). Culling and triangle
+        # counts are left in self.stats.
+        if self._batches is None:
+            self._rebuild_batches()
+        own_queue = queue is None
+        if own_queue:
+            if self._queue is None:
+                self._queue = RenderQueue(self.indirect)
+            queue = self._queue
+        cull = self.culling and view_projection is not None
+        planes = frustum_planes(view_projection) if cull else None
+        stats = self.stats = dict.fromkeys(("instances drawn", "instances culled", "chunks drawn",
+                                            "chunks culled", "triangles drawn"), 0)
+        for mesh, batches in self._batches.items():
+            nodes = np.concatenate([indices for _, indices in batches])
+            texture_of = np.concatenate([np.full(len(indices), i) for i, (_, indices) in enumerate(batches)])
+
+            local_planes = None
+            keep = np.ones(len(nodes), dtype=bool)
+            if cull and mesh.bvh is not None:
+                # Frustum planes in each instance's model space, tested against the mesh bounds
+                local_planes = planes @ self._world[nodes]
+                keep = classify_boxes(mesh.bvh.center[0], mesh.bvh.extent[0], local_planes) != OUTSIDE
+                stats["instances culled"] += int(len(nodes) - keep.sum())
+            level = np.zeros(len(nodes), dtype=np.int64)
+            if (len(mesh.lods) > 1 and self.lod_thresholds and lod_scale and mesh.bvh is not None
+                    and view_projection is not None):
+                level = self._select_lods(mesh, nodes, view_projection, lod_scale)
+
+            # Visible instances grouped by texture, then level; matrices (column-major float32) and
+            # layers are re-uploaded only when something moved or the grouping changed
+            order = np.flatnonzero(keep)
+            order = order[np.lexsort((level[order], texture_of[order]))]
+            drawn = nodes[order]
+            if self._changed[drawn].any() or not np.array_equal(drawn, mesh.uploaded):
+                instances = np.empty((len(drawn), INSTANCE_FLOATS), dtype=np.float32)
+                instances[:, :16] = self._world[drawn].transpose(0, 2, 1).reshape(-1, 16)
+                instances[:, 16] = self._layer[drawn]
+                mesh.upload(instances)
+                mesh.uploaded = drawn
+
+            group_key = texture_of[order] * len(mesh.lods) + level[order]
+            starts = np.flatnonzero(np.r_[True, group_key[1:] != group_key[:-1]]) if len(order) else []
+            ends = np.r_[starts[1:], len(order)] if len(order) else []
+            for first, end in zip(starts, ends):
+                first, instances = int(first), int(end - first)
+                texture = batches[texture_of[order[first]]][0]
+                lod = int(level[order[first]])
+                stats["instances drawn"] += instances
+                command = dict(program=program, texture=texture, texture_target=self.texture_target,
+                               base_instance=first, rebase=mesh.rebase)
+
+                if instances == 1 and lod == 0 and local_planes is not None and mesh.bvh.chunks > 1:
+                    # One visible full-detail copy: cull its chunks and draw the visible index ranges
+                    offsets, counts, chunks = mesh.bvh.visible_ranges(local_planes[order[first]])
+                    stats["chunks drawn"] += chunks
+                    stats["chunks culled"] += mesh.bvh.chunks - chunks
+                    for offset, count in zip((offsets // mesh.index_size).tolist(), counts.tolist()):
+                        queue.submit(mesh.vao, mesh.index_type, count, offset, **command)
+                    stats["triangles drawn"] += int(counts.sum()) // 3
+                    continue
+
+                start, count = (int(v) for v in mesh.lods[lod])
+                queue.submit(mesh.vao, mesh.index_type, count, start, instances, **command)
+                stats["triangles drawn"] += count // 3 * instances
+                if lod == 0:
+                    stats["chunks drawn"] += instances * (mesh.bvh.chunks if mesh.bvh else 1)
+        self._changed[:self.count] = False
+        return queue.flush() if own_queue else 0
+
+    def delete(self):
+        for mesh in self.meshes:
+            mesh.delete()
+        self.meshes = []
+        if self._queue is not None:
+            self._queue.delete()
+            self._queue = None
@@ -0,0 +1,228 @@
+import ctypes            # Out parameters of the raw program binary calls
+import hashlib           # Program keys from shader sources, driver keys
+import os                # Cache directory and file helpers
+import struct            # Binary header packing
+import numpy as np       # Byte buffers for program binaries
+from OpenGL.GL import *  # OpenGL functions/constants
+from OpenGL.raw.GL.VERSION.GL_4_1 import glGetProgramBinary, glProgramBinary   # Raw entry points (pointer arguments)
+
+from loader import config   # Binary cache settings
+from loader.gl_state import state                   # Tracked program binding
+from loader.uniform_buffer import BLOCK_BINDINGS    # Binding points of shared uniform blocks
+
+# Shader programs are created once per distinct source: identical (vertex, fragment, defines)
+# requests share one program, linked programs are stored on disk as driver binaries
+# (glGetProgramBinary) so later launches skip GLSL compilation, and every active uniform and
+# attribute location is looked up once at link time instead of with glGetUniformLocation per frame.
+#
+# Program binary file layout (little endian): header (see HEADER_FORMAT), then the driver's binary.
+# The driver key hashes vendor, renderer and version strings; a driver update changes it and the
+# program is rebuilt from source (drivers may also reject a binary outright, which is handled the same way).
+MAGIC = b"CSTLPROG"
+VERSION = 1
+HEADER_FORMAT = "<8s2I16s"    # magic, version, binary format, driver key
+CACHE_SUFFIX = ".bin"
+
+def with_defines(source, defines):
+    # Insert "#define NAME" lines right after the #version line to select shader variants
+    if not defines:
+        return source
+    version, _, body = source.partition("\n")
+    return version + "\n" + "".join(f"#define {name}\n" for name in defines) + body
+
+def compile_shader(shader_type, source, label="shader"):
+    shader = glCreateShader(shader_type)    # Create a shader object of given type
+    glShaderSource(shader, source)           # Attach GLSL source code to shader object
+    glCompileShader(shader)                   # Compile the shader
+
+    # Check for compilation errors
+    if glGetShaderiv(shader, GL_COMPILE_STATUS) != GL_TRUE:
+        # If compile failed, raise error with shader info log message
+        log = glGetShaderInfoLog(shader).decode()
+        glDeleteShader(shader)
+        kind = "vertex" if shader_type == GL_VERTEX_SHADER else "fragment"
+        raise RuntimeError(f"{label}: {kind} shader failed to compile:\n{log}")
+
+    return shader    # Return compiled shader object ID
+
+def driver_key():
+    # Changes whenever the GL implementation or its version does
+    h = hashlib.blake2b(digest_size=16)
+    for name in (GL_VENDOR, GL_RENDERER, GL_VERSION, GL_SHADING_LANGUAGE_VERSION):
+        h.update((glGetString(name) or b"") + b"\0")
+    return h.digest()
+
+class ShaderProgram:
+    # Linked program with its active uniform and attribute locations
+    __slots__ = ("id", "key", "uniforms", "attributes", "blocks")
+
+    def __init__(self, program, key):
+        self.id = program
+        self.key = key
+        # Shared uniform blocks (e.g. Camera) go to their fixed binding points; like uniform values,
+        # block bindings are reset by every link or glProgramBinary, so this runs for both paths
+        self.blocks = {}
+        for name, binding in BLOCK_BINDINGS.items():
+            index = glGetUniformBlockIndex(program, name)
+            if index != GL_INVALID_INDEX:
+                glUniformBlockBinding(program, index, binding)
+                self.blocks[name] = binding
+        self.uniforms = {}
+        for i in range(glGetProgramiv(program, GL_ACTIVE_UNIFORMS)):
+            name = glGetActiveUniform(program, i)[0].decode()
+            location = glGetUniformLocation(program, name)
+            if location < 0:
+                continue          # Member of a uniform block, set through its buffer
+            self.uniforms[name] = location
+            if name.endswith("[0]"):
+                self.uniforms[name[:-3]] = location   # Arrays are also found by their bare name
+        self.attributes = {}
+        for i in range(glGetProgramiv(program, GL_ACTIVE_ATTRIBUTES)):
+            name = glGetActiveAttrib(program, i)[0].decode()
+            self.attributes[name] = glGetAttribLocation(program, name)
+
+    def uniform(self, name):
+        # Location of a uniform, -1 if the program has no such active uniform (like glGetUniformLocation)
+        return self.uniforms.get(name, -1)
+
+class ShaderManager:
+    # Deduplicating program registry with an on-disk program binary cache. Needs a current GL context.
+    def __init__(self, cache_dir=None):
+        self.cache_dir = config.SHADER_CACHE_DIR if cache_dir is None else cache_dir
+        self.binaries = bool(glGetProgramBinary) and bool(glProgramBinary) and \
+            glGetIntegerv(GL_NUM_PROGRAM_BINARY_FORMATS) > 0
+        self.driver_key = driver_key()
+        self._programs = {}       # source key -> ShaderProgram
+        self._by_id = {}          # GL program ID -> ShaderProgram
+        self.stats = dict.fromkeys(("compiled", "binary loads", "binary rejected", "shared"), 0)
+
+    def program(self, vertex_source, fragment_source, defines=(), label="shader"):
+        # ShaderProgram for the sources with `defines` inserted; raises RuntimeError with the info log
+        # if a shader fails to compile or the program fails to link
+        vertex_source = with_defines(vertex_source, defines)
+        fragment_source = with_defines(fragment_source, defines)
+        h = hashlib.blake2b(digest_size=16)
+        h.update(vertex_source.encode() + b"\0" + fragment_source.encode())
+        key = h.hexdigest()
+        if key in self._programs:
+            self.stats["shared"] += 1
+            return self._programs[key]
+
+        program = self._load_binary(key)
+        if program is None:
+            program = self._link(vertex_source, fragment_source, label)
+            self.stats["compiled"] += 1
+            self._save_binary(key, program)
+        entry = ShaderProgram(program, key)
+        self._programs[key] = self._by_id[program] = entry
+        return entry
+
+    def lookup(self, program):
+        # ShaderProgram for a GL program ID created by this manager
+        return self._by_id[program]
+
+    def _link(self, vertex_source, fragment_source, label):
+        vertex_shader = compile_shader(GL_VERTEX_SHADER, vertex_source, label)
+        try:
+            fragment_shader = compile_shader(GL_FRAGMENT_SHADER, fragment_source, label)
+        except RuntimeError:
+            glDeleteShader(vertex_shader)
+            raise
+
+        program = glCreateProgram()      # Create a new shader program object
+        glAttachShader(program, vertex_shader)    # Attach compiled vertex shader
+        glAttachShader(program, fragment_shader)  # Attach compiled fragment shader
+        if self.binaries:
+            glProgramParameteri(program, GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL_TRUE)
+        glLinkProgram(program)           # Link program (combine shaders)
+
+        # Once linked, shaders can be deleted as they are no longer needed separately
+        glDetachShader(program, vertex_shader)
+        glDetachShader(program, fragment_shader)
+        glDeleteShader(vertex_shader)
+        glDeleteShader(fragment_shader)
+
+        # Check for linking errors
+        if glGetProgramiv(program, GL_LINK_STATUS) != GL_TRUE:
+            log = glGetProgramInfoLog(program).decode()
+            glDeleteProgram(program)
+            raise RuntimeError(f"{label}: program failed to link:\n{log}")
+        return program
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, key + CACHE_SUFFIX)
+
+    def _load_binary(self, key):
+        # Linked program from the cache, or None if missing, stale (other driver) or rejected
+        if not (self.binaries and self.cache_dir):
+            return None
+        try:
+            with open(self._cache_path(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        header_size = struct.calcsize(HEADER_FORMAT)
+        if len(data) <= header_size:
+            return None
+        magic, version, binary_format, driver = struct.unpack_from(HEADER_FORMAT, data)
+        if magic != MAGIC or version != VERSION or driver != self.driver_key:
+            return None
+
+        binary = np.frombuffer(data, dtype=np.uint8, offset=header_size)
+        program = glCreateProgram()
+        glProgramBinary(program, binary_format, binary.ctypes.data_as(ctypes.c_void_p), len(binary))
+        if glGetProgramiv(program, GL_LINK_STATUS) != GL_TRUE:
+            glDeleteProgram(program)            # Driver refused it; relink from source and overwrite
+            self.stats["binary rejected"] += 1
+            return None
+        self.stats["binary loads"] += 1
+        return program
+
+    def _save_binary(self, key, program):
+        if not (self.binaries and self.cache_dir):
+            return
+        size = glGetProgramiv(program, GL_PROGRAM_BINARY_LENGTH)
+        if size <= 0:
+            return
+        binary = np.empty(size, dtype=np.uint8)
+        length, binary_format = ctypes.c_int(), ctypes.c_uint()
+        glGetProgramBinary(program, size, ctypes.byref(length), ctypes.byref(binary_format),
+                           binary.ctypes.data_as(ctypes.c_void_p))
+        header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, binary_format.value, self.driver_key)
+
+        # Write to a temporary file and rename, so a crash never leaves a half-written cache behind
+        path = self._cache_path(key)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                f.write(header)
+                f.write(binary[:length.value].tobytes())
+            os.replace(path + ".tmp", path)
+        except OSError:
+            pass   # Read-only install: programs are compiled every launch
+
+    def delete(self):
+        for entry in self._programs.values():
+            state.delete_program(entry.id)
+        self._programs = {}
+        self._by_id = {}
+
+_manager = None   # Shared manager for get_program(), created with the first call (needs a GL context)
+
+def get_program(vertex_source, fragment_source, defines=(), label="shader"):
+    # ShaderProgram from the shared manager
+    global _manager
+    if _manager is None:
+        _manager = ShaderManager()
+    return _manager.program(vertex_source, fragment_source, defines, label)
+
+def uniform_locations(program):
+    # Uniform name -> location table of a program from get_program() (or the create_* helpers)
+    return _manager.lookup(program).uniforms
+
+def delete_programs():
+    # Delete every program of the shared manager (at exit)
+    global _manager
+    if _manager is not None:
+        _manager.delete()
+        _manager = None
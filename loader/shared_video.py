@@ -0,0 +1,400 @@
+import argparse          # Command line for the publisher process
+import os                # Consumer liveness checks
+import signal            # SIGTERM -> clean publisher shutdown
+import sys               # Exit codes for the command line tool
+import tempfile          # Lock file location
+import time              # Publish clock (time.monotonic is shared by all processes)
+from multiprocessing import shared_memory   # Frame ring visible to every renderer
+import numpy as np       # Views onto the shared segment
+
+# Shared-memory video for several renderers on one machine (video walls): one publisher process
+# decodes the clip once into a ring of frame slots in a named shared memory segment, and every
+# main.py started with BG_VIDEO = "shared:<name>" maps the same segment and uploads the newest
+# published frame straight from it (no decode, no copy before the PBO upload). All renderers
+# show whatever the publisher's clock says is current, so they stay on the same frame index.
+#
+#     python -m loader.shared_video source/bg5.mp4 --name castle-video    # One publisher
+#     BG_VIDEO = "shared:castle-video"                                     # config.py of each renderer
+#
+# Each slot is guarded by a sequence number (a seqlock): 2k + 1 while frame k is being decoded
+# into it, 2k + 2 once it is complete. A reader only hands out a slot whose sequence matches the
+# frame it wants and re-checks it after copying the frame out (verify); a slot rewritten in
+# between (the renderer stalled for a whole ring mid-upload) is counted as torn and the newest
+# frame is uploaded again.
+# Consumers record what they show and how late they picked it up in the segment, so the
+# publisher can report per-renderer lag. Records are claimed under an flock on a lock file next
+# to the segment (where fcntl exists; elsewhere two renderers starting at once may share one).
+#
+# When the publisher exits (or dies) renderers keep their last frame, log it, report it in
+# stats() and reattach once a publisher with the same name and frame size is back.
+#
+# Segment layout: header words (uint64), publish times and slot sequences, consumer records
+# (float64), then `slots` frames of height * width * 3 uint8 BGR, top row first, from DATA_OFFSET.
+
+MAGIC = 0x4F45444956445253       # "SRDVIDEO"
+VERSION = 2
+SLOTS = 4                        # Frames in the ring; a renderer may fall SLOTS - 2 frames behind safely
+MAX_CONSUMERS = 16               # Renderer records for lag metrics
+RESYNC_LAG = 0.25                # Seconds the publisher may fall behind before restarting its clock
+REPORT_INTERVAL = 5.0            # Seconds between publisher lag reports
+REATTACH_INTERVAL = 1.0          # Seconds between a renderer's publisher liveness checks / reattach attempts
+
+# Header words
+H_MAGIC, H_VERSION, H_WIDTH, H_HEIGHT, H_SLOTS, H_CONSUMERS, H_LATEST, H_CLOSED, H_PUBLISHER = range(9)
+HEADER_WORDS = 9
+# Consumer record fields
+C_PID, C_SHOWN, C_FRAMES, C_DROPPED, C_TORN, C_LAG_MS, C_MAX_LAG_MS, C_SEEN = range(8)
+CONSUMER_FIELDS = 8
+DATA_OFFSET = 4096               # Page aligned frame data
+
+def _layout(slots, consumers):
+    # Byte offsets of (fps, publish times, slot sequences, consumer records); all fit before DATA_OFFSET
+    fps = HEADER_WORDS * 8
+    times = fps + 8
+    sequences = times + slots * 8
+    records = sequences + slots * 8
+    if records + consumers * CONSUMER_FIELDS * 8 > DATA_OFFSET:
+        raise ValueError("Too many slots/consumers for the shared video header")
+    return fps, times, sequences, records
+
+class _Segment:
+    # NumPy views onto a shared video segment
+    def __init__(self, shm):
+        self.shm = shm
+        self.header = np.ndarray((HEADER_WORDS,), np.uint64, shm.buf)
+        if self.header[H_MAGIC] != MAGIC or self.header[H_VERSION] != VERSION:
+            raise RuntimeError(f"Shared memory {shm.name!r} is not a shared video segment")
+        slots, consumers = int(self.header[H_SLOTS]), int(self.header[H_CONSUMERS])
+        width, height = int(self.header[H_WIDTH]), int(self.header[H_HEIGHT])
+        fps, times, sequences, records = _layout(slots, consumers)
+        self.slots = slots
+        self.width = width
+        self.height = height
+        self.fps = float(np.ndarray((1,), np.float64, shm.buf, fps)[0])
+        self.publish_times = np.ndarray((slots,), np.float64, shm.buf, times)   # time.monotonic() per slot
+        self.sequences = np.ndarray((slots,), np.uint64, shm.buf, sequences)
+        self.consumers = np.ndarray((consumers, CONSUMER_FIELDS), np.float64, shm.buf, records)
+        self.frames = np.ndarray((slots, height, width, 3), np.uint8, shm.buf, DATA_OFFSET)
+
+    def release(self):
+        # Drop the views first: the mapping can't close while NumPy still exports its buffer
+        self.header = self.publish_times = self.sequences = self.consumers = self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass                 # A frame handed out is still referenced; the mapping goes away with it
+
+def create_segment(name, width, height, fps, slots=SLOTS, consumers=MAX_CONSUMERS):
+    fps_offset = _layout(slots, consumers)[0]
+    shm = shared_memory.SharedMemory(name, create=True, size=DATA_OFFSET + slots * height * width * 3)
+    header = np.ndarray((HEADER_WORDS,), np.uint64, shm.buf)
+    header[:] = 0
+    header[H_VERSION], header[H_WIDTH], header[H_HEIGHT] = VERSION, width, height
+    header[H_SLOTS], header[H_CONSUMERS] = slots, consumers
+    header[H_PUBLISHER] = os.getpid()
+    np.ndarray((1,), np.float64, shm.buf, fps_offset)[0] = fps
+    header[H_MAGIC] = MAGIC      # Last: readers only trust a segment with its magic set
+    del header
+    segment = _Segment(shm)
+    segment.sequences[:] = 0
+    segment.consumers[:] = 0
+    return segment
+
+def attach_segment(name):
+    try:
+        shm = shared_memory.SharedMemory(name, track=False)   # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name)
+        # Older versions register attached segments with the resource tracker, which would unlink
+        # the publisher's segment when this renderer exits
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return _Segment(shm)
+
+def _lock_records(name):
+    # Exclusive lock serializing consumer record claims for segment `name` (None where fcntl is missing)
+    try:
+        import fcntl
+    except ImportError:
+        return None
+    lock = open(os.path.join(tempfile.gettempdir(), f"shared_video_{name}.lock"), "a")
+    fcntl.flock(lock, fcntl.LOCK_EX)     # Released when the file is closed
+    return lock
+
+def _publisher_gone(segment):
+    return bool(segment.header[H_CLOSED]) or not _alive(int(segment.header[H_PUBLISHER]))
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class SharedVideoPublisher:
+    # Decodes a looping clip into the shared ring on the clip's own clock
+    def __init__(self, path, name, slots=SLOTS, size=None):
+        import cv2               # Only the publisher decodes
+        self.cv2 = cv2
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open video: {path}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0   # Some containers report 0 FPS
+        source_size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        self.size = size if size is not None and tuple(size) != source_size else None   # Resize target
+        width, height = self.size or source_size
+        self._scratch = np.empty((source_size[1], source_size[0], 3), np.uint8) if self.size else None
+        try:
+            self.segment = create_segment(name, width, height, self.fps, slots)
+        except FileExistsError:
+            # Left behind by a publisher that died without unlinking it: replace it (renderers reattach)
+            stale = attach_segment(name)
+            gone = _publisher_gone(stale)
+            shm = stale.shm
+            stale.release()
+            if not gone:
+                raise
+            shm.unlink()
+            self.segment = create_segment(name, width, height, self.fps, slots)
+        self.name = name
+        self.published = 0       # Frames published (absolute index of the next one)
+        self.late = 0            # Frames published after their time (decoder slower than the clip)
+        self.loops = 0
+
+    def _decode_into(self, frame):
+        target = self._scratch if self.size else frame
+        ret, out = self.cap.read(target)     # Decode straight into the shared slot when not resizing
+        if not ret:
+            self.cap.set(self.cv2.CAP_PROP_POS_FRAMES, 0)   # Loop
+            self.loops += 1
+            ret, out = self.cap.read(target)
+        if not ret:
+            raise RuntimeError("Video stream became unreadable")
+        if self.size:
+            self.cv2.resize(out, self.size, dst=frame, interpolation=self.cv2.INTER_AREA)
+        elif out is not frame:
+            np.copyto(frame, out)            # Backend allocated its own buffer
+        return frame
+
+    def run(self, report_interval=REPORT_INTERVAL, frames=None):
+        # Publish frames until interrupted (or `frames` have been published)
+        segment = self.segment
+        period = 1.0 / self.fps
+        start = time.monotonic()
+        next_report = start + report_interval
+        while frames is None or self.published < frames:
+            index = self.published
+            slot = index % segment.slots
+            segment.sequences[slot] = 2 * index + 1          # Odd: slot being rewritten
+            self._decode_into(segment.frames[slot])
+            segment.sequences[slot] = 2 * index + 2          # Even: complete frame `index`
+
+            due = start + index * period                     # Decoded ahead, published on the clock
+            now = time.monotonic()
+            if due > now:
+                time.sleep(due - now)
+            elif now - due > RESYNC_LAG:
+                start += now - due                           # Stalled; restart the clock rather than race
+                self.late += 1
+            elif now - due > period:
+                self.late += 1
+            segment.publish_times[slot] = time.monotonic()
+            segment.header[H_LATEST] = index + 1             # Renderers switch to this frame now
+            self.published += 1
+
+            if report_interval and time.monotonic() >= next_report:
+                next_report += report_interval
+                print(self.report(), flush=True)
+
+    def report(self):
+        latest = self.published - 1
+        lines = [f"{self.name}: frame {latest}, {self.late} late, {self.loops} loops"]
+        now = time.monotonic()
+        for record in self.segment.consumers:
+            if record[C_PID] == 0 or not _alive(int(record[C_PID])):
+                continue
+            behind = latest - int(record[C_SHOWN])
+            lines.append(f"  pid {int(record[C_PID]):>7}: {behind} frames behind, lag {record[C_LAG_MS]:.1f} ms "
+                         f"(max {record[C_MAX_LAG_MS]:.1f}), {int(record[C_FRAMES])} shown, "
+                         f"{int(record[C_DROPPED])} dropped, {int(record[C_TORN])} torn, "
+                         f"last poll {now - record[C_SEEN]:.1f} s ago")
+        return "\n".join(lines)
+
+    def close(self):
+        self.segment.header[H_CLOSED] = 1    # Renderers keep their last frame
+        self.cap.release()
+        shm = self.segment.shm
+        self.segment.release()
+        shm.unlink()
+
+class SharedVideoSource:
+    # Renderer side: same interface as video_decoder.VideoDecoder (latest_frame / stats / close).
+    # Frames are views into the shared ring, valid until the publisher laps this slot.
+    def __init__(self, name):
+        try:
+            self.segment = attach_segment(name)
+        except FileNotFoundError:
+            raise RuntimeError(f"No shared video {name!r}; start `python -m loader.shared_video VIDEO "
+                               f"--name {name}` first") from None
+        self.width = self.segment.width
+        self.height = self.segment.height
+        self.fps = self.segment.fps
+        self.name = name
+        self.publisher_lost = 0  # Times the publisher closed or died while attached
+        self._lost = False       # Publisher currently gone (showing the last frame)
+        self._next_check = time.monotonic() + REATTACH_INTERVAL
+        self._shown = None       # Frame index on screen
+        self._held = None        # (slot, sequence) of the frame handed out last, re-checked by verify()
+        self.frames = 0          # Frames handed out
+        self.dropped = 0         # Published frames never shown (renderer slower than the clip)
+        self.torn = 0            # Slots that changed while (or before) being read
+        self.lag_ms = 0.0        # Smoothed publish -> pick-up delay
+        self.max_lag_ms = 0.0
+        self._record = self._claim_record()
+
+    def _claim_record(self):
+        # A consumer record that is free or left behind by an exited renderer
+        lock = _lock_records(self.name)
+        try:
+            pid = os.getpid()
+            for i, record in enumerate(self.segment.consumers):
+                if record[C_PID] == 0 or not _alive(int(record[C_PID])):
+                    record[:] = 0
+                    record[C_PID] = pid
+                    return i
+            return None          # More renderers than records: metrics stay local
+        finally:
+            if lock is not None:
+                lock.close()
+
+    def _check_publisher(self):
+        # Every REATTACH_INTERVAL: notice a closed/dead publisher and reattach to its replacement.
+        # Returns False while there is no live publisher.
+        now = time.monotonic()
+        if now < self._next_check:
+            return not self._lost
+        self._next_check = now + REATTACH_INTERVAL
+        if not self._lost:
+            if not _publisher_gone(self.segment):
+                return True
+            self._lost = True
+            self.publisher_lost += 1
+            print(f"Shared video {self.name!r}: publisher stopped, keeping the last frame")
+        try:
+            segment = attach_segment(self.name)
+        except (FileNotFoundError, RuntimeError):
+            return False         # Not back yet (or still being created)
+        if _publisher_gone(segment) or (segment.width, segment.height) != (self.width, self.height):
+            if not _publisher_gone(segment):
+                print(f"Shared video {self.name!r}: new publisher is {segment.width}x{segment.height}, "
+                      f"not {self.width}x{self.height}; not reattaching")
+            segment.release()
+            return False
+        self._release_segment()
+        self.segment = segment
+        self.fps = segment.fps
+        self._shown = self._held = None
+        self._lost = False
+        self._record = self._claim_record()
+        print(f"Shared video {self.name!r}: reattached to the new publisher")
+        return True
+
+    def latest_frame(self):
+        # Newest published frame, or None if the one on screen is still current. Never blocks.
+        if not self._check_publisher():
+            return None          # Publisher gone: the last frame stays on screen
+        segment = self.segment
+        published = int(segment.header[H_LATEST])
+        if published == 0:
+            return None          # Publisher hasn't published anything yet
+        index = published - 1
+        if index == self._shown:
+            return None
+        slot = index % segment.slots
+        sequence = int(segment.sequences[slot])
+        if sequence != 2 * index + 2:
+            self.torn += 1       # Already being reused: this renderer is a whole ring behind
+            return None
+
+        lag_ms = (time.monotonic() - float(segment.publish_times[slot])) * 1000.0
+        if self._shown is not None and index > self._shown:
+            self.dropped += index - self._shown - 1
+        self._shown = index
+        self._held = (slot, sequence)
+        self.frames += 1
+        self.lag_ms += (lag_ms - self.lag_ms) * 0.1
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        if self._record is not None:
+            record = segment.consumers[self._record]
+            record[C_SHOWN], record[C_FRAMES], record[C_DROPPED], record[C_TORN] = \
+                index, self.frames, self.dropped, self.torn
+            record[C_LAG_MS], record[C_MAX_LAG_MS], record[C_SEEN] = self.lag_ms, self.max_lag_ms, time.monotonic()
+        return segment.frames[slot]
+
+    def verify(self, frame):
+        # After the frame from latest_frame() has been copied (uploaded): None if its slot was not
+        # rewritten meanwhile, otherwise the newest frame to upload instead (see bg_loader.upload_video_frame)
+        slot, sequence = self._held
+        if self.segment.sequences[slot] == sequence:
+            return None
+        self.torn += 1
+        self._shown = None
+        return self.latest_frame()
+
+    def stats(self):
+        # "behind" is None while there is no live publisher (nothing to be behind of)
+        gone = self.segment is None or self._lost or _publisher_gone(self.segment)
+        behind = None
+        if not gone:
+            behind = int(self.segment.header[H_LATEST]) - 1 - (self._shown if self._shown is not None else -1)
+        return {"frames": self.frames, "behind": behind,
+                "dropped": self.dropped, "torn": self.torn, "lag ms": round(self.lag_ms, 1),
+                "max lag ms": round(self.max_lag_ms, 1), "publisher lost": self.publisher_lost,
+                "publisher": "gone" if gone else "live"}
+
+    def _release_segment(self):
+        if self._record is not None and self.segment.consumers[self._record, C_PID] == os.getpid():
+            self.segment.consumers[self._record] = 0          # Free the record for the next renderer
+        self.segment.release()
+
+    def close(self):
+        if self.segment is None:
+            return
+        self._release_segment()
+        self.segment = None
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt   # SIGTERM (systemd, timeout, supervisors) shuts down like Ctrl+C
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Decode a video once and publish it to renderers through shared memory.")
+    parser.add_argument("video", help="video file to publish (looped)")
+    parser.add_argument("--name", default="castle-video", help="shared memory name (BG_VIDEO = 'shared:NAME')")
+    parser.add_argument("--slots", type=int, default=SLOTS, help="frames in the shared ring")
+    parser.add_argument("--size", metavar="WxH", help="resize frames (default: the clip's size)")
+    parser.add_argument("--report", type=float, default=REPORT_INTERVAL, help="seconds between lag reports (0 = off)")
+    args = parser.parse_args(argv)
+
+    size = tuple(int(v) for v in args.size.lower().split("x")) if args.size else None
+    try:
+        publisher = SharedVideoPublisher(args.video, args.name, args.slots, size)
+    except (RuntimeError, ValueError, FileExistsError) as error:
+        print(f"Cannot publish: {error}")
+        return 1
+    segment = publisher.segment
+    print(f"Publishing {args.video} as 'shared:{args.name}' ({segment.width}x{segment.height} "
+          f"@ {publisher.fps:.2f} FPS, {segment.slots} slots)")
+    signal.signal(signal.SIGTERM, _interrupt)   # Renderers must see H_CLOSED and the segment unlinked
+    try:
+        publisher.run(args.report)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(publisher.report())
+        publisher.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+import os                                          # Path and file stat helpers
+import struct                                      # Binary header packing
+import time                                        # Upload time budget
+from concurrent.futures import ThreadPoolExecutor  # Decode/mip/disk work off the main thread
+import numpy as np                                 # Pixel buffers
+from OpenGL.GL import *                            # OpenGL functions/constants
+from OpenGL.error import GLError                   # Raised for rejected formats when error checking is on
+from OpenGL.GL.EXT.texture_compression_s3tc import GL_COMPRESSED_RGB_S3TC_DXT1_EXT, GL_COMPRESSED_RGBA_S3TC_DXT5_EXT
+from OpenGL.raw.GL.VERSION.GL_1_3 import glGetCompressedTexImage   # Raw entry point (wrapped one is broken)
+
+from loader import config   # Compression preference and upload budget
+from loader.gl_state import state   # Tracked texture binds
+
+# Texture cache file layout (little endian):
+#   header (see HEADER_FORMAT), then levels * LEVEL_FORMAT entries (width, height, byte size)
+#   level data, largest first: bottom row first RGB8/RGBA8 pixels, or compressed blocks as the driver
+#   returned them for the stored internal format
+MAGIC = b"CSTLTEXC"
+VERSION = 1
+HEADER_FORMAT = "<8s5I16s"    # magic, version, GL internal format, width, height, level count, source key
+LEVEL_FORMAT = "<3I"
+CACHE_SUFFIX = ".tex"
+WORKERS = 2                   # Decode threads (Pillow releases the GIL while decoding and resampling)
+
+# Block compression codecs: (internal format for RGB, internal format for RGBA, required extension)
+CODECS = {
+    "bc1": (GL_COMPRESSED_RGB_S3TC_DXT1_EXT, GL_COMPRESSED_RGBA_S3TC_DXT5_EXT, "GL_EXT_texture_compression_s3tc"),
+    "etc2": (GL_COMPRESSED_RGB8_ETC2, GL_COMPRESSED_RGBA8_ETC2_EAC, "GL_ARB_ES3_compatibility"),
+}
+# Pixel transfer format of the uncompressed internal formats
+PIXEL_FORMATS = {GL_RGB8: GL_RGB, GL_RGBA8: GL_RGBA}
+
+def cache_path_for(image_path, codec=None):
+    # source/castle.jpg -> source/castle.bc1.tex (compressed) or source/castle.rgb8.tex
+    return os.path.splitext(image_path)[0] + "." + (codec or "rgb8") + CACHE_SUFFIX
+
+def _source_key(path):
+    st = os.stat(path)
+    return struct.pack("<qq", st.st_mtime_ns, st.st_size)
+
+def build_mip_chain(path):
+    # Decode once and build every mip level on the CPU: RGB for opaque images (no wasted alpha byte),
+    # RGBA only when the image has transparency. Returns (channels, [(width, height, bytes), ...]).
+    # Pillow is imported here, on a worker thread, and only on a disk cache miss.
+    from PIL import Image
+    image = Image.open(path)
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB").transpose(Image.FLIP_TOP_BOTTOM)
+    levels = [(image.width, image.height, image.tobytes())]
+    while image.width > 1 or image.height > 1:
+        size = (max(image.width // 2, 1), max(image.height // 2, 1))   # GL mip sizes round down
+        image = image.resize(size, Image.BOX)                          # 2x2 box filter, like glGenerateMipmap
+        levels.append((image.width, image.height, image.tobytes()))
+    return (4 if has_alpha else 3), levels
+
+def read_cache(path, source_key):
+    # (internal format, levels) from a cache file, or None if missing, foreign or stale
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    header_size = struct.calcsize(HEADER_FORMAT)
+    if len(data) < header_size:
+        return None
+    magic, version, internal_format, _, _, count, key = struct.unpack_from(HEADER_FORMAT, data)
+    if magic != MAGIC or version != VERSION or key != source_key:
+        return None
+    levels = []
+    table = struct.calcsize(LEVEL_FORMAT)
+    offset = header_size + count * table
+    for i in range(count):
+        width, height, size = struct.unpack_from(LEVEL_FORMAT, data, header_size + i * table)
+        levels.append((width, height, data[offset:offset + size]))
+        offset += size
+    if offset > len(data):
+        return None   # Truncated
+    return internal_format, levels
+
+def write_cache(path, internal_format, levels, source_key):
+    # Write to a temporary file and rename, so a crash never leaves a half-written cache behind
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, internal_format, levels[0][0], levels[0][1],
+                            len(levels), source_key))
+        for width, height, data in levels:
+            f.write(struct.pack(LEVEL_FORMAT, width, height, len(data)))
+        for _, _, data in levels:
+            f.write(data)
+    os.replace(tmp_path, path)
+
+def _prepare(path, codec):
+    # Worker thread: cached mip chain if up to date, else decode and build it (no GL calls here)
+    cached = read_cache(cache_path_for(path, codec), _source_key(path))
+    if cached is not None:
+        return {"internal_format": cached[0], "levels": cached[1], "cached": True}
+    channels, levels = build_mip_chain(path)
+    return {"internal_format": GL_RGBA8 if channels == 4 else GL_RGB8, "levels": levels, "cached": False}
+
+def supported_codec(preference="auto"):
+    # Block compression to use on this GL context (main thread): "bc1", "etc2" or None (RGB8).
+    # "auto" picks BC1 where S3TC is available; ETC2 is only used when asked for, since desktop
+    # drivers often store it decompressed.
+    if preference in (None, "rgb8"):
+        return None
+    extensions = {glGetStringi(GL_EXTENSIONS, i).decode() for i in range(glGetIntegerv(GL_NUM_EXTENSIONS))}
+    codec = "bc1" if preference == "auto" else preference
+    if CODECS[codec][2] not in extensions:
+        return None
+
+    # Compression happens in the driver on the first load, which not every driver offers for every
+    # format (ETC2 often can't be encoded online): try it on a 4x4 block
+    probe = glGenTextures(1)
+    state.bind_texture(GL_TEXTURE_2D, probe)
+    try:
+        glTexImage2D(GL_TEXTURE_2D, 0, CODECS[codec][0], 4, 4, 0, GL_RGB, GL_UNSIGNED_BYTE, bytes(48))
+        works = glGetError() == GL_NO_ERROR and bool(glGetTexLevelParameteriv(GL_TEXTURE_2D, 0, GL_TEXTURE_COMPRESSED))
+    except GLError:
+        works = False
+    state.delete_textures([probe])
+    return codec if works else None
+
+class _Entry:
+    __slots__ = ("path", "texture", "refs", "future", "job", "uploaded")
+
+    def __init__(self, path, texture, future):
+        self.path = path
+        self.texture = texture
+        self.refs = 1
+        self.future = future      # Pending worker result
+        self.job = None           # Worker result being uploaded level by level
+        self.uploaded = 0         # Levels uploaded so far
+
+class TextureCache:
+    # Texture registry: one GL texture per path, shared through reference counts. Images are
+    # decoded and mip-mapped on a thread pool (or read back as a finished mip chain from the disk
+    # cache), and uploaded level by level on the main thread within a time budget by pump().
+    #
+    #     textures = TextureCache()
+    #     tex = textures.request("source/castle.jpg")   # Texture id right away, filled in later
+    #     ...                                            # Other startup work overlaps the decode
+    #     textures.finish()                              # Or textures.pump() once per frame
+    def __init__(self, compression=None, workers=WORKERS, upload_budget_ms=None):
+        # compression: "auto", "bc1", "etc2" or "rgb8"; None uses config.TEXTURE_COMPRESSION
+        self.codec = supported_codec(config.TEXTURE_COMPRESSION if compression is None else compression)
+        budget_ms = config.TEXTURE_UPLOAD_BUDGET_MS if upload_budget_ms is None else upload_budget_ms
+        self.upload_budget = budget_ms / 1000.0   # Seconds of uploads per pump()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="texture")
+        self._entries = {}        # Absolute path -> _Entry
+        self._by_texture = {}     # Texture id -> _Entry
+        self._queue = []          # Entries waiting for upload, in request order
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def request(self, path):
+        # Texture id for path; decoding starts in the background on the first request
+        key = os.path.abspath(path)
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.refs += 1
+            return entry.texture
+        texture = glGenTextures(1)
+        state.bind_texture(GL_TEXTURE_2D, texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)       # Repeat the texture on S and T
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)   # Use the mip chain
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        entry = _Entry(key, texture, self._pool.submit(_prepare, key, self.codec))
+        self._entries[key] = entry
+        self._by_texture[texture] = entry
+        self._queue.append(entry)
+        return texture
+
+    def load(self, path):
+        # Blocking request: the texture is fully uploaded on return
+        texture = self.request(path)
+        self.finish(self._by_texture[texture])
+        return texture
+
+    def resident(self, texture):
+        # True once every mip level of texture has been uploaded
+        entry = self._by_texture.get(texture)
+        return entry is not None and entry not in self._queue
+
+    def pump(self, budget_s=None):
+        # Main thread: upload decoded levels until the time budget is used up; returns textures completed
+        deadline = time.perf_counter() + (self.upload_budget if budget_s is None else budget_s)
+        completed = 0
+        while self._queue and time.perf_counter() < deadline:
+            entry = next((e for e in self._queue if e.job is not None or e.future.done()), None)
+            if entry is None:
+                break             # Nothing decoded yet
+            if self._upload_step(entry):
+                self._queue.remove(entry)
+                completed += 1
+        return completed
+
+    def finish(self, only=None):
+        # Upload everything requested so far (or just one entry), waiting for decodes as needed
+        for entry in list(self._queue):
+            if only is not None and entry is not only:
+                continue
+            while not self._upload_step(entry):
+                pass
+            self._queue.remove(entry)
+
+    def _upload_step(self, entry):
+        # Upload one mip level; returns True once the texture is complete
+        if entry.job is None:
+            entry.job = entry.future.result()
+            entry.future = None
+            if entry.job["cached"]:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+        job = entry.job
+        level = entry.uploaded
+        width, height, data = job["levels"][level]
+        internal_format = job["internal_format"]
+        pixel_format = PIXEL_FORMATS.get(internal_format)
+        state.bind_texture(GL_TEXTURE_2D, entry.texture)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+
+        if not job["cached"] and self.codec:
+            # First load with block compression: the driver compresses while uploading (mutable
+            # storage); the blocks are read back and cached once every level is in
+            codec_format = CODECS[self.codec][1 if internal_format == GL_RGBA8 else 0]
+            glTexImage2D(GL_TEXTURE_2D, level, codec_format, width, height, 0, pixel_format, GL_UNSIGNED_BYTE, data)
+        elif bool(glTexStorage2D):
+            if level == 0:
+                glTexStorage2D(GL_TEXTURE_2D, len(job["levels"]), internal_format, width, height)   # Immutable storage
+            if pixel_format is None:
+                glCompressedTexSubImage2D(GL_TEXTURE_2D, level, 0, 0, width, height, internal_format, data)
+            else:
+                glTexSubImage2D(GL_TEXTURE_2D, level, 0, 0, width, height, pixel_format, GL_UNSIGNED_BYTE, data)
+        elif pixel_format is None:
+            glCompressedTexImage2D(GL_TEXTURE_2D, level, internal_format, width, height, 0, data)
+        else:
+            glTexImage2D(GL_TEXTURE_2D, level, internal_format, width, height, 0, pixel_format, GL_UNSIGNED_BYTE, data)
+        entry.uploaded += 1
+        if entry.uploaded < len(job["levels"]):
+            return False
+
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAX_LEVEL, len(job["levels"]) - 1)
+        if not job["cached"]:
+            self._store(entry, job)
+        entry.job = None          # Drop the pixel data
+        return True
+
+    def _store(self, entry, job):
+        # Cache the finished mip chain on a worker: compressed blocks as the driver produced them
+        # (read back here, on the GL thread), or the RGB(A)8 levels
+        levels = job["levels"]
+        internal_format = job["internal_format"]
+        if self.codec and glGetTexLevelParameteriv(GL_TEXTURE_2D, 0, GL_TEXTURE_COMPRESSED):
+            internal_format = int(glGetTexLevelParameteriv(GL_TEXTURE_2D, 0, GL_TEXTURE_INTERNAL_FORMAT))
+            blocks = []
+            for level, (width, height, _) in enumerate(levels):
+                data = np.empty(int(glGetTexLevelParameteriv(GL_TEXTURE_2D, level, GL_TEXTURE_COMPRESSED_IMAGE_SIZE)),
+                                dtype=np.uint8)
+                glGetCompressedTexImage(GL_TEXTURE_2D, level, data)
+                blocks.append((width, height, data.tobytes()))
+            levels = blocks
+        self._pool.submit(write_cache, cache_path_for(entry.path, self.codec), internal_format, levels,
+                          _source_key(entry.path))
+
+    def release(self, texture):
+        # Drop one reference; the GL texture is deleted with the last one
+        entry = self._by_texture.get(texture)
+        if entry is None:
+            return
+        entry.refs -= 1
+        if entry.refs > 0:
+            return
+        if entry in self._queue:
+            self._queue.remove(entry)
+            if entry.future is not None:
+                entry.future.cancel()
+        del self._entries[entry.path]
+        del self._by_texture[texture]
+        state.delete_textures([texture])
+
+    def stats(self):
+        return {"textures": len(self._entries), "pending": len(self._queue),
+                "cache hits": self.cache_hits, "cache misses": self.cache_misses, "codec": self.codec or "rgb8"}
+
+    def delete(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)   # Let pending cache writes finish
+        if self._by_texture:
+            state.delete_textures(list(self._by_texture))
+        self._entries.clear()
+        self._by_texture.clear()
+        self._queue = []
@@ -0,0 +1,40 @@
+import math              # Exponential decay for frame-rate independent smoothing
+
+MAX_CATCH_UP = 0.25      # Seconds of simulation run at most per rendered frame before dropping the backlog
+
+class FixedTimestep:
+    # Accumulates real frame time and hands out whole simulation steps of dt seconds.
+    # The remainder (alpha) is used to interpolate between the last two simulated states.
+    def __init__(self, rate):
+        self.dt = 1.0 / rate
+        self.dt_ms = 1000.0 / rate
+        self.max_steps = max(1, int(MAX_CATCH_UP * rate))
+        self.accumulator = 0.0
+
+    def advance(self, elapsed):
+        self.accumulator += elapsed
+        steps = int(self.accumulator / self.dt)
+        if steps > self.max_steps:
+            # Long stall (window drag, breakpoint): skip ahead instead of spiralling into catch-up work
+            self.accumulator = self.accumulator % self.dt
+            return self.max_steps
+        self.accumulator -= steps * self.dt
+        return steps
+
+    @property
+    def alpha(self):
+        return self.accumulator / self.dt   # 0..1 between previous and current state
+
+def smoothing_rate(lerp_speed, reference_rate=60.0):
+    # Convert a per-frame lerp factor tuned at reference_rate FPS into a decay rate (1/s),
+    # so x += (target - x) * lerp_speed behaves the same at any step size
+    if lerp_speed >= 1.0:
+        return math.inf                     # Snap to target
+    return -math.log(1.0 - lerp_speed) * reference_rate
+
+def smoothing_factor(rate, dt):
+    # Fraction of the remaining distance covered in dt seconds
+    return 1.0 - math.exp(-rate * dt)
+
+def lerp(a, b, t):
+    return a + (b - a) * t
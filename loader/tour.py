@@ -0,0 +1,186 @@
+import argparse          # Command line for exporting/inspecting tour files
+import bisect            # Scalar knot search without NumPy call overhead
+import json              # Keyframe files
+import sys               # Exit codes for the command line tool
+import numpy as np       # Knot times and curve coefficients
+
+from loader.views import views, auto_switch_intervals   # Built-in tour
+
+# Camera tour: keyframes (time, zoom, rot_x, rot_y) joined by cubic curves that are precomputed
+# once into polynomial coefficients, so sampling is a binary search over the knot times plus one
+# cubic per channel: O(log n) for any time, in any order (scrubbing, seeking, recording).
+#
+# Tour file (JSON, times in milliseconds):
+#   {"curve": "catmull-rom",                 # or "linear"
+#    "keyframes": [
+#      {"name": "FAR FAR", "time": 0, "hold": 1500, "zoom": 107.5, "rot_x": -13.0, "rot_y": -449.0},
+#      {"name": "TOP", "time": 2500, "zoom": 10.5, "rot_x": -13.0, "rot_y": -449.0,
+#       "in": [30.0, -13.0, -449.0], "out": [8.0, -20.0, -400.0]},    # Optional Bezier handles
+#      ...]}
+#
+# A keyframe is reached at `time` and held for `hold` ms. Catmull-Rom tangents come from the
+# neighbouring keyframes; a channel comes to rest at the first and last keyframe, on holds and
+# wherever it doesn't change between keyframes (no overshoot there). "in"/"out" are absolute
+# cubic Bezier control points of the curve arriving at / leaving the keyframe and replace the
+# Catmull-Rom ones.
+
+CHANNELS = ("zoom", "rot_x", "rot_y")
+CURVES = ("catmull-rom", "linear")
+HOLD_FRACTION = 0.4      # Share of each built-in interval spent resting at its view
+
+class CameraTour:
+    def __init__(self, times, values, names=None, holds=None, curve="catmull-rom", handles_in=None,
+                 handles_out=None):
+        # times (n,) ms, increasing; values (n, 3) zoom/rot_x/rot_y; holds (n,) ms;
+        # handles_in/handles_out (n, 3) Bezier control points, NaN = derived from the curve
+        times = np.asarray(times, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64).reshape(-1, len(CHANNELS))
+        if len(times) == 0 or len(times) != len(values):
+            raise ValueError("A tour needs one value row per keyframe time")
+        if curve not in CURVES:
+            raise ValueError(f"Unknown tour curve {curve!r} (expected one of {CURVES})")
+        holds = np.zeros(len(times)) if holds is None else np.asarray(holds, dtype=np.float64)
+        if np.any(holds < 0) or np.any(times[1:] < times[:-1] + holds[:-1]):
+            raise ValueError("Keyframes must be in time order and holds must end before the next keyframe")
+        self.names = list(names) if names is not None else [str(i) for i in range(len(times))]
+        self.curve = curve
+        self.keyframe_times = times                  # Arrival time of each keyframe
+        self.holds = holds
+        self.values = values
+
+        # Knots: every keyframe, plus a second knot with the same value at the end of a hold
+        held = holds > 0
+        knot_key = np.repeat(np.arange(len(times)), np.where(held, 2, 1))   # Keyframe of each knot
+        hold_end = np.zeros(len(knot_key), dtype=bool)
+        hold_end[1:] = knot_key[1:] == knot_key[:-1]
+        self.times = times[knot_key] + np.where(hold_end, holds[knot_key], 0.0)
+        knots = values[knot_key]
+        self.duration = float(self.times[-1] - self.times[0])
+
+        # Cubic Bezier control points (c0, c1) of every segment between consecutive knots
+        p0, p1 = knots[:-1], knots[1:]
+        dt = np.maximum(np.diff(self.times), 1e-9)[:, None]
+        if curve == "linear":
+            c0 = p0 + (p1 - p0) / 3.0
+            c1 = p1 - (p1 - p0) / 3.0
+        else:
+            # Non-uniform Catmull-Rom: tangent (per ms) from the neighbouring knots, zero at the ends
+            # and where the channel is flat on either side (holds, repeated values)
+            tangents = np.zeros_like(knots)
+            if len(knots) > 2:
+                span = (self.times[2:] - self.times[:-2])[:, None]
+                tangents[1:-1] = (knots[2:] - knots[:-2]) / np.maximum(span, 1e-9)
+                flat = (knots[1:-1] == knots[:-2]) | (knots[1:-1] == knots[2:])
+                tangents[1:-1][flat] = 0.0
+            c0 = p0 + tangents[:-1] * dt / 3.0
+            c1 = p1 - tangents[1:] * dt / 3.0
+        # Explicit handles: "out" shapes the segment leaving the last knot of a keyframe, "in" the
+        # segment arriving at its first knot
+        last_knot = np.r_[~hold_end[1:], True]
+        for handles, knot_mask, controls, offset in ((handles_out, last_knot[:-1], c0, 0),
+                                                    (handles_in, ~hold_end[1:], c1, 1)):
+            if handles is None:
+                continue
+            handles = np.asarray(handles, dtype=np.float64).reshape(-1, len(CHANNELS))[knot_key]
+            handles = handles[offset:len(handles) - 1 + offset]
+            use = knot_mask[:, None] & ~np.isnan(handles)
+            controls[use] = handles[use]
+
+        # Power basis per segment: p(u) = a + u * (b + u * (c + u * d)), u in [0, 1]
+        self.coefficients = np.stack([p0, 3.0 * (c0 - p0), 3.0 * (p0 - 2.0 * c0 + c1),
+                                      p1 - p0 + 3.0 * (c0 - c1)], axis=1).astype(np.float32)   # (n-1, 4, 3)
+        self.end_value = knots[-1].astype(np.float32)
+        self._inverse_dt = (1.0 / dt[:, 0]).astype(np.float64)
+        self._knots = self.times.tolist()            # For the scalar path of sample()
+
+    def __len__(self):
+        return len(self.keyframe_times)
+
+    def sample(self, t):
+        # Camera (zoom, rot_x, rot_y) at time t ms (scalar -> (3,), array -> (m, 3)); clamped to the ends
+        if np.ndim(t) == 0 and len(self.coefficients):
+            # Once-per-step camera update: bisect on a list, one coefficient row
+            if t >= self._knots[-1]:
+                return self.end_value.copy()         # The cubic at u = 1 is off by rounding
+            segment = min(max(bisect.bisect_right(self._knots, t) - 1, 0), len(self.coefficients) - 1)
+            u = min(max((t - self._knots[segment]) * self._inverse_dt[segment], 0.0), 1.0)
+            a, b, c, d = self.coefficients[segment]
+            return a + u * (b + u * (c + u * d))
+        t = np.asarray(t, dtype=np.float64)
+        if len(self.coefficients) == 0:
+            return np.broadcast_to(self.end_value, t.shape + (len(CHANNELS),)).copy()
+        segment = np.clip(np.searchsorted(self.times, t, side="right") - 1, 0, len(self.coefficients) - 1)
+        u = np.clip((t - self.times[segment]) * self._inverse_dt[segment], 0.0, 1.0)[..., None]
+        a, b, c, d = np.moveaxis(self.coefficients[segment], -2, 0)
+        cameras = a + u * (b + u * (c + u * d))
+        cameras[t >= self.times[-1]] = self.end_value
+        return cameras
+
+    def keyframe(self, t):
+        # Index of the last keyframe reached at time t (0 before the first one)
+        return max(int(np.searchsorted(self.keyframe_times, t, side="right")) - 1, 0)
+
+    @classmethod
+    def from_views(cls, view_list=views, intervals=auto_switch_intervals, hold_fraction=HOLD_FRACTION):
+        # The built-in tour: view i is reached when the previous views' intervals have passed
+        # and rests there for hold_fraction of its own interval (the last view for all of it)
+        times = np.concatenate([[0.0], np.cumsum(intervals)])[:len(view_list)]
+        holds = np.zeros(len(times))
+        holds[:len(intervals)] = np.asarray(intervals[:len(times)], dtype=np.float64) * hold_fraction
+        if len(intervals) >= len(times):
+            holds[-1] = intervals[len(times) - 1]
+        values = [[view[name] for name in CHANNELS] for view in view_list]
+        return cls(times, values, [view["name"] for view in view_list], holds)
+
+    def to_dict(self):
+        # Keyframes as a tour file (Bezier handles are not kept)
+        keyframes = []
+        for name, time, hold, value in zip(self.names, self.keyframe_times, self.holds, self.values):
+            keyframe = {"name": name, "time": float(time)}
+            if hold:
+                keyframe["hold"] = float(hold)
+            keyframe.update({channel: round(float(v), 4) for channel, v in zip(CHANNELS, value)})
+            keyframes.append(keyframe)
+        return {"curve": self.curve, "keyframes": keyframes}
+
+def load_tour(path=None):
+    # CameraTour from a tour file, or the built-in views tour when path is None
+    if path is None:
+        return CameraTour.from_views()
+    with open(path) as f:
+        data = json.load(f)
+    keyframes = data["keyframes"]
+    nan = [np.nan] * len(CHANNELS)
+    return CameraTour([k["time"] for k in keyframes],
+                      [[k[channel] for channel in CHANNELS] for k in keyframes],
+                      [k.get("name", str(i)) for i, k in enumerate(keyframes)],
+                      [k.get("hold", 0.0) for k in keyframes],
+                      data.get("curve", "catmull-rom"),
+                      [k.get("in", nan) for k in keyframes],
+                      [k.get("out", nan) for k in keyframes])
+
+def save_tour(path, tour):
+    with open(path, "w") as f:
+        json.dump(tour.to_dict(), f, indent=1)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or inspect camera tour files.")
+    parser.add_argument("tour", nargs="?", help="tour file to inspect (default: the built-in tour)")
+    parser.add_argument("--export", metavar="PATH", help="write the tour as a JSON tour file")
+    args = parser.parse_args(argv)
+
+    try:
+        tour = load_tour(args.tour)
+    except (OSError, KeyError, ValueError) as error:
+        print(f"Invalid tour: {error}")
+        return 1
+    print(f"{len(tour)} keyframes, {len(tour.coefficients)} segments, {tour.duration / 1000.0:.1f} s "
+          f"({tour.curve}, {tour.coefficients.nbytes + tour.times.nbytes} bytes of curve data)")
+    if args.export:
+        save_tour(args.export, tour)
+        print(f"Wrote {args.export}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
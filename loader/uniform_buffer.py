@@ -0,0 +1,55 @@
+from OpenGL.GL import *  # OpenGL functions/constants
+import numpy as np       # std140 block packing
+
+from loader.gl_state import state   # Tracked buffer binds
+
+# Camera and projection shared by every program through one std140 uniform block: the block is
+# written once per frame and all programs that declare it read the same buffer, instead of each
+# program getting its own glUniformMatrix4fv calls. shader_manager binds blocks named in
+# BLOCK_BINDINGS to their binding point when a program is created.
+
+CAMERA_BINDING = 0
+CAMERA_BLOCK = """layout (std140) uniform Camera {
+    mat4 view;               // View (camera) transformation matrix
+    mat4 projection;         // Projection matrix (perspective or orthographic)
+    mat4 viewProjection;     // projection * view
+    vec4 cameraPosition;     // World space eye position (w = 1)
+};
+"""
+BLOCK_BINDINGS = {"Camera": CAMERA_BINDING}
+CAMERA_FLOATS = 3 * 16 + 4   # std140: mat4 = four vec4 columns, no padding between members here
+
+def _columns(matrix):
+    # glm.mat4 -> 16 floats column by column (std140 / GL order)
+    return np.array(matrix, dtype=np.float32).T.reshape(-1)
+
+class CameraUniforms:
+    def __init__(self):
+        self.buffer = glGenBuffers(1)
+        self._data = np.zeros(CAMERA_FLOATS, dtype=np.float32)
+        self._data[16:32] = np.eye(4, dtype=np.float32).reshape(-1)
+        self._uploaded = None
+        state.bind_buffer(GL_UNIFORM_BUFFER, self.buffer)
+        glBufferData(GL_UNIFORM_BUFFER, self._data.nbytes, None, GL_DYNAMIC_DRAW)
+        glBindBufferBase(GL_UNIFORM_BUFFER, CAMERA_BINDING, self.buffer)
+        self.uploads = 0          # glBufferSubData calls issued (unchanged cameras are skipped)
+
+    def update(self, view, projection=None):
+        # Once per frame; projection=None keeps the previous projection
+        data = self._data
+        view_columns = _columns(view)
+        data[0:16] = view_columns
+        if projection is not None:
+            data[16:32] = _columns(projection)
+        view_projection = data[16:32].reshape(4, 4).T @ view_columns.reshape(4, 4).T
+        data[32:48] = view_projection.T.reshape(-1)
+        data[48:52] = np.linalg.inv(view_columns.reshape(4, 4).T.astype(np.float64))[:, 3]
+        if self._uploaded is not None and np.array_equal(data, self._uploaded):
+            return
+        state.bind_buffer(GL_UNIFORM_BUFFER, self.buffer)
+        glBufferSubData(GL_UNIFORM_BUFFER, 0, data.nbytes, data)
+        self._uploaded = data.copy()
+        self.uploads += 1
+
+    def delete(self):
+        state.delete_buffers([self.buffer])
@@ -0,0 +1,131 @@
+import collections       # Deque of decoded frames waiting to be shown
+import threading         # Worker thread and lock for the frame ring
+import time              # Playback clock
+import cv2               # OpenCV for video capture and frame processing
+import numpy as np       # NumPy for preallocated frame buffers
+
+RING_SLOTS = 4           # Frames decoded ahead of playback (plus one held by the renderer)
+RESYNC_LAG = 0.25        # Seconds behind the clock after which playback re-syncs instead of fast-forwarding
+
+class VideoDecoder:
+    # Decodes a looping video on a worker thread into a bounded ring of preallocated BGR frames
+    # (top row first, exactly as OpenCV decodes them; see bg_loader.VideoTextureStream).
+    # The render loop calls latest_frame() once per frame; it never blocks on decoding.
+    def __init__(self, path, slots=RING_SLOTS):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open video: {path}")
+
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0   # Some containers report 0 FPS
+        self.period = 1.0 / self.fps
+
+        # Ring of preallocated frame buffers: decoded frames go into free slots, are queued with their
+        # presentation time, and the slot shown by the renderer is held until the next frame replaces it
+        self.frames = [np.empty((self.height, self.width, 3), dtype=np.uint8) for _ in range(slots + 1)]
+        self._free = collections.deque(range(slots + 1))
+        self._ready = collections.deque()    # (slot, presentation time) in decode order
+        self._held = None                    # Slot currently shown by the renderer
+        self._lock = threading.Condition()
+
+        self._pts = 0.0                      # Presentation time of the next decoded frame (seconds)
+        self._clock_start = None             # Playback clock starts with the first latest_frame() call
+        self._last_pts = None                # Presentation time of the frame last handed out
+
+        # Counters: frames decoded, skipped because the renderer was slower than the clip (dropped),
+        # renderer polls where the due frame was not decoded yet (late), and end-of-stream loops
+        self.decoded = 0
+        self.dropped = 0
+        self.late = 0
+        self.loops = 0
+
+        self._error = None                   # Exception that stopped the worker, re-raised by latest_frame()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="video-decoder", daemon=True)
+        self._thread.start()
+
+    def _read_into(self, frame):
+        ret, out = self.cap.read(frame)      # Decode straight into the preallocated buffer
+        if not ret:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)  # If at end, rewind to loop seamlessly
+            self.loops += 1
+            ret, out = self.cap.read(frame)
+        if ret and out is not frame:
+            if out.shape != frame.shape:
+                raise RuntimeError(f"{self.path}: decoded frame is {out.shape[1]}x{out.shape[0]}, "
+                                   f"the ring was sized {frame.shape[1]}x{frame.shape[0]} from the container")
+            np.copyto(frame, out)            # Backend allocated its own buffer; copy into the ring
+        return ret
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while self._running and not self._free:
+                    self._lock.wait()        # Ring full: wait for the renderer to consume a frame
+                if not self._running:
+                    return
+                slot = self._free.popleft()
+
+            frame = self.frames[slot]
+            try:
+                ret = self._read_into(frame)
+            except Exception as error:
+                with self._lock:
+                    self._error = error      # Surfaced on the render thread instead of dying silently
+                    self._running = False
+                return
+            if not ret:
+                with self._lock:
+                    self._free.appendleft(slot)
+                    self._running = False    # Unreadable stream; stop decoding
+                return
+
+            with self._lock:
+                self._ready.append((slot, self._pts))
+                self._pts += self.period
+                self.decoded += 1
+
+    def latest_frame(self):
+        # Returns the newest frame whose presentation time has passed, or None if the frame on
+        # screen is still current. Never blocks on decoding.
+        now = time.perf_counter()
+        with self._lock:
+            if self._error is not None:
+                raise RuntimeError(f"Video decoder failed: {self._error}")
+            if self._clock_start is None:
+                self._clock_start = now
+            clock = now - self._clock_start
+
+            newest = None
+            while self._ready and self._ready[0][1] <= clock:
+                if newest is not None:
+                    self._free.append(newest[0])   # Skipped without ever being shown
+                    self.dropped += 1
+                newest = self._ready.popleft()
+
+            if newest is None:
+                # Nothing due yet; if the next frame is already overdue the decoder is falling behind
+                if self._last_pts is not None and clock - self._last_pts > 2 * self.period:
+                    self.late += 1
+                return None
+
+            if self._held is not None:
+                self._free.append(self._held)      # Previous frame is no longer on screen
+            self._held, self._last_pts = newest
+            if clock - self._last_pts > RESYNC_LAG:
+                # Renderer stalled (e.g. window drag); restart the clock here rather than racing to catch up
+                self._clock_start += clock - self._last_pts
+            self._lock.notify()
+            return self.frames[self._held]
+
+    def stats(self):
+        return {"decoded": self.decoded, "dropped": self.dropped, "late": self.late, "loops": self.loops}
+
+    def close(self):
+        with self._lock:
+            self._running = False
+            self._lock.notify_all()
+        self._thread.join()
+        self.cap.release()
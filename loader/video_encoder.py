@@ -0,0 +1,123 @@
+import queue             # Bounded frame hand-off (back-pressure on the renderer)
+import shutil            # ffmpeg lookup
+import subprocess        # ffmpeg reading raw frames from a pipe
+import threading         # Encoder worker
+import time              # Encode/wait time stats
+
+# Video file writer for offline exports. write() hands frames to a worker thread through a bounded
+# queue; the worker feeds them to an ffmpeg process (raw BGR frames on its stdin) or to
+# cv2.VideoWriter. Both encode outside the GIL (in another process / in native code), so encoding
+# overlaps the rendering and readback of the following frames. When the encoder can't keep up,
+# write() blocks once the queue is full rather than buffering the whole video in memory.
+#
+#     encoder = VideoEncoder("tour.mp4", width, height, fps=60)
+#     encoder.write(frame)       # (height, width, 3) uint8 BGR, bottom row first (glReadPixels order)
+#     encoder.close()            # Flushes; raises if encoding failed (abort() after other errors)
+
+ENCODERS = ("auto", "ffmpeg", "cv2")
+QUEUE_FRAMES = 8         # Frames waiting for the encoder before write() blocks
+FOURCC = {".avi": "MJPG", ".mkv": "XVID"}   # cv2.VideoWriter codec by extension; anything else: mp4v
+
+class VideoEncoder:
+    def __init__(self, path, width, height, fps, encoder="auto", queue_frames=QUEUE_FRAMES):
+        if encoder == "auto":
+            encoder = "ffmpeg" if shutil.which("ffmpeg") else "cv2"
+        if encoder not in ENCODERS:
+            raise ValueError(f"Unknown video encoder {encoder!r}; expected one of {ENCODERS}")
+        self.encoder = encoder
+        self.path = path
+        self.frames = 0           # Frames encoded
+        self.encode_s = 0.0       # Worker time spent encoding
+        self.blocked_s = 0.0      # Time write() waited on a full queue
+        self._error = None        # Exception raised in the worker, re-raised by write()/close()
+        self._process = self._writer = None
+        self._closed = False
+
+        if encoder == "ffmpeg":
+            # Frames arrive upside down; ffmpeg flips them while converting to YUV
+            self._process = subprocess.Popen(
+                ["ffmpeg", "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "bgr24",
+                 "-s", f"{width}x{height}", "-r", str(fps), "-i", "-", "-vf", "vflip",
+                 "-c:v", "libx264", "-pix_fmt", "yuv420p", path],
+                stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        else:
+            import cv2           # Only for exports without ffmpeg
+            fourcc = FOURCC.get(path[path.rfind("."):].lower(), "mp4v")
+            self._writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, (width, height))
+            if not self._writer.isOpened():
+                raise RuntimeError(f"cv2.VideoWriter could not open {path!r} ({fourcc})")
+            self._flip = cv2.flip
+
+        self._queue = queue.Queue(maxsize=max(queue_frames, 1))
+        self._thread = threading.Thread(target=self._run, name="video encoder", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                return
+            if self._error is not None:
+                continue          # Keep draining so write() never blocks on a dead encoder
+            start = time.perf_counter()
+            try:
+                if self._process is not None:
+                    self._process.stdin.write(memoryview(frame))
+                else:
+                    self._writer.write(self._flip(frame, 0))
+            except Exception as error:
+                self._error = error
+            self.encode_s += time.perf_counter() - start
+            self.frames += 1
+
+    def write(self, frame):
+        if self._error is not None:
+            raise RuntimeError(f"Video encoder failed: {self._error}")
+        start = time.perf_counter()
+        self._queue.put(frame)    # Blocks only when the encoder is QUEUE_FRAMES behind
+        self.blocked_s += time.perf_counter() - start
+
+    def close(self):
+        # Encode what is queued and finish the file
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        if self._process is not None:
+            try:
+                self._process.stdin.close()
+            except OSError:
+                pass              # ffmpeg already exited; its status is checked below
+            stderr = self._process.stderr.read().decode(errors="replace").strip()
+            if self._process.wait() != 0 and self._error is None:
+                self._error = RuntimeError(stderr or f"ffmpeg exited with {self._process.returncode}")
+        else:
+            self._writer.release()
+        if self._error is not None:
+            raise RuntimeError(f"Video encoder failed: {self._error}")
+
+    def abort(self):
+        # Stop without finishing the file (the export failed elsewhere); no-op after close()
+        if self._closed:
+            return
+        self._closed = True
+        if self._error is None:
+            self._error = RuntimeError("aborted")   # The worker drops what is still queued
+        if self._process is not None:
+            self._process.kill()  # Unblocks a worker stuck writing to the pipe
+        self._queue.put(None)
+        self._thread.join()
+        if self._process is not None:
+            try:
+                self._process.stdin.close()
+            except OSError:
+                pass
+            self._process.wait()
+        else:
+            self._writer.release()
+
+    def stats(self):
+        return {"encoder": self.encoder, "frames": self.frames,
+                "encode fps": round(self.frames / self.encode_s, 1) if self.encode_s else 0.0,
+                "blocked ms": round(self.blocked_s * 1000.0, 1)}
@@ -0,0 +1,29 @@
+# List of predefined camera views with name, zoom level, and rotation angles (degrees)
+# The first view "FAR FAR" is auto-only, skipped in manual mode
+views = [
+    {"name": "FAR FAR", "zoom": 107.5, "rot_x": -13.0, "rot_y": -449.0},  # AUTO ONLY
+    {"name": "CASTLE TOP VIEW", "zoom": 10.5, "rot_x": -13.0, "rot_y": -449.0},
+    {"name": "CASTLE MAIN VIEW", "zoom": 9.0, "rot_x": -45.0, "rot_y": -90.0},
+    {"name": "OUTER GATE", "zoom": 8.0, "rot_x": -51.0, "rot_y": -90.0},
+    {"name": "VENDORS UNDER BRIDGE", "zoom": 6.5, "rot_x": -36.0, "rot_y": -66.5},
+    {"name": "MARKET PLACE", "zoom": 6.0, "rot_x": -50.5, "rot_y": -56.0},
+    {"name": "TAVERN", "zoom": 7.0, "rot_x": -49.5, "rot_y": -48.5},
+    {"name": "BLACKSMITH", "zoom": 5.5, "rot_x": -54.5, "rot_y": -24.0},
+    {"name": "PEASANT HUT", "zoom": 6.5, "rot_x": -52.5, "rot_y": 7.5},
+    {"name": "FARM", "zoom": 7.0, "rot_x": -52.5, "rot_y": 26.5},
+    {"name": "RED CARPET ENTRANCE", "zoom": 6.0, "rot_x": -37.50, "rot_y": 53.50},
+    {"name": "DINING HALL", "zoom": 6.50, "rot_x": -32.00, "rot_y": 70.50},
+    {"name": "UPPER CLASS RESIDENTIAL", "zoom": 7.0, "rot_x": -49.5, "rot_y": -138.5},
+    {"name": "POND", "zoom": 7.0, "rot_x": -62.5, "rot_y": -142.5},
+    {"name": "CHAPPEL", "zoom": 7.5, "rot_x": -49.5, "rot_y": -218.5},
+    {"name": "OUTER OUTPOST", "zoom": 6, "rot_x": -58.0, "rot_y": -211.00},
+    {"name": "INNER GATE", "zoom": 5.5, "rot_x": -30.5, "rot_y": -89.0},
+    {"name": "INNER OUTPOST", "zoom": 7.0, "rot_x": -24.5, "rot_y": -153.0},
+    {"name": "CASTLE MAIN VIEW", "zoom": 9.0, "rot_x": -45.0, "rot_y": -90.0},
+    ]
+
+manual_views = views[1:]  # Exclude the first "FAR FAR" view from manual mode navigation
+
+# Durations between automatic camera view switches in milliseconds
+# Should be one less than number of views because switching happens between views
+auto_switch_intervals = [2500] * 3 + [1500] * 5 + [1125] * 11  # total 19 intervals for 20 views
@@ -1,14 +1,30 @@
+from loader import config            # config module for constants like window size, colors, FPS
+from loader import gl_options        # PyOpenGL error checking switches (set before OpenGL.GL is imported)
+gl_options.configure(config.GL_DEBUG)
 import pygame
 from pygame.locals import *          # Pygame constants like QUIT, KEYDOWN, etc.
 from OpenGL.GL import *              # OpenGL functions
 import glm                           # OpenGL Mathematics library for matrix/vector math
-from loader import config            # config module for constants like window size, colors, FPS
-import cv2                           # OpenCV for video capture
+import numpy as np                   # Copies of the memory-mapped mesh arrays
+import io                            # In-memory music file (read on a loader thread)
 import random                        # For random view switching
-from loader.model_loader import create_textured_object    # Load model data for OpenGL
-from loader.texture_loader import load_texture            # Load textures for OpenGL
+import time                          # High resolution frame timing for the fixed-timestep loop
+from loader.asset_loader import AssetLoader, PENDING       # Startup assets: worker-thread loads, sliced uploads
+from loader.model_loader import prepare_textured_object, upload_textured_object_sliced  # Castle mesh parse/upload
+from loader.texture_cache import TextureCache             # Cached textures decoded on worker threads
 from loader.textured_shader import create_shader_program  # Create OpenGL shader program for textured objects
-from loader.bg_loader import create_bg_shader_program, create_bg_quad, init_video_texture, update_video_texture # Utilities for background video rendering using OpenGL
+from loader.shader_manager import uniform_locations, delete_programs   # Uniform tables of the cached programs
+from loader.uniform_buffer import CameraUniforms          # View/projection block shared by all programs
+from loader.gl_state import state as gl_state             # Redundant bind/enable elimination
+from loader.bg_loader import create_bg_shader_program, create_bg_quad, VideoTextureStream, open_video_source, upload_video_frame # Utilities for background video rendering using OpenGL
+from loader.profiler import Profiler                      # Per-stage frame timing
+from loader.renderer import view_matrix, draw_background, draw_scene, draw_scene_cached  # Shared frame drawing
+from loader.layer_cache import LayerCache                 # Render-on-demand / scaled scene layer
+from loader.render_scale import ScaleController           # Dynamic resolution from frame times
+from loader.scene import Scene                            # Scene graph with instanced drawing
+from loader.views import views, manual_views           # Camera views for manual navigation
+from loader.tour import load_tour                        # Spline camera tour for auto mode
+from loader.timestep import FixedTimestep, smoothing_rate, smoothing_factor, lerp  # Frame-rate independent updates
 
 
 def main():
@@ -16,63 +32,139 @@ def main():
     pygame.mixer.init()      # Initialize Pygame sound mixer for audio playback
     
     display = (config.DISPLAY_WIDTH, config.DISPLAY_HEIGHT)  # Get display size from config
-    pygame.display.set_mode(display, DOUBLEBUF | OPENGL)     # Create OpenGL-capable window with double buffering
+    # Create OpenGL-capable window with double buffering; "vsync" and "adaptive" render modes sync swaps
+    # to the display (adaptive lets late frames tear instead of waiting a whole refresh)
+    vsync = {"vsync": 1, "adaptive": -1}.get(config.RENDER_MODE, 0)
+    try:
+        pygame.display.set_mode(display, DOUBLEBUF | OPENGL, vsync=vsync)
+    except pygame.error:
+        pygame.display.set_mode(display, DOUBLEBUF | OPENGL)   # Swap control unsupported; run without vsync
     
     # Set window title and icon
     pygame.display.set_caption("Minecraft 3D Castle <3")
     icon_surface = pygame.image.load("source/image.png")     # Load image for window icon
     pygame.display.set_icon(icon_surface)
 
-    glEnable(GL_DEPTH_TEST)                  # Enable depth testing so nearer objects occlude farther ones
+    gl_state.enable(GL_DEPTH_TEST)           # Enable depth testing so nearer objects occlude farther ones
     glClearColor(*config.BACKGROUND_COLOR)   # Set the clear color for the background (RGBA)
 
-    # Setup video capture for background video with OpenCV
-    cap = cv2.VideoCapture("source/bg5.mp4")
+    # Background video source (worker-thread decoder, pre-baked frame cache or shared-memory frames,
+    # see config.VIDEO_PREBAKE and config.BG_VIDEO); the render loop only picks up ready frames
+    video = open_video_source()
 
-    video_texture = init_video_texture()            # Create OpenGL texture for video frames
+    video_stream = VideoTextureStream(video.width, video.height)  # Video texture fed through double-buffered PBOs
+    video_texture = video_stream.texture
     bg_shader = create_bg_shader_program()          # Create shader program for rendering video background quad
     bg_VAO, bg_VBO = create_bg_quad()               # Create vertex array and buffer for fullscreen quad to render video
 
-    # Load 3D model and create shader program for it
-    shader = create_shader_program()
-    glUseProgram(shader)                             # Use this shader program for subsequent drawing calls
-
-    # Create the textured castle model from vertices and indices files
-    vao_castle, ebo_castle, count_castle = create_textured_object(
-        "source\\castle_vertices.txt", "source\\castle_indices.txt")
-
-    tex_castle = load_texture("source\\castle.jpg") # Load castle texture image into OpenGL texture object
-
-    # Set uniform sampler to use texture unit 0 for the shader
-    glUniform1i(glGetUniformLocation(shader, "texture1"), 0)
-
-    # Cache uniform locations for model, view, and projection matrices
-    model_loc = glGetUniformLocation(shader, "model")
-    view_loc = glGetUniformLocation(shader, "view")
-    proj_loc = glGetUniformLocation(shader, "projection")
+    # Startup assets load behind the intro video: parsing, decoding and file reads run on worker
+    # threads, GL uploads are sliced across frames by assets.pump() in the render loop, and the
+    # scene is built once everything it uses is resident
+    assets = AssetLoader(config.ASSET_WORKERS, config.ASSET_UPLOAD_BUDGET_MS)
+    textures = TextureCache()   # Decodes on its own thread pool; mip levels uploaded by textures.pump()
+
+    def load_castle_mesh():
+        # Vertices/indices plus culling BVH and LODs; np.array copies the memory-mapped cache so
+        # the pages are read here rather than during the upload
+        vertices, indices, bvh, lods = prepare_textured_object(
+            config.CASTLE_VERTICES, config.CASTLE_INDICES, optimize=True,
+            chunk_triangles=config.CULL_CHUNK_TRIANGLES, lod=config.LOD)
+        return np.array(vertices), np.array(indices), bvh, lods
+
+    def upload_castle_mesh(mesh):
+        vertices, indices, bvh, lods = mesh
+        vao, ebo, count, index_type = yield from upload_textured_object_sliced(vertices, indices)
+        return vao, ebo, count, index_type, bvh, lods
+
+    def upload_castle_texture(_):
+        texture = textures.request(config.CASTLE_TEXTURE)
+        while not textures.resident(texture):
+            yield PENDING       # Still decoding or uploading (textures.pump() below)
+        return texture
+
+    def upload_shader(_):
+        # Instanced variant: model matrices come from the scene; the linked binary is usually cached
+        shader = create_shader_program(defines=("INSTANCED",))
+        gl_state.use_program(shader)
+        glUniform1i(uniform_locations(shader)["texture1"], 0)   # Set uniform sampler to use texture unit 0
+        return shader
+
+    def build_scene(_, shader, castle, tex_castle):
+        # Scene graph: an orbit node rotated by the camera view angles, carrying the castle
+        # (together they reproduce translate(0,1,0) * rotate(x) * rotate(y) * translate(0,1,0))
+        scene = Scene(culling=config.FRUSTUM_CULLING,
+                      lod_thresholds=config.LOD_SCREEN_SIZES if config.LOD else None,
+                      indirect=config.RENDER_INDIRECT)
+        vao_castle, ebo_castle, count_castle, index_type_castle, bvh_castle, lods_castle = castle
+        castle_mesh = scene.add_mesh(vao_castle, count_castle, index_type_castle, bvh_castle, lods_castle)
+        orbit = scene.add_node(position=(0, 1, 0))
+        scene.add_node(orbit, position=(0, 1, 0), mesh=castle_mesh, texture=tex_castle)
+        return scene, orbit
+
+    def load_beep():
+        # Beep sound for zoom limit feedback, None if unavailable
+        try:
+            return pygame.mixer.Sound("source/beep.wav")
+        except Exception:
+            return None
+
+    def load_intro_music():
+        with open("source/music.mp4", "rb") as f:
+            return io.BytesIO(f.read())
+
+    assets.add("shader", upload=upload_shader)
+    assets.add("castle mesh", load=load_castle_mesh, upload=upload_castle_mesh)
+    assets.add("castle texture", upload=upload_castle_texture)
+    assets.add("scene", deps=("shader", "castle mesh", "castle texture"), upload=build_scene)
+    assets.add("beep", load=load_beep)
+    assets.add("music", load=load_intro_music)
+    shader = scene = orbit = None   # Set when the scene assets are ready
+    beep_sound = None
 
     # Create a perspective projection matrix with 100 degree FOV, aspect ratio from display,
-    # near plane 0.1 and far plane 100 units, and pass it to the shader
+    # near plane 0.1 and far plane 100 units; it reaches the shaders through the Camera uniform block
     proj = glm.perspective(glm.radians(100.0), display[0] / display[1], 0.1, 100.0)
-    glUniformMatrix4fv(proj_loc, 1, GL_FALSE, glm.value_ptr(proj))
+    camera = CameraUniforms()
+
+    # Render on demand: the scene is drawn into an offscreen layer only when the camera or the castle
+    # moved (or something invalidated it); other frames just composite the layer over the video.
+    # With dynamic resolution the layer is rendered at a scale chosen from the measured frame times.
+    layer = None
+    if config.RENDER_ON_DEMAND or config.DYNAMIC_RESOLUTION:
+        layer = LayerCache(display[0], display[1], config.LAYER_EPSILON if config.RENDER_ON_DEMAND else -1.0,
+                           sharpness=config.RENDER_SCALE_SHARPNESS)
+    scaler = ScaleController() if config.DYNAMIC_RESOLUTION else None
 
     clock = pygame.time.Clock()      # For controlling frame rate
+    frame_limit = config.FPS if config.RENDER_MODE == "capped" else 0   # 0 = no sleep, only measure
+    timestep = FixedTimestep(config.SIM_RATE)   # Simulation (camera, auto tour) runs at a fixed rate
+    sim_time = 0.0                   # Simulation clock in milliseconds
+    last_frame_clock = time.perf_counter()
+    # Frame profiler: rolling per-stage CPU/GPU percentiles, optional HUD and trace export
+    profiler = Profiler(config.PROFILE, config.PROFILE_GPU, trace=config.PROFILE_TRACE is not None)
+    last_hud_time = 0
     running = True                   # Main loop control flag
 
     # Initial states and flags
     auto_mode = True                # Automatically cycle through predefined views
     auto_mode_locked = True         # Lock user input during initial auto mode
     showing_video_only = True       # Start by showing only the video background
+    first_frame = True              # First frame not presented yet (startup timeline)
     music_switched = False          # Track if music switched to looping track
     mouse_down = False              # Track if left mouse button is pressed
 
-    position = glm.vec3(0, 1, 0)   # Initial 3D position of the castle model
     startup_time = pygame.time.get_ticks()   # Time when program started (milliseconds)
 
     view_index = 0                 # Index for manual views navigation
-    auto_view_index = 0            # Index for auto mode views navigation
+    auto_view_index = 0            # Last tour keyframe reached in auto mode
     current_view = views[auto_view_index]   # Current active camera view parameters
 
+    # Auto mode follows a keyframe tour (config.CAMERA_TOUR, or the built-in views) sampled at the
+    # simulation time; it starts when the scene is first shown
+    tour = load_tour(config.CAMERA_TOUR)
+    tour_start = None              # Simulation time of tour time 0
+    tour_blend_start = None        # Simulation time auto mode was resumed (blend in from the manual camera)
+
     # Initialize camera rotation and zoom from current view
     rot_x = current_view["rot_x"]
     rot_y = current_view["rot_y"]
@@ -81,6 +173,8 @@ def main():
     # Target values for smooth interpolation
     target_rot_x, target_rot_y = rot_x, rot_y
     target_camera_distance = camera_distance
+    # Camera state at the previous simulation step, for interpolating rendered frames between steps
+    previous_camera = (camera_distance, rot_x, rot_y)
 
     # Interpolation (lerp) speed controls smooth camera motion
     lerp_speed = 0.1
@@ -93,17 +187,6 @@ def main():
     zoom_feedback_cooldown = 500  # milliseconds
     last_zoom_feedback_time = 0
 
-    # Durations between automatic camera view switches in milliseconds
-    # Should be one less than number of views because switching happens between views
-    auto_switch_intervals = [2500] * 3 + [1500] * 5 + [1125] * 11  # total 19 intervals for 20 views
-    last_auto_switch_time = pygame.time.get_ticks()                # Last time auto switch happened
-
-    # Try to load beep sound for feedback, fallback to None if unavailable
-    try:
-        beep_sound = pygame.mixer.Sound("source/beep.wav")
-    except Exception:
-        beep_sound = None
-
     # Helper function to set the camera target parameters from a view dictionary
     def set_view(view):
         nonlocal current_view, target_camera_distance, target_rot_x, target_rot_y
@@ -115,6 +198,9 @@ def main():
     # Main application loop
     while running:
         current_time = pygame.time.get_ticks()  # Get current time in milliseconds
+        frame_start = time.perf_counter()       # Frame work time for the render scale controller
+        profiler.begin_frame()
+        profiler.stage("events")
 
         # Process all events (input, window events)
         for event in pygame.event.get():
@@ -124,6 +210,8 @@ def main():
             # If inputs are locked (during initial auto mode), ignore all except quit
             if auto_mode_locked:
                 continue
+            if layer is not None and event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
+                layer.invalidate("input")   # Input may change more than the camera matrices
 
             if event.type == pygame.KEYDOWN:
                 # Toggle auto mode on/off with 'm' key
@@ -135,14 +223,12 @@ def main():
                     print(f"Auto mode toggled to: {'ON' if auto_mode else 'OFF'}")
 
                     if auto_mode:
-                        # On first auto mode start, start from FAR FAR (index 0)
-                        # Else start from second view to skip FAR FAR (index 1)
-                        if auto_view_index == 0:
-                            auto_view_index = 0
-                        else:
-                            auto_view_index = 1
-                        set_view(views[auto_view_index])
-                        last_auto_switch_time = current_time
+                        # On first auto mode start, start from FAR FAR (keyframe 0)
+                        # Else start from the second keyframe to skip FAR FAR (keyframe 1)
+                        if auto_view_index != 0:
+                            auto_view_index = min(1, len(tour) - 1)
+                        tour_start = sim_time - tour.keyframe_times[auto_view_index]
+                        tour_blend_start = sim_time
                         auto_mode_locked = False  # Unlock manual input now
 
                 # Increase lerp speed with '+' keys
@@ -220,124 +306,170 @@ def main():
                 target_rot_x += dy * 0.5    # Update target rotation around X-axis (vertical)
                 last_mouse_pos = (x, y)     # Update last mouse position
 
-        # Auto mode: switch views automatically after intervals
-        if auto_mode:
-            if auto_view_index < len(auto_switch_intervals):
-                elapsed = current_time - last_auto_switch_time
-                interval = auto_switch_intervals[auto_view_index]
-                if elapsed > interval:
-                    auto_view_index += 1
-                    # If no more intervals, end auto mode and enable manual control
-                    if auto_view_index >= len(auto_switch_intervals):
-                        auto_mode = False
-                        auto_mode_locked = False
-                        view_index = 0
-                        print("Auto mode ended, manual control enabled.")
-                    else:
-                        # Switch to next view
-                        set_view(views[auto_view_index])
-                        print(f"Auto-switched to: {current_view['name']}")
-                    last_auto_switch_time = current_time
+        # Fixed-timestep simulation: the auto tour and camera smoothing advance in steps of
+        # timestep.dt whatever the render rate, so motion and tour timing don't drift under load
+        now = time.perf_counter()
+        steps = timestep.advance(now - last_frame_clock)
+        last_frame_clock = now
+        step_smoothing = smoothing_factor(smoothing_rate(lerp_speed), timestep.dt)
+        for _ in range(steps):
+            sim_time += timestep.dt_ms
+
+            # Auto mode: the camera targets come from the tour curve at the current tour time
+            follow = step_smoothing
+            if auto_mode and tour_start is not None:
+                tour_time = sim_time - tour_start
+                target_camera_distance, target_rot_x, target_rot_y = (float(v) for v in tour.sample(tour_time))
+                if tour_time > tour.duration:
+                    # End of the tour: stay at its last camera and enable manual control
+                    auto_mode = False
+                    auto_mode_locked = False
+                    view_index = 0
+                    print("Auto mode ended, manual control enabled.")
+                else:
+                    index = tour.keyframe(tour_time)
+                    if index != auto_view_index:
+                        auto_view_index = index
+                        print(f"Auto-switched to: {tour.names[index]}")
+                        if layer is not None:
+                            layer.invalidate("tour")
+                    # The curve is already smooth, so it is followed exactly, after ramping up over
+                    # config.TOUR_BLEND_MS when auto mode was resumed from a manual camera
+                    follow = 1.0
+                    if tour_blend_start is not None:
+                        follow = max(min((sim_time - tour_blend_start) / config.TOUR_BLEND_MS, 1.0), step_smoothing)
+
+            # Smoothly move camera distance and rotations toward targets (once the scene is shown)
+            if not showing_video_only:
+                previous_camera = (camera_distance, rot_x, rot_y)
+                camera_distance += (target_camera_distance - camera_distance) * follow
+                rot_x += (target_rot_x - rot_x) * follow
+                rot_y += (target_rot_y - rot_y) * follow
+
+        # Upload decoded texture mip levels and startup asset slices within the per-frame budgets
+        # (no-op once everything is loaded)
+        profiler.stage("asset upload", gpu=True)
+        if textures.pump() and layer is not None:
+            layer.invalidate("textures")    # A texture finished uploading: the cached image is outdated
+        assets.pump()
 
         # Render the video background
-        glClear(GL_COLOR_BUFFER_BIT)     # Clear color buffer (don't clear depth yet)
-        glDisable(GL_DEPTH_TEST)         # Disable depth test so quad draws over everything
-
-        update_video_texture(cap, video_texture)  # Update the OpenGL video texture with latest video frame
+        profiler.stage("video decode")
+        frame = video.latest_frame()     # Newest decoded frame, or None if the current one is still due
+        profiler.stage("video upload", gpu=True)
+        if frame is not None:
+            # Stream the new frame into the OpenGL video texture (checked against shared-memory rewrites)
+            profiler.count("upload bytes", upload_video_frame(video, video_stream, frame))
 
-        glUseProgram(bg_shader)          # Use background shader program
-        glBindVertexArray(bg_VAO)        # Bind quad VAO
-        glActiveTexture(GL_TEXTURE0)     # Activate texture unit 0
-        glBindTexture(GL_TEXTURE_2D, video_texture)  # Bind video texture to unit 0
-        bg_tex_loc = glGetUniformLocation(bg_shader, "backgroundTexture")  # Get uniform location
-        glUniform1i(bg_tex_loc, 0)       # Set uniform sampler to texture unit 0
-        glDrawArrays(GL_TRIANGLES, 0, 6)  # Draw two triangles forming the quad
-        glBindVertexArray(0)             # Unbind VAO
-
-        glEnable(GL_DEPTH_TEST)          # Enable depth testing again for 3D scene
-        glClear(GL_DEPTH_BUFFER_BIT)     # Clear depth buffer for new frame
+        profiler.stage("draw bg", gpu=True)
+        profiler.count("draw calls", draw_background(bg_shader, bg_VAO, video_texture))
 
         # Initially only show video background, delay before switching to music & 3D model
         if showing_video_only:
-            if current_time - startup_time < 2000:  # Show video only for 2 seconds
+            # Show video only for 2 seconds, and for as long as the scene's assets are still loading
+            if current_time - startup_time < 2000 or not assets.ready("scene", "beep", "music"):
+                profiler.stage("flip")
                 pygame.display.flip()
-                clock.tick(120)            # Limit to 120 FPS while waiting
+                profiler.stage("wait")
+                clock.tick(120 if frame_limit else 0)  # Limit to 120 FPS while waiting (capped mode)
+                profiler.end_frame()
+                if first_frame:
+                    assets.mark("first frame")
+                    first_frame = False
                 continue
-            # After delay, load and play music.mp4 audio track once
-            pygame.mixer.music.load("source/music.mp4")
+            shader = assets.result("shader")
+            scene, orbit = assets.result("scene")
+            beep_sound = assets.result("beep")
+            assets.mark("scene shown")
+            tour_start = sim_time         # The tour starts with the scene
+            print(assets.report())        # Startup timeline
+            # After delay, play the music.mp4 audio track (read by the loader) once
+            pygame.mixer.music.load(assets.result("music"), "mp4")
             pygame.mixer.music.play()
             showing_video_only = False    # Switch to 3D rendering next frames
 
+        profiler.stage("update")
+
         # If initial music finished, switch to looping music1.mp3 with fade in
         if not music_switched and not pygame.mixer.music.get_busy():
             pygame.mixer.music.load("source/music1.mp3")
             pygame.mixer.music.play(-1, fade_ms=5000)  # Loop indefinitely with 5s fade-in
             music_switched = True
 
-        # Smoothly interpolate current camera distance and rotations toward targets using lerp
-        camera_distance += (target_camera_distance - camera_distance) * lerp_speed
-        rot_x += (target_rot_x - rot_x) * lerp_speed
-        rot_y += (target_rot_y - rot_y) * lerp_speed
-
-        # Setup view matrix with camera position looking at origin
-        view = glm.lookAt(glm.vec3(0, camera_distance, 0),  # Camera position along Y axis
-                          glm.vec3(0, 0, 0),                # Look at origin (castle)
-                          glm.vec3(0, 0, -1))               # Up vector pointing backward on Z axis
-        glUseProgram(shader)
-        glUniformMatrix4fv(view_loc, 1, GL_FALSE, glm.value_ptr(view))
-
-        # Model matrix for castle including translation and rotations
-        model1 = glm.mat4(1.0)                       # Identity matrix
-        model1 = glm.translate(model1, position)    # Translate to position vector (0,1,0)
-        model1 = glm.rotate(model1, glm.radians(rot_x), glm.vec3(1, 0, 0))  # Rotate around X axis
-        model1 = glm.rotate(model1, glm.radians(rot_y), glm.vec3(0, 1, 0))  # Rotate around Y axis
-        model1 = glm.translate(model1, position)    # Translate again by position? (may be redundant)
-        glUniformMatrix4fv(model_loc, 1, GL_FALSE, glm.value_ptr(model1))   # Pass model matrix to shader
-
-        # Bind the castle texture and VAO, then draw the elements
-        glBindTexture(GL_TEXTURE_2D, tex_castle)
-        glBindVertexArray(vao_castle)
-        glDrawElements(GL_TRIANGLES, count_castle, GL_UNSIGNED_INT, None)
-
+        # Interpolate between the last two simulation steps so motion is smooth at any frame rate
+        alpha = timestep.alpha
+        render_distance = lerp(previous_camera[0], camera_distance, alpha)
+        render_rot_x = lerp(previous_camera[1], rot_x, alpha)
+        render_rot_y = lerp(previous_camera[2], rot_y, alpha)
+
+        profiler.stage("draw scene", gpu=True)
+
+        # Camera looking down at the castle, and the castle rotated by the current view angles
+        view = view_matrix(render_distance)
+        orbit.rotation = (render_rot_x, render_rot_y, 0)
+        if layer is not None:
+            renders = layer.renders
+            profiler.count("draw calls", draw_scene_cached(layer, shader, camera, view, scene, proj, display[1]))
+            profiler.count("layer renders", layer.renders - renders)   # 0 when the cached layer was reused
+            if scaler is not None:
+                if layer.renders != renders:
+                    # Frames that drew the scene: CPU work so far or the GPU time of the drawing
+                    # stages (a few frames old), whichever is larger
+                    gpu_ms = sum(profiler.latest(name, gpu=True) or 0.0
+                                 for name in ("video upload", "draw bg", "draw scene"))
+                    layer.set_scale(scaler.update(max((time.perf_counter() - frame_start) * 1000.0, gpu_ms)))
+                profiler.count("render scale %", round(layer.scale * 100))   # Per-frame scale for monitoring
+        else:
+            profiler.count("draw calls", draw_scene(shader, camera, view, scene, proj, display[1]))
+        for name, amount in scene.stats.items():
+            profiler.count(name, amount)    # Instances/chunks drawn and culled
+        issued, skipped = gl_state.take_counts()
+        profiler.count("state calls", issued)             # Binds/enables sent to GL this frame
+        profiler.count("state skipped", skipped)    # Redundant ones the tracker dropped
+
+        profiler.stage("flip")
         pygame.display.flip()           # Swap buffers to display rendered frame
-        clock.tick(config.FPS)          # Limit to configured FPS
+        profiler.stage("wait")
+        clock.tick(frame_limit)         # Limit to configured FPS (capped mode only)
+        profiler.end_frame()
+
+        # Periodically show rolling per-stage timings
+        if config.PROFILE_HUD and current_time - last_hud_time > config.PROFILE_HUD_INTERVAL:
+            if config.PROFILE_HUD == "caption":
+                pygame.display.set_caption(profiler.hud_text())
+            else:
+                print(profiler.hud_text())
+            last_hud_time = current_time
 
     # Cleanup resources on exit
-    cap.release()
-    glDeleteVertexArrays(1, [vao_castle, bg_VAO])
-    glDeleteBuffers(1, [ebo_castle, bg_VBO])
-    glDeleteTextures(1, [tex_castle, video_texture])
-    glDeleteProgram(shader)
-    glDeleteProgram(bg_shader)
+    if config.PROFILE:
+        print(profiler.report())
+    if config.PROFILE_TRACE:
+        profiler.export_trace(config.PROFILE_TRACE)
+    profiler.delete()
+    print("Video:", ", ".join(f"{value} {name}" for name, value in video.stats().items()))
+    video.close()
+    if layer is not None:
+        print("Scene layer:", ", ".join(f"{value} {name}" for name, value in layer.stats().items()))
+        if scaler is not None:
+            print("Render scale:", ", ".join(f"{value} {name}" for name, value in scaler.stats().items()))
+        layer.delete()
+    assets.delete()                     # Waits for loads still running
+    if assets.ready("scene"):
+        scene.delete()
+    if assets.ready("castle mesh"):
+        vao_castle, ebo_castle = assets.result("castle mesh")[:2]
+        gl_state.delete_vertex_arrays([vao_castle])
+        gl_state.delete_buffers([ebo_castle])
+    camera.delete()
+    gl_state.delete_vertex_arrays([bg_VAO])
+    gl_state.delete_buffers([bg_VBO])
+    textures.delete()
+    video_stream.delete()
+    delete_programs()                   # Textured and background shader programs
     pygame.mixer.music.stop()
     pygame.quit()
 
-# List of predefined camera views with name, zoom level, and rotation angles (degrees)
-# The first view "FAR FAR" is auto-only, skipped in manual mode
-views = [
-    {"name": "FAR FAR", "zoom": 107.5, "rot_x": -13.0, "rot_y": -449.0},  # AUTO ONLY
-    {"name": "CASTLE TOP VIEW", "zoom": 10.5, "rot_x": -13.0, "rot_y": -449.0},
-    {"name": "CASTLE MAIN VIEW", "zoom": 9.0, "rot_x": -45.0, "rot_y": -90.0},
-    {"name": "OUTER GATE", "zoom": 8.0, "rot_x": -51.0, "rot_y": -90.0},
-    {"name": "VENDORS UNDER BRIDGE", "zoom": 6.5, "rot_x": -36.0, "rot_y": -66.5},
-    {"name": "MARKET PLACE", "zoom": 6.0, "rot_x": -50.5, "rot_y": -56.0},
-    {"name": "TAVERN", "zoom": 7.0, "rot_x": -49.5, "rot_y": -48.5},
-    {"name": "BLACKSMITH", "zoom": 5.5, "rot_x": -54.5, "rot_y": -24.0},
-    {"name": "PEASANT HUT", "zoom": 6.5, "rot_x": -52.5, "rot_y": 7.5},
-    {"name": "FARM", "zoom": 7.0, "rot_x": -52.5, "rot_y": 26.5},
-    {"name": "RED CARPET ENTRANCE", "zoom": 6.0, "rot_x": -37.50, "rot_y": 53.50},
-    {"name": "DINING HALL", "zoom": 6.50, "rot_x": -32.00, "rot_y": 70.50},
-    {"name": "UPPER CLASS RESIDENTIAL", "zoom": 7.0, "rot_x": -49.5, "rot_y": -138.5},
-    {"name": "POND", "zoom": 7.0, "rot_x": -62.5, "rot_y": -142.5},
-    {"name": "CHAPPEL", "zoom": 7.5, "rot_x": -49.5, "rot_y": -218.5},
-    {"name": "OUTER OUTPOST", "zoom": 6, "rot_x": -58.0, "rot_y": -211.00},
-    {"name": "INNER GATE", "zoom": 5.5, "rot_x": -30.5, "rot_y": -89.0},
-    {"name": "INNER OUTPOST", "zoom": 7.0, "rot_x": -24.5, "rot_y": -153.0},
-    {"name": "CASTLE MAIN VIEW", "zoom": 9.0, "rot_x": -45.0, "rot_y": -90.0},
-    ]
-
-manual_views = views[1:]  # Exclude the first "FAR FAR" view from manual mode navigation
-
 
 if __name__ == "__main__":
     main()
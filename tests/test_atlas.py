@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from loader.atlas import pack_rects, build_atlas, remap_uvs, merge_meshes
+
+# Atlas packing must keep every image (and its gutter) apart, remapped UVs must land on the image's
+# own texels and merged index buffers must point at the right vertices
+
+def _image(width, height, value):
+    rng = np.random.default_rng(value)
+    return rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+
+def _overlaps(a, b):
+    # Half-open (x, y, w, h) rectangles
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+@pytest.mark.parametrize("seed", range(5))
+def test_packed_rects_never_overlap(seed):
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(1, 200, size=(30, 2))
+    positions, width, height = pack_rects(sizes, align=8)
+    aligned = (sizes + 7) // 8 * 8
+    rects = [(x, y, w, h) for (x, y), (w, h) in zip(positions, aligned)]
+    assert (positions % 8 == 0).all()
+    for i, (x, y, w, h) in enumerate(rects):
+        assert x >= 0 and y >= 0 and x + w <= width and y + h <= height
+        assert not any(_overlaps(rects[i], other) for other in rects[i + 1:])
+
+def test_atlas_keeps_images_and_gutters():
+    padding = 4
+    images = [_image(13, 7, 1), _image(5, 21, 2), _image(32, 32, 3), _image(1, 1, 4)]
+    atlas, rects = build_atlas(images, padding=padding)
+    height, width = atlas.shape[:2]
+    for image, (u0, v0, u1, v1) in zip(images, rects):
+        x0, y0 = int(round(u0 * width)), int(round(v0 * height))
+        x1, y1 = int(round(u1 * width)), int(round(v1 * height))
+        h, w = image.shape[:2]
+        assert (x1 - x0, y1 - y0) == (w, h)
+        assert x0 >= padding and y0 >= padding and x1 + padding <= width and y1 + padding <= height
+        assert (atlas[y0:y1, x0:x1] == image).all()
+        # The gutter repeats the image's edge texels, so filtering never picks up a neighbour
+        padded = np.pad(image, ((padding, padding), (padding, padding), (0, 0)), mode="edge")
+        assert (atlas[y0 - padding:y1 + padding, x0 - padding:x1 + padding] == padded).all()
+
+def test_remap_uvs_maps_unit_square_into_rect():
+    vertices = np.array([[0, 0, 0, 0.0, 0.0], [1, 0, 0, 1.0, 0.0], [1, 1, 0, 1.0, 1.0], [0, 1, 0, 0.5, 0.25]],
+                        dtype=np.float32)
+    rect = (0.25, 0.5, 0.75, 0.625)
+    remapped = remap_uvs(vertices, rect).reshape(-1, 5)
+    assert np.allclose(remapped[:, :3], vertices[:, :3])
+    assert np.allclose(remapped[:, 3:5], [[0.25, 0.5], [0.75, 0.5], [0.75, 0.625], [0.5, 0.53125]])
+    with pytest.raises(ValueError):
+        remap_uvs(np.array([0, 0, 0, 1.5, 0.0]), rect)
+
+def test_merge_meshes_rebases_indices():
+    triangle = (np.arange(15, dtype=np.float32), [0, 1, 2])
+    quad = (np.arange(20, dtype=np.float32) + 100, [0, 1, 2, 2, 3, 0])
+    vertices, indices = merge_meshes([triangle, quad, triangle])
+    assert vertices.size == 50
+    assert indices.tolist() == [0, 1, 2, 3, 4, 5, 5, 6, 3, 7, 8, 9]
+    merged = vertices.reshape(-1, 5)
+    assert (merged[indices[3]] == quad[0][:5]).all() and (merged[indices[9]] == triangle[0][:5]).all()
+    assert indices.dtype == np.uint16
@@ -0,0 +1,34 @@
+import os
+
+import numpy as np
+
+from loader.mesh_cache import load_mesh, read_header
+
+# A damaged or unwritable cache must never stop a mesh from loading: truncated caches are
+# rebuilt and an unwritable cache location falls back to the parsed arrays
+
+def _write_sources(tmp_path):
+    vertex_path = tmp_path / "quad_vertices.txt"
+    index_path = tmp_path / "quad_indices.txt"
+    vertex_path.write_text("0 0 0 0 0\n1 0 0 1 0\n1 1 0 1 1\n0 1 0 0 1\n")
+    index_path.write_text("0,1,2\n2,3,0\n")
+    return str(vertex_path), str(index_path)
+
+def test_truncated_cache_is_rebuilt(tmp_path):
+    vertex_path, index_path = _write_sources(tmp_path)
+    cache_path = str(tmp_path / "quad.mesh")
+    load_mesh(vertex_path, index_path, cache_path)
+    with open(cache_path, "r+b") as f:
+        f.truncate(os.path.getsize(cache_path) - 4)
+    assert read_header(cache_path) is None
+    vertices, indices = load_mesh(vertex_path, index_path, cache_path)
+    assert vertices.size == 20 and indices.tolist() == [0, 1, 2, 2, 3, 0]
+    assert read_header(cache_path) is not None
+
+def test_unwritable_cache_falls_back_to_parsed_arrays(tmp_path):
+    vertex_path, index_path = _write_sources(tmp_path)
+    cache_path = str(tmp_path / "missing_dir" / "quad.mesh")
+    vertices, indices = load_mesh(vertex_path, index_path, cache_path, optimize=True)
+    assert vertices.size % 5 == 0 and indices.size == 6
+    assert not isinstance(vertices, np.memmap)
+    assert not os.path.exists(cache_path)
@@ -0,0 +1,24 @@
+import numpy as np
+
+from loader.mesh_optimizer import tipsify, optimize_mesh
+
+# The optimizer has to pass empty meshes through and only ever reorder triangles, never change them
+
+def test_tipsify_empty_mesh():
+    indices = np.empty(0, dtype=np.uint32)
+    assert tipsify(indices, 0) is indices
+    assert tipsify(indices, 4).size == 0
+
+def test_optimize_empty_mesh():
+    vertices, indices, stats = optimize_mesh(np.empty(0, dtype=np.float32), np.empty(0, dtype=np.uint32),
+                                             report=False)
+    assert vertices.size == 0 and indices.size == 0 and stats["vertex_count"] == 0
+
+def test_tipsify_keeps_triangles():
+    rng = np.random.default_rng(0)
+    indices = rng.integers(0, 50, size=300).astype(np.uint32)
+    reordered = tipsify(indices, 50)
+    assert reordered.dtype == indices.dtype
+    before = sorted(map(tuple, indices.reshape(-1, 3).tolist()))
+    after = sorted(map(tuple, reordered.reshape(-1, 3).tolist()))
+    assert before == after
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from loader.model_loader import load_number_file
+
+# Streaming and whole-file parsing must agree wherever the chunk boundaries fall, including
+# chunks whose complete lines are all comments or blank and whitespace-only tails
+
+INDICES = b"# indices exported\n0,1,2\n\n2,3,0\n# end\n\n"
+
+@pytest.mark.parametrize("chunk_size", [None, 1, 2, 5, 19, 20, 25, 64])
+def test_chunk_boundaries_on_comments_and_blank_lines(tmp_path, chunk_size):
+    path = tmp_path / "indices.txt"
+    path.write_bytes(INDICES)
+    values = load_number_file(str(path), np.uint32, chunk_size)
+    assert values.dtype == np.uint32
+    assert values.tolist() == [0, 1, 2, 2, 3, 0]
+
+@pytest.mark.parametrize("chunk_size", [None, 4, 19])
+def test_whitespace_tail(tmp_path, chunk_size):
+    path = tmp_path / "vertices.txt"
+    path.write_bytes(b"0.5 1.0 -2.0\n3.0,4.0,5.0\n   \t ")
+    assert load_number_file(str(path), np.float32, chunk_size).tolist() == [0.5, 1.0, -2.0, 3.0, 4.0, 5.0]
+
+@pytest.mark.parametrize("chunk_size", [None, 8])
+def test_comment_only_file(tmp_path, chunk_size):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"# nothing here\n\n# still nothing\n")
+    assert load_number_file(str(path), np.float32, chunk_size).size == 0
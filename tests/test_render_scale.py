@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from loader.render_scale import ScaleController
+
+# The render scale has to settle: drop to what the budget allows, stay within its bounds, come back
+# up when the load goes away and not flip between two steps once it has found one that fits
+
+TARGET_MS = 14.0
+
+def _controller():
+    return ScaleController(target_ms=TARGET_MS, min_scale=0.5, max_scale=1.0, hysteresis=0.08, step=0.05)
+
+def _run(controller, cost_ms, frames, noise=0.0, seed=0):
+    # Frame time grows with the pixel count (scale^2) on top of `cost_ms` at full scale
+    rng = np.random.default_rng(seed)
+    return [controller.update(cost_ms * controller.scale ** 2 * (1.0 + rng.normal(0.0, noise)))
+            for _ in range(frames)]
+
+def test_constant_over_budget_converges_to_min_scale():
+    controller = _controller()
+    scales = [controller.update(2.0 * TARGET_MS) for _ in range(200)]
+    assert scales[-1] == 0.5
+    assert all(later <= earlier for earlier, later in zip(scales, scales[1:]))
+    assert scales.index(0.5) < 60 and set(scales[scales.index(0.5):]) == {0.5}
+
+@pytest.mark.parametrize("seed", range(3))
+def test_scale_stays_within_bounds_on_steps(seed):
+    controller = _controller()
+    rng = np.random.default_rng(seed)
+    for frame_ms in rng.uniform(1.0, 60.0, 2000):
+        scale = controller.update(frame_ms)
+        assert 0.5 <= scale <= 1.0
+        assert scale == round(round(scale / 0.05) * 0.05, 6) and len(repr(scale)) <= 4
+
+@pytest.mark.parametrize("cost_ms", [14.5, 16.0, 20.0, 30.0])
+@pytest.mark.parametrize("noise", [0.0, 0.05])
+def test_settles_without_oscillating(cost_ms, noise):
+    controller = _controller()
+    _run(controller, cost_ms, 300, noise)
+    settled, changes = controller.scale, controller.changes
+    assert cost_ms * settled ** 2 <= TARGET_MS                  # Within the budget...
+    assert cost_ms * (settled + 0.08) ** 2 > TARGET_MS * 0.95   # ...and not a hysteresis lower than needed
+    scales = _run(controller, cost_ms, 1000, noise, seed=1)
+    assert set(scales) == {settled} and controller.changes == changes
+
+def test_scales_back_up_when_the_load_drops():
+    controller = _controller()
+    _run(controller, 30.0, 300)
+    assert controller.scale < 0.7
+    _run(controller, 12.0, 300)
+    assert controller.scale == 1.0
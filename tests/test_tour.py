@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from loader.tour import CameraTour
+
+# Sampling has to land exactly on every keyframe (including both ends of holds and the last
+# keyframe) and the scalar and vectorised paths must agree everywhere
+
+def _tours():
+    rng = np.random.default_rng(7)
+    times = np.cumsum(rng.uniform(100.0, 900.0, 8))
+    values = rng.uniform(-400.0, 400.0, (8, 3))
+    holds = np.where(np.arange(8) % 3 == 1, 50.0, 0.0)
+    return [CameraTour.from_views(),
+            CameraTour(times, values, curve="catmull-rom"),
+            CameraTour(times, values, holds=holds, curve="catmull-rom"),
+            CameraTour(times, values, curve="linear")]
+
+@pytest.mark.parametrize("tour", _tours())
+def test_keyframes_are_hit_exactly(tour):
+    expected = tour.values.astype(np.float32)   # Curve coefficients are float32
+    for time, hold, value in zip(tour.keyframe_times, tour.holds, expected):
+        for t in (time, time + hold):
+            assert (tour.sample(float(t)) == value).all()
+            assert (tour.sample(np.array([t]))[0] == value).all()
+
+@pytest.mark.parametrize("tour", _tours())
+def test_scalar_and_array_sampling_agree(tour):
+    times = np.concatenate([np.linspace(tour.times[0] - 100.0, tour.times[-1] + 100.0, 2001), tour.times])
+    cameras = tour.sample(times)
+    assert cameras.shape == (len(times), 3)
+    scalar = np.array([tour.sample(float(t)) for t in times])
+    assert np.allclose(cameras, scalar, rtol=0.0, atol=1e-4)